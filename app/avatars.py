@@ -0,0 +1,122 @@
+# app/avatars.py
+
+# Обработка загруженных аватаров: изображение декодируется, поворачивается по EXIF, обрезается
+# до квадрата и сохраняется в нескольких размерах (AVATAR_SIZES) без метаданных.
+# Имя файлов - хэш содержимого, поэтому URL неизменяемы и отдаются с долгим кэшированием.
+
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+PROCESSED_NAME_RE = re.compile(r'^([0-9a-f]{16})\.(webp|png)$')
+
+
+class AvatarError(ValueError):
+    """Загруженный файл нельзя использовать как аватар."""
+
+
+def parse_avatar_name(avatar_url):
+    """(хэш, расширение) для обработанного аватара, None для старых файлов и аватара по умолчанию."""
+    match = PROCESSED_NAME_RE.match(avatar_url or '')
+    return match.groups() if match else None
+
+
+def avatar_filename(digest, extension, size):
+    return f'{digest}-{size}.{extension}'
+
+
+def pick_size(sizes, size):
+    """Наименьший размер не меньше запрошенного, иначе наибольший."""
+    larger = [candidate for candidate in sorted(sizes) if candidate >= size]
+    return larger[0] if larger else max(sizes)
+
+
+def probe_image(stream, max_pixels=40_000_000):
+    """Быстрая проверка по заголовку файла: это изображение допустимого размера. Позиция потока сохраняется."""
+    position = stream.tell()
+    try:
+        with Image.open(stream) as image:
+            if image.width * image.height > max_pixels:
+                raise AvatarError("Слишком большое изображение.")
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise AvatarError("Файл не является изображением поддерживаемого формата.") from e
+    finally:
+        stream.seek(position)
+
+
+def store_upload(directory, stream):
+    """Сохраняет загруженный файл до фоновой обработки, возвращает его имя в directory."""
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=directory, prefix='avatar-', suffix='.upload')
+    with os.fdopen(fd, 'wb') as f:
+        shutil.copyfileobj(stream, f)
+    return os.path.basename(path)
+
+
+def _encode(image, image_format):
+    buffer = io.BytesIO()
+    if image_format == 'WEBP':
+        image.save(buffer, 'WEBP', quality=85, method=6)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def process_avatar(stream, sizes, image_format='WEBP', max_pixels=40_000_000):
+    """Декодирует изображение и возвращает (имя для User.avatar_url, {размер: байты})."""
+    try:
+        with Image.open(stream) as source:
+            # Размер известен из заголовка, до распаковки пикселей
+            if source.width * source.height > max_pixels:
+                raise AvatarError("Слишком большое изображение.")
+            source.seek(0)  # у анимированных GIF берется первый кадр
+            image = ImageOps.exif_transpose(source)
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise AvatarError("Файл не является изображением поддерживаемого формата.") from e
+
+    # Новое изображение создается из пикселей, поэтому EXIF, ICC и прочие метаданные не сохраняются
+    square = ImageOps.fit(image, (max(sizes), max(sizes)), method=Image.Resampling.LANCZOS)
+    variants = {}
+    for size in sorted(sizes, reverse=True):
+        resized = square if size == square.width else square.resize((size, size), Image.Resampling.LANCZOS)
+        variants[size] = _encode(resized, image_format)
+
+    digest = hashlib.sha256(b''.join(variants[size] for size in sorted(variants))).hexdigest()[:16]
+    extension = 'webp' if image_format == 'WEBP' else 'png'
+    return f'{digest}.{extension}', variants
+
+
+def save_avatar(directory, name, variants):
+    """Записывает варианты аватара; файлы с тем же хэшем уже содержат те же байты."""
+    digest, extension = parse_avatar_name(name)
+    for size, data in variants.items():
+        path = os.path.join(directory, avatar_filename(digest, extension, size))
+        if os.path.exists(path):
+            continue
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)  # читатели не видят недописанный файл
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+def remove_avatar_files(directory, avatar_url, sizes):
+    """Удаляет файлы аватара (обработанного или загруженного до появления обработки)."""
+    if not avatar_url or avatar_url == 'default_avatar.png':
+        return
+    parsed = parse_avatar_name(avatar_url)
+    names = [avatar_filename(*parsed, size) for size in sizes] if parsed else [avatar_url]
+    for name in names:
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            os.remove(path)
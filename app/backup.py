@@ -0,0 +1,59 @@
+# app/backup.py
+
+# Резервные копии БД (flask db-backup): копия снимается без остановки приложения
+# (DatabaseBackend.backup), по желанию сжимается gzip и появляется в каталоге копий
+# атомарным переименованием - незаконченная копия никогда не лежит под итоговым именем.
+# Имя содержит время создания (UTC), поэтому сортировка по имени - это сортировка по времени.
+
+import gzip
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+
+
+def backup_filename(database_path, created_at, compress=False):
+    stem = os.path.splitext(os.path.basename(database_path))[0]
+    return f"{stem}-{created_at:%Y%m%d-%H%M%S}.db{'.gz' if compress else ''}"
+
+
+def _backup_name_re(database_path):
+    stem = os.path.splitext(os.path.basename(database_path))[0]
+    return re.compile(rf'^{re.escape(stem)}-\d{{8}}-\d{{6}}\.db(\.gz)?$')
+
+
+def create_backup(backend, directory, compress=False, pages_per_step=1024, pause=0.01, max_restarts=3):
+    """Снимает копию БД в каталог directory и возвращает путь к ней."""
+    os.makedirs(directory, exist_ok=True)
+    created_at = datetime.utcnow()
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.backup-', suffix='.tmp')
+    os.close(fd)
+    try:
+        backend.backup(temp_path, pages_per_step=pages_per_step, pause=pause, max_restarts=max_restarts)
+        path = os.path.join(directory, backup_filename(backend.path, created_at, compress))
+        if compress:
+            with open(temp_path, 'rb') as source, gzip.open(temp_path + '.gz', 'wb', compresslevel=6) as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+            os.replace(temp_path + '.gz', path)
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, path)
+    except BaseException:
+        for leftover in (temp_path, temp_path + '.gz'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+    return path
+
+
+def rotate_backups(directory, database_path, keep):
+    """Удаляет копии сверх keep самых новых (keep <= 0 - ничего не удаляет); возвращает удаленные пути."""
+    if keep <= 0 or not os.path.isdir(directory):
+        return []
+    name_re = _backup_name_re(database_path)
+    backups = sorted(name for name in os.listdir(directory) if name_re.match(name))
+    removed = [os.path.join(directory, name) for name in backups[:-keep]]
+    for path in removed:
+        os.remove(path)
+    return removed
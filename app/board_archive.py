@@ -0,0 +1,270 @@
+# app/board_archive.py
+
+# Архив доски для переноса и резервного копирования: NDJSON - по одному JSON-объекту с полем type
+# на строку, по желанию сжатый gzip. Записи идут в порядке зависимостей (RECORD_TYPES), поэтому
+# и экспорт, и импорт работают потоково: экспорт читает строки курсором (yield_per) и сразу отдает их,
+# импорт вставляет записи пачками (executemany) и держит в памяти только соответствие старых id новым.
+# Пользователи в архиве указываются по email.
+
+import gzip
+import io
+import json
+import zlib
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from app import db
+from app.jobs import enqueue
+from app.models import Board, Card, Column, Comment, Tag, User, board_members, card_assignees, card_tags
+from app.permissions import invalidate_board_membership
+from app.ranking import is_valid_rank
+
+ARCHIVE_FORMAT = 1
+RECORD_TYPES = ('board', 'member', 'column', 'tag', 'card', 'assignee', 'card_tag', 'comment')
+EXPORT_FETCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+IMPORT_BATCH_SIZE = 1000
+
+
+class ArchiveError(ValueError):
+    """Файл не является архивом доски или поврежден."""
+
+
+def archive_filename(board, compress=True):
+    return f"board-{board.id}-{datetime.utcnow():%Y%m%d}.ndjson{'.gz' if compress else ''}"
+
+
+def _stream(statement):
+    return db.session.execute(statement.execution_options(yield_per=EXPORT_FETCH_SIZE))
+
+
+def export_board_records(board):
+    """Записи архива доски (словари) в порядке RECORD_TYPES."""
+    yield {'type': 'board', 'format': ARCHIVE_FORMAT, 'name': board.name, 'owner': board.owner.email,
+           'exported_at': datetime.utcnow().isoformat(timespec='seconds')}
+    card_ids = select(Card.id).join(Column, Column.id == Card.column_id).where(Column.board_id == board.id)
+
+    for email, username in _stream(select(User.email, User.username)
+                                   .join(board_members, board_members.c.user_id == User.id)
+                                   .where(board_members.c.board_id == board.id).order_by(User.id)):
+        yield {'type': 'member', 'email': email, 'username': username}
+    for column_id, name, position in _stream(select(Column.id, Column.name, Column.position)
+                                             .where(Column.board_id == board.id).order_by(Column.position, Column.id)):
+        yield {'type': 'column', 'id': column_id, 'name': name, 'position': position}
+    for tag_id, name, color in _stream(select(Tag.id, Tag.name, Tag.color).where(Tag.board_id == board.id)
+                                       .order_by(Tag.id)):
+        yield {'type': 'tag', 'id': tag_id, 'name': name, 'color': color}
+    for card_id, column_id, title, description, rank in _stream(
+            select(Card.id, Card.column_id, Card.title, Card.description, Card.rank)
+            .join(Column, Column.id == Card.column_id).where(Column.board_id == board.id).order_by(Card.id)):
+        yield {'type': 'card', 'id': card_id, 'column_id': column_id, 'title': title, 'description': description,
+               'rank': rank}
+    for card_id, email in _stream(select(card_assignees.c.card_id, User.email)
+                                  .join(User, User.id == card_assignees.c.user_id)
+                                  .where(card_assignees.c.card_id.in_(card_ids))):
+        yield {'type': 'assignee', 'card_id': card_id, 'email': email}
+    for card_id, tag_id in _stream(select(card_tags.c.card_id, card_tags.c.tag_id)
+                                   .where(card_tags.c.card_id.in_(card_ids))):
+        yield {'type': 'card_tag', 'card_id': card_id, 'tag_id': tag_id}
+    # Порядок индекса ix_comment_card_timestamp_id: без сортировки всех комментариев доски
+    for card_id, email, text, timestamp in _stream(
+            select(Comment.card_id, User.email, Comment.text, Comment.timestamp)
+            .join(User, User.id == Comment.user_id).where(Comment.card_id.in_(card_ids))
+            .order_by(Comment.card_id, Comment.timestamp, Comment.id)):
+        yield {'type': 'comment', 'card_id': card_id, 'author': email, 'text': text,
+               'timestamp': timestamp.isoformat() if timestamp else None}
+
+
+def encode_archive(records, compress=False):
+    """Байты архива фрагментами около EXPORT_CHUNK_SIZE; с compress - поток gzip."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31 - формат gzip
+    chunk = bytearray()
+    for record in records:
+        chunk += json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            data = compressor.compress(bytes(chunk)) if compressor else bytes(chunk)
+            chunk.clear()
+            if data:
+                yield data
+    tail = compressor.compress(bytes(chunk)) + compressor.flush() if compressor else bytes(chunk)
+    if tail:
+        yield tail
+
+
+def read_archive(stream):
+    """Записи архива из бинарного потока; сжатие gzip определяется по сигнатуре."""
+    if not hasattr(stream, 'peek'):
+        stream = io.BufferedReader(stream)
+    if stream.peek(2)[:2] == b'\x1f\x8b':
+        stream = gzip.GzipFile(fileobj=stream, mode='rb')
+    number = 0
+    try:
+        for number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8'), start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict) or record.get('type') not in RECORD_TYPES:
+                raise ArchiveError(f"Строка {number}: неизвестная запись.")
+            yield record
+    except (ValueError, OSError, EOFError) as e:
+        if isinstance(e, ArchiveError):
+            raise
+        raise ArchiveError(f"Строка {number + 1}: архив поврежден ({e}).") from e
+
+
+class _BoardImporter:
+    """Вставляет записи архива пачками одного типа, каждая пачка - отдельная транзакция."""
+
+    def __init__(self, owner, name, batch_size):
+        self.owner = owner
+        self.name = name
+        self.batch_size = batch_size
+        self.board_id = self.owner_id = None
+        self.board_user_ids = set()
+        self.ids = {'column': {}, 'tag': {}, 'card': {}}  # id в архиве -> новый id
+        self.user_ids = {}  # email -> id (None - пользователя нет)
+        self.pending_type, self.pending = None, []
+        self.counts = {}
+
+    def add(self, record):
+        kind = record['type']
+        if self.board_id is None:
+            if kind != 'board':
+                raise ArchiveError("Архив должен начинаться с записи board.")
+            self._create_board(record)
+            return
+        if kind == 'board' or RECORD_TYPES.index(kind) < RECORD_TYPES.index(self.pending_type or 'member'):
+            raise ArchiveError(f"Запись {kind} нарушает порядок архива.")
+        if kind != self.pending_type or len(self.pending) >= self.batch_size:
+            self.flush()
+            self.pending_type = kind
+        self.pending.append(record)
+
+    def flush(self):
+        if not self.pending:
+            return
+        records, self.pending = self.pending, []
+        try:
+            inserted = getattr(self, f'_insert_{self.pending_type}s')(records)
+        except ArchiveError:
+            db.session.rollback()
+            raise
+        except (KeyError, TypeError, ValueError) as e:
+            db.session.rollback()
+            raise ArchiveError(f"Некорректная запись {self.pending_type}: {e!r}") from e
+        self.counts[self.pending_type] = self.counts.get(self.pending_type, 0) + inserted
+        db.session.commit()
+
+    def finish(self):
+        if self.board_id is None:
+            raise ArchiveError("Архив пуст.")
+        self.flush()
+        Board.query.filter_by(id=self.board_id).update({Board.deleted_at: None}, synchronize_session=False)
+        db.session.commit()
+        invalidate_board_membership(board_id=self.board_id)
+
+    def _create_board(self, record):
+        if record.get('format') != ARCHIVE_FORMAT:
+            raise ArchiveError(f"Неподдерживаемая версия архива: {record.get('format')!r}.")
+        owner = self.owner
+        if owner is None:
+            owner = User.query.filter_by(email=record.get('owner')).first()
+            if owner is None:
+                raise ArchiveError(f"Владелец доски {record.get('owner')} не найден, укажите другого владельца.")
+        # До конца импорта доска скрыта так же, как удаленная
+        board = Board(name=(self.name or record['name'])[:100], user_id=owner.id, deleted_at=datetime.utcnow())
+        db.session.add(board)
+        db.session.commit()
+        self.board_id, self.owner_id = board.id, owner.id
+        self.board_user_ids.add(owner.id)
+        self.counts['board'] = 1
+
+    def _resolve_users(self, emails):
+        missing = set(emails) - set(self.user_ids)
+        if missing:
+            self.user_ids.update(dict.fromkeys(missing))
+            self.user_ids.update(db.session.execute(select(User.email, User.id).where(User.email.in_(missing))).all())
+        return self.user_ids
+
+    def _insert_returning_ids(self, table, kind, records, rows):
+        new_ids = db.session.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                                     rows).scalars().all()
+        self.ids[kind].update(zip((record['id'] for record in records), new_ids))
+        return len(new_ids)
+
+    def _insert_members(self, records):
+        user_ids = self._resolve_users(record['email'] for record in records)
+        new_ids = {user_ids[record['email']] for record in records} - self.board_user_ids - {None}
+        if new_ids:
+            db.session.execute(insert(board_members), [{'board_id': self.board_id, 'user_id': user_id}
+                                                       for user_id in new_ids])
+            self.board_user_ids.update(new_ids)
+        return len(new_ids)
+
+    def _insert_columns(self, records):
+        return self._insert_returning_ids(Column.__table__, 'column', records, [
+            {'board_id': self.board_id, 'name': record['name'], 'position': int(record['position'])}
+            for record in records])
+
+    def _insert_tags(self, records):
+        return self._insert_returning_ids(Tag.__table__, 'tag', records, [
+            {'board_id': self.board_id, 'name': record['name'], 'color': record['color']} for record in records])
+
+    def _insert_cards(self, records):
+        # Некорректный ранг ломает порядок колонки и вставку соседних карточек, такой архив не принимается
+        max_length = Card.__table__.c.rank.type.length
+        for record in records:
+            if not is_valid_rank(record['rank'], max_length):
+                raise ArchiveError(f"Карточка {record['id']!r}: некорректный ранг {record['rank']!r}.")
+        column_ids = self.ids['column']
+        return self._insert_returning_ids(Card.__table__, 'card', records, [
+            {'column_id': column_ids[record['column_id']], 'title': record['title'],
+             'description': record.get('description'), 'rank': record['rank']} for record in records])
+
+    def _insert_assignees(self, records):
+        # Исполнителем может быть только владелец или участник доски
+        user_ids, card_ids = self._resolve_users(record['email'] for record in records), self.ids['card']
+        rows = {(card_ids[record['card_id']], user_ids[record['email']]) for record in records}
+        rows = [{'card_id': card_id, 'user_id': user_id} for card_id, user_id in rows
+                if user_id in self.board_user_ids]
+        if rows:
+            db.session.execute(insert(card_assignees), rows)
+        return len(rows)
+
+    def _insert_card_tags(self, records):
+        card_ids, tag_ids = self.ids['card'], self.ids['tag']
+        rows = {(card_ids[record['card_id']], tag_ids[record['tag_id']]) for record in records}
+        db.session.execute(insert(card_tags), [{'card_id': card_id, 'tag_id': tag_id} for card_id, tag_id in rows])
+        return len(rows)
+
+    def _insert_comments(self, records):
+        # Комментарии авторов, которых нет в этой БД, записываются на владельца доски
+        user_ids, card_ids = self._resolve_users(record['author'] for record in records), self.ids['card']
+        rows = [{'card_id': card_ids[record['card_id']], 'user_id': user_ids[record['author']] or self.owner_id,
+                 'text': record['text'],
+                 'timestamp': datetime.fromisoformat(record['timestamp']) if record.get('timestamp') else datetime.utcnow()}
+                for record in records]
+        db.session.execute(insert(Comment.__table__), rows)
+        return len(rows)
+
+
+def import_board(records, owner=None, name=None, batch_size=IMPORT_BATCH_SIZE):
+    """Создает доску из записей архива; возвращает (id доски, число вставленных строк по типам).
+
+    owner - владелец новой доски (по умолчанию владелец из архива, если он есть в этой БД).
+    Участники и исполнители, которых нет среди пользователей, пропускаются.
+    Пока идет импорт, доска скрыта; при ошибке вставленные строки удаляет задача board.purge.
+    """
+    importer = _BoardImporter(owner, name, batch_size)
+    try:
+        for record in records:
+            importer.add(record)
+        importer.finish()
+    except BaseException:
+        db.session.rollback()
+        if importer.board_id is not None:
+            enqueue('board.purge', {'board_id': importer.board_id}, unique_key=str(importer.board_id))
+            db.session.commit()
+        raise
+    return importer.board_id, importer.counts
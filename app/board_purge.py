@@ -0,0 +1,71 @@
+# app/board_purge.py
+
+# Фоновое удаление строк доски, помеченной как удаленная (Board.deleted_at).
+# Каждый шаг - один множественный DELETE не более чем batch_size строк одной таблицы по индексу,
+# вызывающий коммитит после каждой пачки. Поэтому блокировка записи (в SQLite - всей БД)
+# держится миллисекунды, и запросы других пользователей успевают выполниться между пачками.
+# Дочерние строки удаляются раньше родительских, так что внешние ключи не нарушаются
+# и каскадные ON DELETE не разворачиваются в неограниченную работу.
+
+from sqlalchemy import delete, select
+
+from app import db
+from app.models import Board, BoardChange, Card, Column, Comment, Tag, board_members, card_assignees, card_tags
+
+
+def _delete(statement):
+    # Удаленные объекты не загружаются в сессию, поэтому синхронизировать ее не нужно
+    return db.session.execute(statement, execution_options={'synchronize_session': False}).rowcount
+
+
+def _board_card_ids(board_id):
+    return select(Card.id).join(Column, Column.id == Card.column_id).where(Column.board_id == board_id)
+
+
+def _delete_comments(board_id, batch_size):
+    comment_ids = select(Comment.id).where(Comment.card_id.in_(_board_card_ids(board_id))).limit(batch_size)
+    return _delete(delete(Comment).where(Comment.id.in_(comment_ids)))
+
+
+def _delete_cards(board_id, batch_size):
+    card_ids = db.session.execute(_board_card_ids(board_id).limit(batch_size)).scalars().all()
+    if not card_ids:
+        return 0
+    # Связей у карточки не больше, чем участников и тегов доски
+    _delete(delete(card_tags).where(card_tags.c.card_id.in_(card_ids)))
+    _delete(delete(card_assignees).where(card_assignees.c.card_id.in_(card_ids)))
+    _delete(delete(Comment).where(Comment.card_id.in_(card_ids)))  # добавленные после первого шага
+    return _delete(delete(Card).where(Card.id.in_(card_ids)))
+
+
+def _delete_columns(board_id, batch_size):
+    column_ids = select(Column.id).where(Column.board_id == board_id).limit(batch_size)
+    return _delete(delete(Column).where(Column.id.in_(column_ids)))
+
+
+def _delete_tags(board_id, batch_size):
+    tag_ids = select(Tag.id).where(Tag.board_id == board_id).limit(batch_size)
+    return _delete(delete(Tag).where(Tag.id.in_(tag_ids)))
+
+
+def _delete_changes(board_id, batch_size):
+    change_ids = select(BoardChange.id).where(BoardChange.board_id == board_id).limit(batch_size)
+    return _delete(delete(BoardChange).where(BoardChange.id.in_(change_ids)))
+
+
+def _delete_members(board_id, batch_size):
+    member_ids = select(board_members.c.user_id).where(board_members.c.board_id == board_id).limit(batch_size)
+    return _delete(delete(board_members).where(board_members.c.board_id == board_id,
+                                               board_members.c.user_id.in_(member_ids)))
+
+
+PURGE_STEPS = (_delete_comments, _delete_cards, _delete_columns, _delete_tags, _delete_changes, _delete_members)
+
+
+def purge_board_batch(board_id, batch_size):
+    """Удаляет очередную пачку строк доски; False, когда удалена и сама доска (коммит - за вызывающим)."""
+    for step in PURGE_STEPS:
+        if step(board_id, batch_size):
+            return True
+    _delete(delete(Board).where(Board.id == board_id, Board.deleted_at.is_not(None)))
+    return False
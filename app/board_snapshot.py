@@ -0,0 +1,190 @@
+# app/board_snapshot.py
+
+from sqlalchemy import or_, select
+from app import db
+from app.models import User, Column, Card, Tag, card_tags, card_assignees, board_members
+
+
+class CardSnapshot:
+    """Карточка доски вместе с уже загруженными тегами и исполнителями."""
+    __slots__ = ('id', 'title', 'description', 'column_id', 'rank', 'tags', 'assignees')
+
+    def __init__(self, card):
+        self.id = card.id
+        self.title = card.title
+        self.description = card.description
+        self.column_id = card.column_id
+        self.rank = card.rank
+        self.tags = []
+        self.assignees = []
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description or "",
+            'column_id': self.column_id,
+            'rank': self.rank,
+            'tag_ids': [tag.id for tag in self.tags],
+            'assignee_ids': [user.id for user in self.assignees],
+        }
+
+
+class ColumnSnapshot:
+    """Колонка доски со списком карточек в порядке отображения."""
+    __slots__ = ('id', 'name', 'position', 'cards')
+
+    def __init__(self, column):
+        self.id = column.id
+        self.name = column.name
+        self.position = column.position
+        self.cards = []
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'position': self.position,
+            'cards': [card.to_dict() for card in self.cards],
+        }
+
+
+class BoardSnapshot:
+    """Состояние доски в памяти: колонки, карточки, теги, владелец и участники.
+
+    Собирается фиксированным числом запросов независимо от количества карточек,
+    шаблон доски читает данные только отсюда.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self.columns = []
+        self.cards_by_id = {}
+        self.tags = []
+        self.owner = None
+        self.members = []
+        self.eligible_assignees = []
+
+    def to_dict(self):
+        # Теги и пользователи передаются один раз, карточки ссылаются на них по id
+        users = {user.id: user for user in self.eligible_assignees}
+        for card in self.cards_by_id.values():
+            for user in card.assignees:
+                users.setdefault(user.id, user)
+        return {
+            'id': self.board.id,
+            'name': self.board.name,
+            'version': self.board.version,
+            'owner_id': self.board.user_id,
+            'columns': [column.to_dict() for column in self.columns],
+            'tags': [{'id': t.id, 'name': t.name, 'color': t.color} for t in self.tags],
+            'users': [{'id': u.id, 'username': u.username, 'avatar_url': u.get_avatar()} for u in users.values()],
+        }
+
+
+def load_board_snapshot(board):
+    snapshot = BoardSnapshot(board)
+
+    columns = Column.query.filter_by(board_id=board.id).order_by(Column.position, Column.id).all()
+    columns_by_id = {}
+    for column in columns:
+        column_snapshot = ColumnSnapshot(column)
+        columns_by_id[column.id] = column_snapshot
+        snapshot.columns.append(column_snapshot)
+
+    cards = Card.query.join(Column, Column.id == Card.column_id) \
+        .filter(Column.board_id == board.id) \
+        .order_by(Card.rank, Card.id).all()
+    for card in cards:
+        card_snapshot = CardSnapshot(card)
+        snapshot.cards_by_id[card.id] = card_snapshot
+        columns_by_id[card.column_id].cards.append(card_snapshot)
+
+    if cards:
+        tag_rows = db.session.query(card_tags.c.card_id, Tag) \
+            .join(Tag, Tag.id == card_tags.c.tag_id) \
+            .join(Card, Card.id == card_tags.c.card_id) \
+            .join(Column, Column.id == Card.column_id) \
+            .filter(Column.board_id == board.id) \
+            .order_by(card_tags.c.card_id, Tag.id).all()
+        for card_id, tag in tag_rows:
+            snapshot.cards_by_id[card_id].tags.append(tag)
+
+        assignee_rows = db.session.query(card_assignees.c.card_id, User) \
+            .join(User, User.id == card_assignees.c.user_id) \
+            .join(Card, Card.id == card_assignees.c.card_id) \
+            .join(Column, Column.id == Card.column_id) \
+            .filter(Column.board_id == board.id) \
+            .order_by(card_assignees.c.card_id, User.id).all()
+        for card_id, user in assignee_rows:
+            snapshot.cards_by_id[card_id].assignees.append(user)
+
+    snapshot.tags = Tag.query.filter_by(board_id=board.id).order_by(Tag.name).all()
+
+    snapshot.eligible_assignees = load_eligible_assignees(board)
+    for user in snapshot.eligible_assignees:
+        if user.id == board.user_id:
+            snapshot.owner = user
+        else:
+            snapshot.members.append(user)
+
+    return snapshot
+
+
+def _filtered_cards_query(board, column_ids, assignee_ids, tag_ids):
+    query = Card.query.join(Column, Column.id == Card.column_id).filter(Column.board_id == board.id)
+    if column_ids:
+        query = query.filter(Card.column_id.in_(column_ids))
+    if assignee_ids:
+        query = query.filter(Card.id.in_(
+            select(card_assignees.c.card_id).where(card_assignees.c.user_id.in_(assignee_ids))))
+    if tag_ids:
+        query = query.filter(Card.id.in_(
+            select(card_tags.c.card_id).where(card_tags.c.tag_id.in_(tag_ids))))
+    return query.order_by(Column.position, Column.id, Card.rank, Card.id)
+
+
+def load_filtered_cards(board, column_ids=None, assignee_ids=None, tag_ids=None, limit=500, offset=0):
+    """Карточки доски, отфильтрованные в SQL: (список CardSnapshot, есть_еще).
+
+    Внутри одного фильтра значения объединяются через ИЛИ, разные фильтры - через И,
+    как в панели фильтров доски.
+    """
+    cards = _filtered_cards_query(board, column_ids, assignee_ids, tag_ids).limit(limit + 1).offset(offset).all()
+    has_more = len(cards) > limit
+
+    snapshots = {card.id: CardSnapshot(card) for card in cards[:limit]}
+    load_card_relations(snapshots)
+    return list(snapshots.values()), has_more
+
+
+def load_filtered_card_ids(board, column_ids=None, assignee_ids=None, tag_ids=None):
+    """ID всех карточек доски, подходящих под фильтры, одним запросом без загрузки самих карточек."""
+    query = _filtered_cards_query(board, column_ids, assignee_ids, tag_ids).with_entities(Card.id)
+    return [card_id for card_id, in query]
+
+
+def load_card_relations(snapshots):
+    """Заполняет теги и исполнителей карточек {id: CardSnapshot} двумя запросами."""
+    if not snapshots:
+        return
+    tag_rows = db.session.query(card_tags.c.card_id, Tag) \
+        .join(Tag, Tag.id == card_tags.c.tag_id) \
+        .filter(card_tags.c.card_id.in_(list(snapshots))) \
+        .order_by(card_tags.c.card_id, Tag.id).all()
+    for card_id, tag in tag_rows:
+        snapshots[card_id].tags.append(tag)
+
+    assignee_rows = db.session.query(card_assignees.c.card_id, User) \
+        .join(User, User.id == card_assignees.c.user_id) \
+        .filter(card_assignees.c.card_id.in_(list(snapshots))) \
+        .order_by(card_assignees.c.card_id, User.id).all()
+    for card_id, user in assignee_rows:
+        snapshots[card_id].assignees.append(user)
+
+
+def load_eligible_assignees(board):
+    """Владелец и участники доски одним запросом, отсортированные по имени."""
+    member_ids = select(board_members.c.user_id).where(board_members.c.board_id == board.id)
+    users = User.query.filter(or_(User.id == board.user_id, User.id.in_(member_ids))).all()
+    return sorted(users, key=lambda u: u.username.lower())
@@ -0,0 +1,227 @@
+# app/database.py
+
+# Подключение к БД: URL и параметры пула из окружения, операции обслуживания,
+# зависящие от СУБД (DatabaseBackend), и настройки соединений SQLite.
+# PRAGMA действуют только в рамках одного соединения, поэтому профиль SQLite применяется
+# в обработчике события connect к каждому новому соединению пула.
+
+import os
+import sqlite3
+
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import make_url
+
+SQLITE_PROFILES = {
+    # Только то, без чего приложение работает некорректно: каскадные ON DELETE и ожидание блокировки
+    'default': {
+        'foreign_keys': 'ON',
+        'busy_timeout': 5000,
+    },
+    # WAL: читатели не блокируют писателя, fsync выполняется на контрольной точке, а не на каждом коммите
+    'tuned': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'foreign_keys': 'ON',
+        'busy_timeout': 5000,
+        'cache_size': -32000,  # в КиБ, около 32 МБ на соединение
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def sqlite_pragmas(config):
+    """Итоговый набор PRAGMA: выбранный профиль плюс точечные переопределения из SQLITE_PRAGMAS."""
+    profile = config.get('SQLITE_PROFILE', 'default')
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Неизвестный профиль SQLite: {profile!r}, доступны: {', '.join(SQLITE_PROFILES)}")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    pragmas.update(config.get('SQLITE_PRAGMAS') or {})
+    return pragmas
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Подключает обработчик, выполняющий PRAGMA на каждом новом соединении engine."""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+
+
+def _env_bool(environ, name, default):
+    value = environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _env_int(environ, name, default):
+    value = environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def database_url(environ, default_url):
+    """URL БД из DATABASE_URL; устаревшая схема postgres:// приводится к postgresql://."""
+    url = environ.get('DATABASE_URL') or default_url
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+class DatabaseBackend:
+    """Операции обслуживания БД, которые зависят от СУБД: проверка схемы, полное удаление, резервная копия."""
+
+    name = 'generic'
+    supports_backup = False  # есть ли backup() - копия средствами приложения (flask db-backup)
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    @classmethod
+    def engine_options(cls, url, environ):
+        return {
+            'pool_size': _env_int(environ, 'DATABASE_POOL_SIZE', 5),
+            'max_overflow': _env_int(environ, 'DATABASE_MAX_OVERFLOW', 10),
+            'pool_pre_ping': _env_bool(environ, 'DATABASE_POOL_PRE_PING', True),
+            'pool_recycle': _env_int(environ, 'DATABASE_POOL_RECYCLE', 1800),
+        }
+
+    @property
+    def location(self):
+        return self.engine.url.render_as_string(hide_password=True)
+
+    def table_names(self):
+        return set(inspect(self.engine).get_table_names())
+
+    def exists(self):
+        return bool(self.table_names())
+
+    def missing_tables(self, metadata):
+        existing = self.table_names()
+        return [table.name for table in metadata.sorted_tables if table.name not in existing]
+
+    def drop(self, metadata):
+        metadata.drop_all(bind=self.engine)
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql('DROP TABLE IF EXISTS alembic_version')  # иначе миграции сочтут схему актуальной
+        self.engine.dispose()
+
+    def backup(self, destination, pages_per_step=1024, pause=0.01, max_restarts=3):
+        raise NotImplementedError(f"Резервное копирование {self.name} средствами приложения не поддерживается, "
+                                  "используйте инструменты СУБД (например, pg_dump).")
+
+
+class _BackupRestarted(Exception):
+    pass
+
+
+class _BackupProgress:
+    """Обработчик прогресса sqlite3 backup: считает страницы и перезапуски копирования."""
+
+    def __init__(self, max_restarts):
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self.total = 0
+        self._remaining = None
+
+    def __call__(self, status, remaining, total):
+        # Запись в БД из другого соединения начинает копирование заново, число оставшихся страниц растет
+        if self._remaining is not None and remaining > self._remaining:
+            self.restarts += 1
+            if self.restarts > self.max_restarts:
+                raise _BackupRestarted()
+        self._remaining, self.total = remaining, total
+
+
+class SQLiteBackend(DatabaseBackend):
+    """SQLite: БД - это файл, при полном удалении он стирается вместе со служебными файлами WAL."""
+
+    name = 'sqlite'
+    supports_backup = True
+
+    @classmethod
+    def engine_options(cls, url, environ):
+        if make_url(url).database in (None, '', ':memory:'):
+            return {}  # для БД в памяти SQLAlchemy использует собственный пул без настроек размера
+        options = super().engine_options(url, environ)
+        options['pool_pre_ping'] = _env_bool(environ, 'DATABASE_POOL_PRE_PING', False)  # локальный файл не "отваливается"
+        return options
+
+    @property
+    def path(self):
+        database = self.engine.url.database
+        return None if database in (None, '', ':memory:') else database
+
+    @property
+    def location(self):
+        return self.path or ':memory:'
+
+    def exists(self):
+        return os.path.exists(self.path) if self.path else super().exists()
+
+    def drop(self, metadata):
+        if not self.path:
+            return super().drop(metadata)
+        self.engine.dispose()  # иначе соединения пула держат файлы открытыми
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def backup(self, destination, pages_per_step=1024, pause=0.01, max_restarts=3):
+        """Согласованная копия работающей БД в файл destination (online backup API); возвращает число страниц.
+
+        Копирование идет шагами по pages_per_step страниц с паузой pause секунд. В режиме WAL копия
+        снимается с одного снимка: соединение держит транзакцию чтения, а писатели продолжают
+        дописывать WAL и не ждут. В режиме журнала отката блокировка снимается между шагами,
+        и запись в БД перезапускает копирование; после max_restarts перезапусков остаток
+        копируется за один шаг (запись ждет только его).
+        """
+        if not self.path:
+            raise ValueError("БД в памяти нельзя скопировать в файл.")
+        source = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+        target = sqlite3.connect(destination, isolation_level=None)
+        try:
+            snapshot = source.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal'
+            if snapshot:
+                source.execute('BEGIN')
+                source.execute('SELECT count(*) FROM sqlite_master').fetchone()  # транзакция чтения начинается здесь
+            progress = _BackupProgress(max_restarts)
+            try:
+                source.backup(target, pages=pages_per_step, progress=progress, sleep=pause)
+            except _BackupRestarted:
+                source.backup(target, pages=-1, progress=progress)
+            if snapshot:
+                source.execute('COMMIT')
+            # Копия - самостоятельный файл без -wal, и она проверяется до того, как считаться готовой
+            target.execute('PRAGMA journal_mode = DELETE')
+            result = target.execute('PRAGMA quick_check').fetchone()[0]
+            if result != 'ok':
+                raise sqlite3.DatabaseError(f"Копия БД не прошла проверку: {result}")
+            return progress.total
+        finally:
+            target.close()
+            source.close()
+
+
+class PostgreSQLBackend(DatabaseBackend):
+    """PostgreSQL: общая БД для нескольких узлов приложения, нужен драйвер psycopg2 или psycopg."""
+
+    name = 'postgresql'
+
+
+BACKENDS = {backend.name: backend for backend in (SQLiteBackend, PostgreSQLBackend)}
+
+
+def backend_class(url):
+    return BACKENDS.get(make_url(url).get_backend_name(), DatabaseBackend)
+
+
+def get_backend(engine):
+    return BACKENDS.get(engine.dialect.name, DatabaseBackend)(engine)
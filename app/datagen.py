@@ -0,0 +1,132 @@
+# app/datagen.py
+
+# Генератор синтетических данных для нагрузочного тестирования и бенчмарков.
+# Вставка идет через Core insert пачками (executemany) в одной транзакции, в обход ORM:
+# ранги карточек задаются сразу, журнал изменений и события досок не пишутся.
+
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import User, Board, Column, Card, Comment, Tag, card_assignees, card_tags, board_members
+from app.ranking import spread_ranks
+
+INSERT_CHUNK_SIZE = 5000
+
+COLUMN_NAMES = ['Бэклог', 'К выполнению', 'В работе', 'На проверке', 'Готово']
+TAG_NAMES = [('Баг', '#d9534f'), ('Фича', '#5cb85c'), ('Срочно', '#f0ad4e'), ('Дизайн', '#5bc0de'),
+             ('Техдолг', '#6f42c1'), ('Документация', '#337ab7')]
+WORDS = ('настроить проверить исправить добавить обновить перенести описать обсудить доску карточку '
+         'колонку шаблон форму отчет тест миграцию индекс запрос экспорт импорт профиль аватар поиск '
+         'комментарий уведомление интеграцию релиз сборку ошибку страницу API').split()
+
+
+def _sentence(rng, min_words, max_words):
+    words = rng.choices(WORDS, k=rng.randint(min_words, max_words))
+    return ' '.join(words).capitalize()
+
+
+def _insert_returning_ids(connection, table, rows):
+    """Вставляет строки пачками и возвращает их id в порядке rows."""
+    ids = []
+    statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        ids.extend(connection.execute(statement, rows[start:start + INSERT_CHUNK_SIZE]).scalars().all())
+    return ids
+
+
+def _insert(connection, table, rows):
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        connection.execute(insert(table), rows[start:start + INSERT_CHUNK_SIZE])
+
+
+def generate_dataset(users, boards, cards_per_board, comments_per_card, prefix='load', password='password',
+                     members_per_board=5, seed=None):
+    """Создает пользователей, доски, колонки, теги, карточки и комментарии; возвращает счетчики по таблицам.
+
+    Пользователи получают email вида <prefix><n>@example.com и общий пароль.
+    """
+    rng = random.Random(seed)
+    email_template = prefix + '{}@example.com'
+    if User.query.filter(User.email == email_template.format(1)).first():
+        raise ValueError(f"Пользователи с префиксом '{prefix}' уже существуют, выберите другой --prefix.")
+    if users < 1 and boards > 0:
+        raise ValueError("Для создания досок нужен хотя бы один пользователь.")
+
+    password_hash = generate_password_hash(password)  # один хэш на всех: хэширование - самая медленная часть
+    counts = {}
+    now = datetime.utcnow()
+
+    with db.engine.begin() as connection:
+        user_ids = _insert_returning_ids(connection, User.__table__, [
+            {'username': f'{prefix}{n}', 'email': email_template.format(n), 'password_hash': password_hash,
+             'avatar_url': 'default_avatar.png', 'is_admin': False}
+            for n in range(1, users + 1)])
+        counts['user'] = len(user_ids)
+
+        owner_ids = [rng.choice(user_ids) for _ in range(boards)]
+        board_ids = _insert_returning_ids(connection, Board.__table__, [
+            {'name': f'Доска {prefix} {n}', 'user_id': owner_id, 'version': 0}
+            for n, owner_id in enumerate(owner_ids, start=1)])
+        counts['board'] = len(board_ids)
+
+        member_rows = []
+        board_users = {}
+        for board_id, owner_id in zip(board_ids, owner_ids):
+            candidates = [user_id for user_id in user_ids if user_id != owner_id]
+            members = rng.sample(candidates, min(members_per_board, len(candidates)))
+            member_rows.extend({'board_id': board_id, 'user_id': user_id} for user_id in members)
+            board_users[board_id] = [owner_id] + members
+        _insert(connection, board_members, member_rows)
+        counts['board_members'] = len(member_rows)
+
+        column_rows, tag_rows = [], []
+        for board_id in board_ids:
+            column_rows.extend({'board_id': board_id, 'name': name, 'position': position}
+                               for position, name in enumerate(COLUMN_NAMES[:rng.randint(3, len(COLUMN_NAMES))]))
+            tag_rows.extend({'board_id': board_id, 'name': name, 'color': color} for name, color in TAG_NAMES)
+        column_ids = _insert_returning_ids(connection, Column.__table__, column_rows)
+        tag_ids = _insert_returning_ids(connection, Tag.__table__, tag_rows)
+        counts['column'], counts['tag'] = len(column_ids), len(tag_ids)
+
+        board_columns, board_tags = {}, {}
+        for column_id, row in zip(column_ids, column_rows):
+            board_columns.setdefault(row['board_id'], []).append(column_id)
+        for tag_id, row in zip(tag_ids, tag_rows):
+            board_tags.setdefault(row['board_id'], []).append(tag_id)
+
+        card_rows, card_boards = [], []
+        for board_id in board_ids:
+            per_column = {}
+            for _ in range(cards_per_board):
+                column_id = rng.choice(board_columns[board_id])
+                per_column[column_id] = per_column.get(column_id, 0) + 1
+            for column_id, count in per_column.items():
+                for rank in spread_ranks(count):
+                    card_rows.append({'column_id': column_id, 'rank': rank, 'title': _sentence(rng, 2, 6),
+                                      'description': _sentence(rng, 5, 30) if rng.random() < 0.7 else None})
+                    card_boards.append(board_id)
+        card_ids = _insert_returning_ids(connection, Card.__table__, card_rows)
+        counts['card'] = len(card_ids)
+
+        assignee_rows, card_tag_rows, comment_rows = [], [], []
+        for card_id, board_id in zip(card_ids, card_boards):
+            users_on_board = board_users[board_id]
+            for user_id in rng.sample(users_on_board, min(rng.randint(0, 2), len(users_on_board))):
+                assignee_rows.append({'card_id': card_id, 'user_id': user_id})
+            for tag_id in rng.sample(board_tags[board_id], rng.randint(0, 2)):
+                card_tag_rows.append({'card_id': card_id, 'tag_id': tag_id})
+            started = now - timedelta(days=rng.randint(1, 365))
+            for n in range(comments_per_card):
+                comment_rows.append({'card_id': card_id, 'user_id': rng.choice(users_on_board),
+                                     'text': _sentence(rng, 3, 25), 'timestamp': started + timedelta(minutes=17 * n)})
+        _insert(connection, card_assignees, assignee_rows)
+        _insert(connection, card_tags, card_tag_rows)
+        _insert(connection, Comment.__table__, comment_rows)
+        counts['card_assignees'], counts['card_tags'], counts['comment'] = \
+            len(assignee_rows), len(card_tag_rows), len(comment_rows)
+
+    return counts
@@ -0,0 +1,97 @@
+# app/events.py
+
+import json
+import queue
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class Subscription:
+    """Подписка одного SSE-соединения на события доски.
+
+    Очередь ограничена: если клиент не успевает читать события, подписка
+    помечается как переполненная и отключается от брокера, а клиент получает
+    событие reset и сам догружает состояние через /api/boards/<id>/changes.
+    """
+
+    def __init__(self, board_id, max_size):
+        self.board_id = board_id
+        self.queue = queue.Queue(maxsize=max_size)
+        self.overflowed = False
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class BoardEventBroker:
+    """Внутрипроцессный pub/sub: маршруты публикуют изменения, SSE-потоки их читают."""
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, board_id, max_queue_size=None):
+        subscription = Subscription(board_id, max_queue_size or self.max_queue_size)
+        with self._lock:
+            self._subscribers.setdefault(board_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.board_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.board_id]
+
+    def subscriber_count(self, board_id=None):
+        with self._lock:
+            if board_id is not None:
+                return len(self._subscribers.get(board_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, board_id, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(board_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(payload)
+            except queue.Full:
+                # Медленный клиент отключается, чтобы очередь не росла без ограничений
+                subscription.overflowed = True
+                self.unsubscribe(subscription)
+
+
+broker = BoardEventBroker()
+
+
+def queue_board_event(session, board_id, payload):
+    """Откладывает публикацию события до успешного коммита сессии."""
+    session.info.setdefault('pending_board_events', []).append((board_id, payload))
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_pending_board_events(session):
+    for board_id, payload in session.info.pop('pending_board_events', []):
+        broker.publish(board_id, payload)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending_board_events(session, previous_transaction):
+    session.info.pop('pending_board_events', None)
+
+
+def format_sse(data, event_name=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event_name is not None:
+        lines.append(f'event: {event_name}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False))
+    return '\n'.join(lines) + '\n\n'
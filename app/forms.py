@@ -119,9 +119,9 @@ class ChangePasswordForm(FlaskForm):
             raise ValidationError('Неверный текущий пароль.')
 
 class UpdateAvatarForm(FlaskForm):
-    avatar = FileField('Новый аватар (макс 2МБ, jpg, png, gif)',
+    avatar = FileField('Новый аватар (макс 2МБ, jpg, png, gif, webp)',
                        validators=[DataRequired(message="Выберите файл для загрузки."),
-                                   FileAllowed(['jpg', 'jpeg', 'png', 'gif'], 'Разрешены только изображения (jpg, png, gif)!')])
+                                   FileAllowed(['jpg', 'jpeg', 'png', 'gif', 'webp'], 'Разрешены только изображения (jpg, png, gif, webp)!')])
     submit = SubmitField('Загрузить аватар')
 
 class AdminEditUserForm(FlaskForm):
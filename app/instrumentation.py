@@ -0,0 +1,208 @@
+# app/instrumentation.py
+
+# Инструментирование запросов (включается INSTRUMENTATION_ENABLED): число и время SQL-запросов,
+# время рендеринга шаблонов и общее время ответа. Данные запроса копятся в flask.g через события
+# движка SQLAlchemy и сигналы Flask, попадают в заголовок Server-Timing, агрегируются по endpoint
+# для /admin/metrics, а медленные запросы пишутся в лог вместе с самыми долгими SQL.
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+# Сколько последних длительностей на endpoint хранится для расчета перцентилей
+LATENCY_SAMPLES = 1000
+
+
+class RequestMetrics:
+    """Метрики одного HTTP-запроса."""
+
+    def __init__(self, slowest_limit):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.slowest_limit = slowest_limit
+        self.slowest = []  # куча (длительность, порядковый номер, SQL) из самых долгих запросов
+        self._order = itertools.count()
+
+    def add_query(self, statement, duration):
+        self.query_count += 1
+        self.sql_time += duration
+        item = (duration, next(self._order), statement)
+        if len(self.slowest) < self.slowest_limit:
+            heapq.heappush(self.slowest, item)
+        elif self.slowest and duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, item)
+
+    def slowest_statements(self):
+        return [(duration, statement) for duration, _, statement in sorted(self.slowest, reverse=True)]
+
+
+class EndpointStats:
+    __slots__ = ('requests', 'slow_requests', 'errors', 'total_time', 'max_time', 'queries', 'sql_time',
+                 'template_time', 'latencies')
+
+    def __init__(self):
+        self.requests = 0
+        self.slow_requests = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def percentile(self, fraction):
+        values = sorted(self.latencies)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+    def to_dict(self):
+        requests = self.requests or 1
+        return {
+            'requests': self.requests,
+            'slow_requests': self.slow_requests,
+            'errors': self.errors,
+            'avg_ms': self.total_time / requests * 1000,
+            'p50_ms': self.percentile(0.50) * 1000,
+            'p95_ms': self.percentile(0.95) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000,
+            'max_ms': self.max_time * 1000,
+            'avg_queries': self.queries / requests,
+            'avg_sql_ms': self.sql_time / requests * 1000,
+            'avg_template_ms': self.template_time / requests * 1000,
+            'total_time': self.total_time,
+            'queries': self.queries,
+            'sql_time': self.sql_time,
+            'template_time': self.template_time,
+        }
+
+
+class MetricsRegistry:
+    """Агрегированные по endpoint метрики процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.started_at = time.time()
+
+    def record(self, endpoint, metrics, duration, status_code, slow):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, EndpointStats())
+            stats.requests += 1
+            stats.slow_requests += int(slow)
+            stats.errors += int(status_code >= 500)
+            stats.total_time += duration
+            stats.max_time = max(stats.max_time, duration)
+            stats.queries += metrics.query_count
+            stats.sql_time += metrics.sql_time
+            stats.template_time += metrics.template_time
+            stats.latencies.append(duration)
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: stats.to_dict() for endpoint, stats in sorted(self._endpoints.items())}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self.started_at = time.time()
+
+    def to_prometheus(self, prefix='kanban'):
+        lines = []
+        series = [
+            ('requests_total', 'counter', 'Обработано запросов', 'requests'),
+            ('slow_requests_total', 'counter', 'Запросов медленнее порога', 'slow_requests'),
+            ('server_errors_total', 'counter', 'Ответов с кодом 5xx', 'errors'),
+            ('sql_queries_total', 'counter', 'Выполнено SQL-запросов', 'queries'),
+            ('sql_duration_seconds_total', 'counter', 'Суммарное время SQL', 'sql_time'),
+            ('template_duration_seconds_total', 'counter', 'Суммарное время рендеринга шаблонов', 'template_time'),
+        ]
+        snapshot = self.snapshot()
+        for name, metric_type, help_text, key in series:
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} {metric_type}')
+            for endpoint, stats in snapshot.items():
+                lines.append(f'{prefix}_{name}{{endpoint="{endpoint}"}} {stats[key]:.6g}')
+        # Время ответа - summary: перцентили по последним запросам, сумма и число за время работы процесса
+        name = f'{prefix}_request_duration_seconds'
+        lines.append(f'# HELP {name} Время ответа')
+        lines.append(f'# TYPE {name} summary')
+        for endpoint, stats in snapshot.items():
+            for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms')):
+                lines.append(f'{name}{{endpoint="{endpoint}",quantile="{quantile}"}} {stats[key] / 1000:.6g}')
+            lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {stats["total_time"]:.6g}')
+            lines.append(f'{name}_count{{endpoint="{endpoint}"}} {stats["requests"]}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+def _current_metrics():
+    return g.get('request_metrics') if has_request_context() else None
+
+
+def init_instrumentation(app, engine):
+    """Подключает сбор метрик к приложению и движку БД; метрики собираются, пока включен INSTRUMENTATION_ENABLED."""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_metrics() is not None:
+            conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        request_metrics = _current_metrics()
+        started = conn.info.get('query_started')
+        if request_metrics is not None and started:
+            request_metrics.add_query(statement, time.perf_counter() - started.pop())
+
+    @before_render_template.connect_via(app)
+    def _before_render(sender, template, context, **extra):
+        if _current_metrics() is not None:
+            g.setdefault('template_started', []).append(time.perf_counter())
+
+    @template_rendered.connect_via(app)
+    def _after_render(sender, template, context, **extra):
+        request_metrics = _current_metrics()
+        started = g.get('template_started')
+        if request_metrics is not None and started:
+            request_metrics.template_time += time.perf_counter() - started.pop()
+
+    @app.before_request
+    def _start_request_metrics():
+        if app.config.get('INSTRUMENTATION_ENABLED'):
+            g.request_metrics = RequestMetrics(app.config.get('SLOW_REQUEST_LOGGED_STATEMENTS', 5))
+
+    @app.after_request
+    def _finish_request_metrics(response):
+        request_metrics = g.pop('request_metrics', None)
+        if request_metrics is None:
+            return response
+        duration = time.perf_counter() - request_metrics.started
+        endpoint = request.endpoint or 'unknown'
+        # Для потоковых ответов (SSE) учитывается время до начала передачи тела
+        response.headers.add('Server-Timing', ', '.join([
+            f'db;dur={request_metrics.sql_time * 1000:.1f};desc="{request_metrics.query_count} SQL"',
+            f'tpl;dur={request_metrics.template_time * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ]))
+        slow = duration * 1000 >= app.config.get('SLOW_REQUEST_THRESHOLD_MS', 500)
+        metrics.record(endpoint, request_metrics, duration, response.status_code, slow)
+        if slow:
+            statements = '\n'.join(f'  {statement_time * 1000:.1f} мс: {" ".join(statement.split())[:500]}'
+                                   for statement_time, statement in request_metrics.slowest_statements())
+            app.logger.warning(
+                f"Медленный запрос {request.method} {request.full_path.rstrip('?')} ({endpoint}): "
+                f"{duration * 1000:.0f} мс, SQL: {request_metrics.query_count} запросов за "
+                f"{request_metrics.sql_time * 1000:.0f} мс, шаблоны: {request_metrics.template_time * 1000:.0f} мс\n"
+                f"Самые долгие SQL:\n{statements}")
+        return response
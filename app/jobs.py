@@ -0,0 +1,231 @@
+# app/jobs.py
+
+# Очередь фоновых задач, хранящаяся в таблице job.
+# Задача добавляется в сессию вместе с изменениями, которые ее породили, и видна воркерам
+# только после коммита. Воркеры - потоки веб-процесса (JOBS_INPROCESS_WORKERS) или отдельный
+# процесс `flask jobs run`. Задача захватывается условным UPDATE (status = 'queued'), поэтому
+# несколько воркеров не выполнят ее дважды. Упавшая задача повторяется с экспоненциальной
+# задержкой до max_attempts раз; зависшие в running (процесс умер) возвращаются в очередь
+# через JOBS_LOCK_TIMEOUT секунд.
+
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Job
+
+JOB_HANDLERS = {}
+
+
+class PermanentJobError(Exception):
+    """Ошибка, которую бессмысленно повторять: задача сразу помечается как failed."""
+
+
+def job_handler(kind, max_attempts=5):
+    """Регистрирует функцию как обработчик задач вида kind; аргументы берутся из payload."""
+    def decorator(func):
+        JOB_HANDLERS[kind] = (func, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(kind, payload=None, delay=0, unique_key=None):
+    """Добавляет задачу в текущую сессию, она будет выполнена после коммита.
+
+    Если unique_key задан и такая задача уже ждет выполнения, новая не создается.
+    """
+    if kind not in JOB_HANDLERS:
+        raise LookupError(f"Неизвестный вид задачи: {kind!r}")
+    if unique_key is not None:
+        pending = Job.query.filter_by(kind=kind, unique_key=unique_key, status='queued').first()
+        if pending:
+            return pending
+    job = Job(kind=kind, payload=json.dumps(payload or {}, ensure_ascii=False), unique_key=unique_key,
+              max_attempts=JOB_HANDLERS[kind][1], run_at=datetime.utcnow() + timedelta(seconds=delay))
+    db.session.add(job)
+    db.session.info['jobs_enqueued'] = True
+    return job
+
+
+def backoff_delay(attempt, base, maximum):
+    """Задержка перед повтором: base * 2^(attempt-1) с разбросом +-20%, не больше maximum."""
+    return min(base * 2 ** (attempt - 1), maximum) * random.uniform(0.8, 1.2)
+
+
+def claim_next_job():
+    """Захватывает самую раннюю готовую к выполнению задачу, возвращает ее id или None."""
+    now = datetime.utcnow()
+    candidate_ids = db.session.execute(
+        select(Job.id).where(Job.status == 'queued', Job.run_at <= now).order_by(Job.run_at, Job.id).limit(5)
+    ).scalars().all()
+    for job_id in candidate_ids:
+        claimed = db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == 'queued')
+            .values(status='running', locked_at=now, attempts=Job.attempts + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return job_id
+    return None
+
+
+def run_job(job_id, config):
+    """Выполняет захваченную задачу; True при успехе."""
+    job = db.session.get(Job, job_id)
+    kind, payload = job.kind, json.loads(job.payload or '{}')
+    try:
+        if kind not in JOB_HANDLERS:
+            raise PermanentJobError(f"Нет обработчика для задачи {kind!r}")
+        JOB_HANDLERS[kind][0](**payload)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        _record_failure(job_id, e, config)
+        return False
+    db.session.execute(update(Job).where(Job.id == job_id)
+                       .values(status='done', finished_at=datetime.utcnow(), last_error=None)
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+    return True
+
+
+def _record_failure(job_id, error, config):
+    job = db.session.get(Job, job_id)
+    now = datetime.utcnow()
+    job.last_error = f'{type(error).__name__}: {error}'[:2000]
+    if isinstance(error, PermanentJobError) or job.attempts >= job.max_attempts:
+        job.status, job.finished_at = 'failed', now
+        current_app.logger.error(f"Job {job_id} ({job.kind}) failed after {job.attempts} attempts: {error}",
+                                 exc_info=error)
+    else:
+        delay = backoff_delay(job.attempts, config['JOBS_BACKOFF_BASE'], config['JOBS_BACKOFF_MAX'])
+        job.status, job.run_at, job.locked_at = 'queued', now + timedelta(seconds=delay), None
+        current_app.logger.warning(f"Job {job_id} ({job.kind}) attempt {job.attempts} failed, "
+                                   f"retry in {delay:.0f}s: {error}")
+    db.session.commit()
+
+
+def requeue_stale_jobs(lock_timeout):
+    """Возвращает в очередь задачи, которые слишком долго в running (воркер завершился аварийно)."""
+    now = datetime.utcnow()
+    count = db.session.execute(
+        update(Job).where(Job.status == 'running', Job.locked_at < now - timedelta(seconds=lock_timeout))
+        .values(status='queued', run_at=now, locked_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return count
+
+
+def purge_finished_jobs(retention):
+    """Удаляет выполненные задачи старше retention секунд; упавшие остаются для разбора."""
+    count = db.session.execute(
+        delete(Job).where(Job.status == 'done', Job.finished_at < datetime.utcnow() - timedelta(seconds=retention))
+    ).rowcount
+    db.session.commit()
+    return count
+
+
+def run_pending_jobs(config, limit=None):
+    """Выполняет готовые задачи, пока они есть (или limit штук); возвращает число выполненных."""
+    processed = 0
+    while limit is None or processed < limit:
+        job_id = claim_next_job()
+        if job_id is None:
+            break
+        run_job(job_id, config)
+        processed += 1
+    return processed
+
+
+class JobWorker:
+    """Пул потоков, выполняющих задачи; просыпается по коммиту новых задач или по таймеру."""
+
+    def __init__(self, app, threads=1, poll_interval=5.0):
+        self.app = app
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._last_maintenance = 0.0
+
+    def start(self):
+        for n in range(self.threads):
+            thread = threading.Thread(target=self._loop, name=f'job-worker-{n + 1}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def wake(self):
+        self._wakeup.set()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _maintenance(self):
+        # Возврат зависших и удаление старых задач - не чаще раза в минуту на процесс
+        with _worker_lock:
+            if time.monotonic() - self._last_maintenance < 60:
+                return
+            self._last_maintenance = time.monotonic()
+        requeue_stale_jobs(self.app.config['JOBS_LOCK_TIMEOUT'])
+        purge_finished_jobs(self.app.config['JOBS_RETENTION'])
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    self._maintenance()
+                    job_id = claim_next_job()
+                    if job_id is not None:
+                        run_job(job_id, self.app.config)
+                        continue
+            except Exception as e:
+                self.app.logger.error(f"Job worker error: {e}", exc_info=True)
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_inprocess_worker(app):
+    """Потоки-воркеры веб-процесса, запускаются при первой задаче (0 потоков - только `flask jobs run`)."""
+    global _worker
+    threads = app.config.get('JOBS_INPROCESS_WORKERS', 0)
+    if threads <= 0:
+        return None
+    with _worker_lock:
+        if _worker is None:
+            _worker = JobWorker(app, threads, app.config['JOBS_POLL_INTERVAL']).start()
+    return _worker
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_workers(session):
+    if session.info.pop('jobs_enqueued', False):
+        worker = get_inprocess_worker(current_app._get_current_object())
+        if worker is not None:
+            worker.wake()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_enqueued_jobs(session, previous_transaction):
+    session.info.pop('jobs_enqueued', None)
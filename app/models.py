@@ -1,30 +1,42 @@
 # app/models.py
 
 from app import db, login_manager
-from flask_login import UserMixin
+from flask_login import UserMixin, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy.orm import backref
-from sqlalchemy import UniqueConstraint 
-from flask import url_for
+from sqlalchemy.orm import Session, backref, object_session
+from sqlalchemy import UniqueConstraint, Index, bindparam, event, exists, func, or_, select, update
+from flask import url_for, current_app, has_request_context
 from datetime import datetime
+import json
+from app.events import queue_board_event
+from app.ranking import rank_between, spread_ranks
+from app.permissions import cached_board_membership
+from app.avatars import avatar_filename, parse_avatar_name, pick_size
 
+# Первичный ключ (user_id, card_id) покрывает поиск карточек по исполнителю,
+# обратный индекс нужен для загрузки исполнителей по карточкам
 card_assignees = db.Table('card_assignees',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True),
-    db.Column('card_id', db.Integer, db.ForeignKey('card.id', ondelete='CASCADE'), primary_key=True)
+    db.Column('card_id', db.Integer, db.ForeignKey('card.id', ondelete='CASCADE'), primary_key=True),
+    Index('ix_card_assignees_card_user', 'card_id', 'user_id')
 )
 
+# Первичный ключ (card_id, tag_id) покрывает теги карточки, обратный индекс - фильтр по тегу
 card_tags = db.Table('card_tags',
     db.Column('card_id', db.Integer, db.ForeignKey('card.id', ondelete='CASCADE'), primary_key=True),
-    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True)
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True),
+    Index('ix_card_tags_tag_card', 'tag_id', 'card_id')
 )
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return db.session.get(User, int(user_id))
 
+# Первичный ключ (user_id, board_id) покрывает доски пользователя, обратный индекс - участников доски
 board_members = db.Table('board_members',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True),
-    db.Column('board_id', db.Integer, db.ForeignKey('board.id', ondelete='CASCADE'), primary_key=True)
+    db.Column('board_id', db.Integer, db.ForeignKey('board.id', ondelete='CASCADE'), primary_key=True),
+    Index('ix_board_members_board_user', 'board_id', 'user_id')
 )
 
 class User(UserMixin, db.Model):
@@ -47,12 +59,36 @@ class User(UserMixin, db.Model):
         return check_password_hash(self.password_hash, password)
 
     def can_edit_board(self, board):
-        return board.owner == self or self in board.members
+        return board.deleted_at is None and (board.user_id == self.id or self.is_board_member(board.id))
 
     def can_delete_board(self, board):
-        return board.owner == self
+        return board.deleted_at is None and board.user_id == self.id
+
+    def is_board_member(self, board_id, use_cache=True):
+        # Один EXISTS по первичному ключу board_members, ответ кэшируется (см. app/permissions.py)
+        def load():
+            return db.session.query(
+                exists().where(board_members.c.user_id == self.id, board_members.c.board_id == board_id)
+            ).scalar()
+        return cached_board_membership(self.id, board_id, load) if use_cache else load()
     
-    def get_avatar(self):
+    def touch_boards(self, action='updated'):
+        # Имя и аватар пользователя входят в состояние всех его досок: на каждой доске
+        # записывается изменение участника, чтобы журнал, ETag и SSE-события оставались согласованными
+        shared_board_ids = select(board_members.c.board_id).where(board_members.c.user_id == self.id)
+        boards = Board.query.filter(or_(Board.user_id == self.id, Board.id.in_(shared_board_ids)),
+                                    Board.deleted_at.is_(None)).order_by(Board.id).all()
+        data = {'id': self.id, 'username': self.username, 'avatar_url': self.get_avatar()} \
+            if action == 'updated' else None
+        for board in boards:
+            board.record_change('member', action, self.id, data)
+
+    def get_avatar(self, size=64):
+        # size - нужный размер в пикселях, для обработанных аватаров выбирается ближайшая миниатюра
+        parsed = parse_avatar_name(self.avatar_url)
+        if parsed:
+            size = pick_size(current_app.config['AVATAR_SIZES'], size)
+            return url_for('avatar_file', filename=avatar_filename(*parsed, size))
         if self.avatar_url and self.avatar_url != 'default_avatar.png':
              return url_for('static', filename=f'avatars/{self.avatar_url}')
         return url_for('static', filename='images/default_avatar.png')
@@ -64,14 +100,41 @@ class Board(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False) 
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Растет при каждом изменении доски
+    deleted_at = db.Column(db.DateTime, nullable=True) # Доска удалена, ее строки удаляет фоновая задача board.purge
     columns = db.relationship('Column', backref='board', lazy=True, cascade="all, delete-orphan", order_by='Column.position')
     tags = db.relationship('Tag', backref='board', lazy='dynamic', cascade="all, delete-orphan") # Связь с тегами
 
+    __table_args__ = (Index('ix_board_user_id', 'user_id', 'id'),)
+
     def get_eligible_assignees(self):
         assignees = [self.owner] + self.members.all()
         unique_assignees = list({user.id: user for user in assignees}.values())
         return sorted(unique_assignees, key=lambda u: u.username.lower())
 
+    def record_change(self, entity, action, entity_id, data=None):
+        # Инкремент выполняется в UPDATE на стороне БД, параллельные запросы не теряют изменения
+        revision = db.session.execute(
+            update(Board.__table__).where(Board.__table__.c.id == self.id)
+            .values(version=Board.__table__.c.version + 1)
+            .returning(Board.__table__.c.version)
+        ).scalar_one()
+        db.session.expire(self, ['version'])
+        user_id = current_user.id if has_request_context() and current_user.is_authenticated else None
+        change = BoardChange(board_id=self.id, revision=revision, entity=entity, action=action, entity_id=entity_id,
+                             user_id=user_id, data=json.dumps(data, ensure_ascii=False) if data is not None else None)
+        db.session.add(change)
+        queue_board_event(db.session(), self.id, change.to_dict())
+        retention = current_app.config.get('BOARD_CHANGES_RETENTION')
+        if retention:
+            BoardChange.query.filter(BoardChange.board_id == self.id, BoardChange.revision <= revision - retention) \
+                .delete(synchronize_session=False)
+        return revision
+
+    @property
+    def state_etag(self):
+        return f'board-{self.id}-v{self.version}'
+
     def __repr__(self):
         return f'<Board {self.name}>'
 
@@ -80,7 +143,25 @@ class Column(db.Model):
     name = db.Column(db.String(100), nullable=False)
     position = db.Column(db.Integer, nullable=False, default=0) 
     board_id = db.Column(db.Integer, db.ForeignKey('board.id'), nullable=False)
-    cards = db.relationship('Card', backref='column', lazy='dynamic', cascade="all, delete-orphan")
+    cards = db.relationship('Card', backref='column', lazy='dynamic', cascade="all, delete-orphan", order_by='Card.rank')
+
+    __table_args__ = (Index('ix_column_board_position', 'board_id', 'position'),)
+
+    def last_card_rank(self):
+        return db.session.query(func.max(Card.rank)).filter(Card.column_id == self.id).scalar()
+
+    def rebalance_card_ranks(self):
+        # Переназначает короткие равномерные ранги всем карточкам колонки, порядок не меняется
+        rows = db.session.query(Card.id, Card.rank).filter(Card.column_id == self.id) \
+            .order_by(Card.rank, Card.id).with_for_update().all()
+        params = [{'card_id': card_id, 'rank': new_rank}
+                  for (card_id, old_rank), new_rank in zip(rows, spread_ranks(len(rows))) if old_rank != new_rank]
+        if params:
+            card_table = Card.__table__
+            db.session.execute(update(card_table).where(card_table.c.id == bindparam('card_id')), params)
+            db.session.expire_all()
+            self.board.record_change('column', 'rebalanced', self.id)
+        return len(params)
 
     def __repr__(self):
         return f'<Column {self.name}>'
@@ -90,6 +171,7 @@ class Card(db.Model):
     title = db.Column(db.String(150), nullable=False)
     description = db.Column(db.Text, nullable=True)
     column_id = db.Column(db.Integer, db.ForeignKey('column.id'), nullable=False)
+    rank = db.Column(db.String(64), nullable=False) # Дробный ранг для порядка внутри колонки, см. app/ranking.py
     
     assignees = db.relationship(
         'User', secondary=card_assignees,
@@ -103,9 +185,31 @@ class Card(db.Model):
     )
     
 
+    __table_args__ = (Index('ix_card_column_rank', 'column_id', 'rank'),)
+
     def __repr__(self):
         return f'<Card {self.title}>'
 
+
+@event.listens_for(Card, 'before_insert')
+def _assign_card_rank(mapper, connection, card):
+    # Новая карточка без явного ранга ставится в конец своей колонки
+    if card.rank is not None:
+        return
+    tails = object_session(card).info.setdefault('card_rank_tails', {})
+    last_rank = tails.get(card.column_id)
+    if last_rank is None:
+        last_rank = connection.execute(
+            select(func.max(Card.__table__.c.rank)).where(Card.__table__.c.column_id == card.column_id)
+        ).scalar()
+    card.rank = rank_between(last_rank, None)
+    tails[card.column_id] = card.rank
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _reset_card_rank_tails(session, flush_context):
+    session.info.pop('card_rank_tails', None)
+
 class Tag(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
@@ -120,12 +224,66 @@ class Tag(db.Model):
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, index=True, nullable=False, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     card_id = db.Column(db.Integer, db.ForeignKey('card.id', ondelete='CASCADE'), nullable=False)
 
     author = db.relationship('User', backref=db.backref('comments', lazy='dynamic', cascade="all, delete-orphan"))
     card = db.relationship('Card', backref=db.backref('comments', lazy='dynamic', cascade="all, delete-orphan"))
 
+    # Постраничная выборка комментариев карточки идет по ключу (timestamp, id)
+    __table_args__ = (Index('ix_comment_card_timestamp_id', 'card_id', 'timestamp', 'id'),)
+
+    def __repr__(self):
+        return f'<Comment {self.id} by User {self.author.username if self.author else "Unknown"} on Card {self.card_id}>'
+
+class BoardChange(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    board_id = db.Column(db.Integer, db.ForeignKey('board.id', ondelete='CASCADE'), nullable=False)
+    revision = db.Column(db.Integer, nullable=False)
+    entity = db.Column(db.String(20), nullable=False) # card, column, tag, comment, board, member
+    action = db.Column(db.String(20), nullable=False) # created, updated, moved, deleted
+    entity_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), nullable=True) # Автор изменения
+    data = db.Column(db.Text, nullable=True) # JSON с новым состоянием сущности
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    board = db.relationship('Board', backref=db.backref('changes', lazy='dynamic', cascade="all, delete-orphan"))
+
+    __table_args__ = (Index('ix_board_change_board_revision', 'board_id', 'revision', unique=True),)
+
+    def to_dict(self):
+        return {
+            'revision': self.revision,
+            'entity': self.entity,
+            'action': self.action,
+            'id': self.entity_id,
+            'user_id': self.user_id,
+            'data': json.loads(self.data) if self.data else None,
+        }
+
+    def __repr__(self):
+        return f'<BoardChange {self.board_id}@{self.revision} {self.entity} {self.action}>'
+
+class Job(db.Model):
+    """Фоновая задача (см. app/jobs.py): хранится в БД и переживает перезапуск процесса."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=True) # JSON с аргументами обработчика
+    unique_key = db.Column(db.String(100), nullable=True) # Одна ожидающая задача на ключ
+    status = db.Column(db.String(10), nullable=False, default='queued') # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow) # Не раньше этого времени
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_job_status_run_at', 'status', 'run_at'),
+        Index('ix_job_kind_unique_key', 'kind', 'unique_key'),
+    )
+
     def __repr__(self):
-        return f'<Comment {self.id} by User {self.author.username if self.author else "Unknown"} on Card {self.card_id}>'
\ No newline at end of file
+        return f'<Job {self.id} {self.kind} {self.status}>'
@@ -0,0 +1,93 @@
+# app/permissions.py
+
+# Кэш проверок доступа к доскам.
+# Ответ "является ли пользователь участником доски" запоминается на время запроса (flask.g)
+# и в небольшом LRU-кэше процесса с ограниченным временем жизни. Маршруты, меняющие
+# состав участников, сбрасывают соответствующие записи после коммита; в других процессах
+# устаревший ответ живет не дольше BOARD_ACCESS_CACHE_TTL секунд.
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, has_app_context
+
+
+class TTLCache:
+    """Потокобезопасный LRU-кэш, записи которого устаревают через ttl секунд."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def discard_where(self, predicate):
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_membership_cache = None
+_MISSING = object()
+
+
+def _get_membership_cache():
+    global _membership_cache
+    if _membership_cache is None:
+        _membership_cache = TTLCache(current_app.config.get('BOARD_ACCESS_CACHE_SIZE', 1024),
+                                     current_app.config.get('BOARD_ACCESS_CACHE_TTL', 30))
+    return _membership_cache
+
+
+def cached_board_membership(user_id, board_id, loader):
+    """Возвращает loader() для пары (пользователь, доска), по возможности из кэша."""
+    key = (user_id, board_id)
+    request_cache = g.setdefault('board_membership', {}) if has_app_context() else {}
+    value = request_cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    cache = _get_membership_cache() if current_app.config.get('BOARD_ACCESS_CACHE_TTL', 30) > 0 else None
+    value = cache.get(key, _MISSING) if cache is not None else _MISSING
+    if value is _MISSING:
+        value = loader()
+        if cache is not None:
+            cache.set(key, value)
+    request_cache[key] = value
+    return value
+
+
+def invalidate_board_membership(board_id=None, user_id=None):
+    """Сбрасывает закэшированные ответы по доске, пользователю или их паре."""
+    def matches(key):
+        return (board_id is None or key[1] == board_id) and (user_id is None or key[0] == user_id)
+
+    if _membership_cache is not None:
+        _membership_cache.discard_where(matches)
+    if has_app_context() and 'board_membership' in g:
+        for key in [key for key in g.board_membership if matches(key)]:
+            del g.board_membership[key]
@@ -0,0 +1,90 @@
+# app/ranking.py
+
+# Дробные лексикографические ранги карточек.
+# Ранг - строка цифр base36, которая читается как дробь 0.d1d2d3...; строки без
+# нулей на конце сравниваются лексикографически так же, как соответствующие дроби,
+# поэтому между любыми двумя рангами всегда есть место для нового.
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+
+def _midpoint(lower, upper):
+    # lower < upper, upper=None означает верхнюю границу 1.0
+    if upper is not None:
+        n = 0
+        while (lower[n] if n < len(lower) else '0') == upper[n]:
+            n += 1
+        if n > 0:
+            return upper[:n] + _midpoint(lower[n:], upper[n:])
+    digit_lower = DIGITS.index(lower[0]) if lower else 0
+    digit_upper = DIGITS.index(upper[0]) if upper is not None else BASE
+    if digit_upper - digit_lower > 1:
+        return DIGITS[(digit_lower + digit_upper) // 2]
+    if upper is not None and len(upper) > 1:
+        return upper[0]
+    return DIGITS[digit_lower] + _midpoint(lower[1:], None)
+
+
+def _validate(rank):
+    if rank is not None and (not rank or rank[-1] == '0' or any(c not in DIGITS for c in rank)):
+        raise ValueError(f'Некорректный ранг: {rank!r}')
+
+
+def is_valid_rank(rank, max_length=None):
+    """Подходит ли значение как ранг: непустая строка цифр base36 без нулей на конце."""
+    if not isinstance(rank, str) or (max_length is not None and len(rank) > max_length):
+        return False
+    try:
+        _validate(rank)
+    except ValueError:
+        return False
+    return True
+
+
+def rank_between(before, after):
+    """Возвращает ранг строго между before и after (None - открытая граница)."""
+    _validate(before)
+    _validate(after)
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f'Ранги не упорядочены: {before!r} >= {after!r}')
+
+    if after is None and before is not None:
+        # Добавление в конец: увеличиваем первую цифру, которую еще можно увеличить,
+        # так строка растет на один символ только раз в ~35 вставок
+        for i, char in enumerate(before):
+            if char != DIGITS[-1]:
+                return before[:i] + DIGITS[DIGITS.index(char) + 1]
+        return before + DIGITS[1]
+    if before is None and after is not None:
+        # Добавление в начало: симметрично уменьшаем первую цифру больше '1'
+        for i, char in enumerate(after):
+            if DIGITS.index(char) > 1:
+                return after[:i] + DIGITS[DIGITS.index(char) - 1]
+    return _midpoint(before or '', after)
+
+
+def ranks_between(before, after, count):
+    """count возрастающих рангов подряд между before и after."""
+    ranks = []
+    for _ in range(count):
+        before = rank_between(before, after)
+        ranks.append(before)
+    return ranks
+
+
+def spread_ranks(count):
+    """Равномерно распределенные ранги минимальной длины для count карточек."""
+    width = 1
+    while BASE ** width <= count:
+        width += 1
+    step = BASE ** width // (count + 1)
+    ranks = []
+    for i in range(1, count + 1):
+        value = i * step
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        ranks.append(''.join(reversed(digits)).rstrip('0'))
+    return ranks
@@ -1,17 +1,29 @@
 # app/routes.py
 
-from flask import render_template, flash, redirect, url_for, request, jsonify, abort
+from flask import render_template, flash, redirect, url_for, request, jsonify, abort, Response, send_from_directory, \
+    stream_with_context
 from flask_login import login_user, logout_user, current_user, login_required
 from werkzeug.security import generate_password_hash
-from werkzeug.utils import secure_filename
 from app import app, db 
 from app.forms import (
     LoginForm, RegistrationForm, BoardForm, ColumnForm, CardForm, CommentForm, 
     InviteUserForm, UpdateAccountForm, ChangePasswordForm, UpdateAvatarForm, AdminEditUserForm,
     TagForm 
 )
-from app.models import User, Board, Column, Card, Comment, Tag 
-from sqlalchemy import or_, exc
+from app.models import User, Board, Column, Card, Comment, Tag, BoardChange, card_assignees, card_tags, board_members
+from app.board_snapshot import load_board_snapshot, load_filtered_card_ids, load_filtered_cards
+from app.events import broker, format_sse
+from app.ranking import ranks_between
+from app.search import search_cards
+from app.permissions import invalidate_board_membership
+from app.instrumentation import metrics
+from app.avatars import AvatarError, probe_image, store_upload
+from app.board_archive import archive_filename, encode_archive, export_board_records
+from app.jobs import enqueue
+from app import tasks  # регистрирует обработчики фоновых задач
+from app.serializers import CardEditorData, card_to_dict, comments_to_dict
+from sqlalchemy import or_, exc, func, select, delete, update, bindparam, tuple_
+from sqlalchemy.orm import joinedload
 import os
 from functools import wraps
 from wtforms import SelectField, SelectMultipleField
@@ -40,6 +52,112 @@ def _populate_tag_choices(form, board):
         board_tags = board.tags.order_by(Tag.name).all()
         form.tags.choices = [(tag.id, tag.name) for tag in board_tags]
 
+def _card_change_data(card, assignee_ids, tag_ids):
+    return {'id': card.id, 'title': card.title, 'description': card.description or "",
+            'column_id': card.column_id, 'rank': card.rank,
+            'assignee_ids': sorted(assignee_ids), 'tag_ids': sorted(tag_ids)}
+
+def _replace_card_links(value_column, card_id, current_ids, new_ids):
+    """Приводит связи карточки в card_assignees/card_tags к new_ids: один DELETE и один INSERT."""
+    table = value_column.table
+    removed_ids, added_ids = current_ids - new_ids, new_ids - current_ids
+    if removed_ids:
+        db.session.execute(delete(table).where(table.c.card_id == card_id, value_column.in_(removed_ids)))
+    if added_ids:
+        db.session.execute(table.insert(), [{'card_id': card_id, value_column.key: value_id}
+                                            for value_id in sorted(added_ids)])
+
+def _neighbour_ranks(column, data, moved_card_ids):
+    """Ранги соседей, между которыми встанут карточки: по индексу или по ID соседей."""
+    siblings = db.session.query(Card.rank).filter(Card.column_id == column.id, Card.id.notin_(moved_card_ids))
+
+    if 'index' in data:
+        index = data['index']
+        if not isinstance(index, int) or isinstance(index, bool) or index < 0:
+            raise ValueError("Некорректная позиция карточки.")
+        if index == 0:
+            return None, siblings.order_by(Card.rank, Card.id).limit(1).scalar()
+        rows = siblings.order_by(Card.rank, Card.id).offset(index - 1).limit(2).all()
+        if not rows:
+            return siblings.order_by(Card.rank.desc(), Card.id.desc()).limit(1).scalar(), None
+        return rows[0].rank, rows[1].rank if len(rows) > 1 else None
+
+    try:
+        prev_id = int(data['prev_card_id']) if data.get('prev_card_id') is not None else None
+        next_id = int(data['next_card_id']) if data.get('next_card_id') is not None else None
+    except (TypeError, ValueError):
+        raise ValueError("Некорректные ID соседних карточек.")
+    neighbour_ids = {card_id for card_id in (prev_id, next_id) if card_id is not None}
+    neighbours = {}
+    if neighbour_ids:
+        neighbours = dict(db.session.query(Card.id, Card.rank).filter(
+            Card.id.in_(neighbour_ids), Card.column_id == column.id, Card.id.notin_(moved_card_ids)).all())
+        if len(neighbours) != len(neighbour_ids):
+            raise ValueError("Соседние карточки не найдены в целевой колонке.")
+
+    prev_rank, next_rank = neighbours.get(prev_id), neighbours.get(next_id)
+    if prev_rank is not None and next_rank is None:
+        next_rank = siblings.filter(Card.rank > prev_rank).order_by(Card.rank).limit(1).scalar()
+    elif next_rank is not None and prev_rank is None:
+        prev_rank = siblings.filter(Card.rank < next_rank).order_by(Card.rank.desc()).limit(1).scalar()
+    elif prev_rank is None and next_rank is None:
+        prev_rank = siblings.order_by(Card.rank.desc()).limit(1).scalar()
+    return prev_rank, next_rank
+
+def _ranks_for_move(column, data, moved_card_ids):
+    prev_rank, next_rank = _neighbour_ranks(column, data, moved_card_ids)
+    if prev_rank is not None and next_rank is not None and prev_rank >= next_rank:
+        # Одинаковые ранги у соседей: выравниваем колонку и пересчитываем
+        column.rebalance_card_ranks()
+        prev_rank, next_rank = _neighbour_ranks(column, data, moved_card_ids)
+    new_ranks = ranks_between(prev_rank, next_rank, len(moved_card_ids))
+    if max(len(rank) for rank in new_ranks) > app.config['CARD_RANK_MAX_LENGTH']:
+        column.rebalance_card_ranks()
+        new_ranks = ranks_between(*_neighbour_ranks(column, data, moved_card_ids), len(moved_card_ids))
+    return new_ranks
+
+def _schedule_rank_rebalance(column_id):
+    # Пока задача ждет выполнения, повторные запросы на ту же колонку ее не дублируют
+    enqueue('rank.rebalance', {'column_id': column_id}, unique_key=str(column_id))
+
+def _comment_change_data(comment):
+    return {'id': comment.id, 'card_id': comment.card_id, 'user_id': comment.user_id, 'text': comment.text,
+            'timestamp': comment.timestamp.strftime('%d.%m.%Y %H:%M')}
+
+
+DASHBOARD_PAGE_SIZE = 50
+
+def _get_board_or_404(board_id):
+    # Удаленная доска недоступна сразу, хотя ее строки еще удаляются в фоне
+    return Board.query.filter_by(id=board_id, deleted_at=None).first_or_404()
+
+
+def _dashboard_boards(user_id, before_id, limit):
+    """Доски пользователя (свои и общие) одной страницей по убыванию id: (строки, есть_еще).
+
+    Имя владельца, число участников и карточек и время последнего изменения считаются
+    в том же запросе коррелированными подзапросами по индексам. Страницы режутся только
+    по id, поэтому last_activity на порядок не влияет; он равен None, если журнал доски
+    пуст (доски, созданные до появления журнала).
+    """
+    shared_board_ids = select(board_members.c.board_id).where(board_members.c.user_id == user_id)
+    member_count = select(func.count()).where(board_members.c.board_id == Board.id) \
+        .correlate(Board).scalar_subquery()
+    card_count = select(func.count(Card.id)).join(Column, Column.id == Card.column_id) \
+        .where(Column.board_id == Board.id).correlate(Board).scalar_subquery()
+    last_activity = select(BoardChange.timestamp).where(BoardChange.board_id == Board.id) \
+        .order_by(BoardChange.revision.desc()).limit(1).correlate(Board).scalar_subquery()
+
+    query = select(Board.id, Board.name, Board.user_id, User.username.label('owner_username'),
+                   member_count.label('member_count'), card_count.label('card_count'),
+                   last_activity.label('last_activity')) \
+        .join(User, User.id == Board.user_id) \
+        .where(or_(Board.user_id == user_id, Board.id.in_(shared_board_ids)), Board.deleted_at.is_(None))
+    if before_id is not None:
+        query = query.where(Board.id < before_id)
+    rows = db.session.execute(query.order_by(Board.id.desc()).limit(limit + 1)).all()
+    return rows[:limit], len(rows) > limit
+
 
 @app.route('/')
 @app.route('/index')
@@ -56,20 +174,18 @@ def dashboard():
     if form.validate_on_submit():
         new_board = Board(name=form.name.data, owner=current_user)
         db.session.add(new_board)
+        db.session.flush()
+        # Первая запись журнала: у новой доски сразу есть время последнего изменения
+        new_board.record_change('board', 'created', new_board.id, {'name': new_board.name})
         db.session.commit()
         flash(f'Доска "{new_board.name}" успешно создана!', 'success')
         return redirect(url_for('dashboard'))
 
-    owned_boards = current_user.owned_boards.order_by(Board.id.desc()).all()
-    shared_boards_list = current_user.shared_boards.order_by(Board.id.desc()).all()
-
-    all_boards_dict = {board.id: board for board in owned_boards}
-    for board in shared_boards_list:
-        if board.id not in all_boards_dict:
-             all_boards_dict[board.id] = board
-    all_user_boards = sorted(all_boards_dict.values(), key=lambda b: b.id, reverse=True)
-
-    return render_template('dashboard.html', title='Мои доски', form=form, boards=all_user_boards)
+    before = request.args.get('before', type=int)
+    boards, has_more = _dashboard_boards(current_user.id, before, DASHBOARD_PAGE_SIZE)
+    next_before = boards[-1].id if has_more else None
+    return render_template('dashboard.html', title='Мои доски', form=form, boards=boards,
+                           next_before=next_before, is_first_page=before is None)
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -134,6 +250,7 @@ def edit_account():
     if form.validate_on_submit():
         current_user.username = form.username.data
         current_user.email = form.email.data
+        current_user.touch_boards()
         db.session.commit()
         flash('Данные профиля успешно обновлены.', 'success')
     else:
@@ -160,36 +277,37 @@ def change_password():
                     flash(f"Ошибка смены пароля ({getattr(form, field).label.text}): {error}", 'danger')
     return redirect(url_for('profile'))
 
+@app.route('/avatars/<path:filename>')
+def avatar_file(filename):
+    # Имя содержит хэш содержимого: файл по этому URL никогда не меняется
+    response = send_from_directory(app.config['UPLOADED_AVATARS_DEST'], filename,
+                                   max_age=app.config['AVATAR_CACHE_MAX_AGE'])
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/profile/update_avatar', methods=['POST'])
 @login_required
 def update_avatar():
     form = UpdateAvatarForm()
     if form.validate_on_submit():
-        file = form.avatar.data
-        filename = secure_filename(file.filename)
-        _, f_ext = os.path.splitext(filename)
-        if not f_ext: 
-            flash('Файл должен иметь расширение (например, .jpg, .png).', 'warning')
+        # Здесь только проверка заголовка файла, декодирование и миниатюры делает фоновая задача
+        pending_dir = app.config['UPLOADS_PENDING_DEST']
+        try:
+            probe_image(form.avatar.data.stream)
+            upload = store_upload(pending_dir, form.avatar.data.stream)
+        except AvatarError as e:
+            flash(f"Ошибка загрузки аватара: {e}", 'danger')
             return redirect(url_for('profile'))
-            
-        avatar_fn = f"user_{current_user.id}{f_ext.lower()}"
-        
-        if current_user.avatar_url and current_user.avatar_url != 'default_avatar.png':
-            try:
-                old_avatar_path = os.path.join(app.config['UPLOADED_AVATARS_DEST'], current_user.avatar_url)
-                if os.path.exists(old_avatar_path) and os.path.isfile(old_avatar_path):
-                    os.remove(old_avatar_path)
-            except Exception as e:
-                app.logger.error(f"Error deleting old avatar: {e}")
 
-        file_path = os.path.join(app.config['UPLOADED_AVATARS_DEST'], avatar_fn)
         try:
-            file.save(file_path)
-            current_user.avatar_url = avatar_fn
+            enqueue('avatar.process', {'user_id': current_user.id, 'upload': upload})
             db.session.commit()
-            flash('Аватар успешно обновлен.', 'success')
+            flash('Аватар загружен и появится через несколько секунд.', 'success')
         except Exception as e:
-            app.logger.error(f"Error saving avatar: {e}")
+            db.session.rollback()
+            os.remove(os.path.join(pending_dir, upload))
+            app.logger.error(f"Error saving avatar: {e}", exc_info=True)
             flash('Не удалось сохранить аватар. Попробуйте еще раз.', 'danger')
     else:
         for field, errors in form.errors.items():
@@ -205,11 +323,23 @@ def admin_dashboard():
     users = User.query.order_by(User.id).all()
     return render_template('admin_dashboard.html', title='Панель администратора', users=users)
 
+@app.route('/admin/metrics')
+@login_required
+@admin_required
+def admin_metrics():
+    # ?format=prometheus - текстовый формат для сборщика метрик
+    if request.args.get('format') == 'prometheus':
+        return Response(metrics.to_prometheus(), mimetype='text/plain; version=0.0.4')
+    return render_template('admin_metrics.html', title='Метрики запросов', endpoints=metrics.snapshot(),
+                           enabled=app.config['INSTRUMENTATION_ENABLED'],
+                           threshold=app.config['SLOW_REQUEST_THRESHOLD_MS'],
+                           started_at=datetime.fromtimestamp(metrics.started_at))
+
 @app.route('/admin/user/<int:user_id>/edit', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def admin_edit_user(user_id):
-    user_to_edit = User.query.get_or_404(user_id)
+    user_to_edit = db.get_or_404(User, user_id)
     form = AdminEditUserForm(original_username=user_to_edit.username, obj=user_to_edit if request.method == 'GET' else None)
 
     if form.validate_on_submit():
@@ -221,6 +351,7 @@ def admin_edit_user(user_id):
         
         user_to_edit.username = form.username.data
         user_to_edit.is_admin = form.is_admin.data
+        user_to_edit.touch_boards()
         db.session.commit()
         flash(f'Данные пользователя {user_to_edit.username} обновлены.', 'success')
         return redirect(url_for('admin_dashboard'))
@@ -237,18 +368,23 @@ def admin_edit_user(user_id):
 @login_required
 @admin_required
 def admin_delete_user(user_id):
-    user_to_delete = User.query.get_or_404(user_id)
+    user_to_delete = db.get_or_404(User, user_id)
     if user_to_delete == current_user:
         flash('Вы не можете удалить свой собственный аккаунт из панели администратора.', 'danger')
         return redirect(url_for('admin_dashboard'))
     
-    if user_to_delete.owned_boards.count() > 0:
+    if user_to_delete.owned_boards.filter_by(deleted_at=None).count() > 0:
         flash(f'Нельзя удалить пользователя {user_to_delete.username}, так как он владеет досками. Сначала удалите или переназначьте его доски.', 'warning')
         return redirect(url_for('admin_dashboard'))
+    if user_to_delete.owned_boards.count() > 0:
+        flash(f'Доски пользователя {user_to_delete.username} еще удаляются. Повторите попытку позже.', 'warning')
+        return redirect(url_for('admin_dashboard'))
 
     username = user_to_delete.username
+    user_to_delete.touch_boards('deleted')
     db.session.delete(user_to_delete)
     db.session.commit()
+    invalidate_board_membership(user_id=user_id)
     flash(f'Пользователь {username} удален.', 'success')
     return redirect(url_for('admin_dashboard'))
 
@@ -256,7 +392,7 @@ def admin_delete_user(user_id):
 @app.route('/boards/<int:board_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_board(board_id):
-    board = Board.query.get_or_404(board_id)
+    board = _get_board_or_404(board_id)
     if not current_user.can_delete_board(board): 
         flash('У вас нет прав для редактирования этой доски.', 'danger')
         return redirect(url_for('view_board', board_id=board.id))
@@ -266,6 +402,7 @@ def edit_board(board_id):
 
     if form.validate_on_submit() and 'submit_board_name' in request.form:
         board.name = form.name.data
+        board.record_change('board', 'updated', board.id, {'name': board.name})
         db.session.commit()
         flash('Название доски успешно обновлено!', 'success')
         return redirect(url_for('edit_board', board_id=board.id))
@@ -274,24 +411,44 @@ def edit_board(board_id):
         form.name.data = board.name
     
     board_members_list = board.members.all()
-    is_owner = (current_user == board.owner)
+    is_owner = (current_user.id == board.user_id)
 
     return render_template('edit_board.html', title=f'Настройки доски: {board.name}', 
                            form=form, invite_form=invite_form, board=board,
                            board_members=board_members_list, is_owner=is_owner)
 
 
+@app.route('/boards/<int:board_id>/export', methods=['GET'])
+@login_required
+def export_board(board_id):
+    board = _get_board_or_404(board_id)
+    if not current_user.can_delete_board(board):
+        flash('У вас нет прав для экспорта этой доски.', 'danger')
+        return redirect(url_for('view_board', board_id=board.id))
+
+    # Архив формируется по мере отдачи клиенту, доска целиком в память не загружается
+    response = Response(stream_with_context(encode_archive(export_board_records(board), compress=True)),
+                        mimetype='application/gzip')
+    response.headers['Content-Disposition'] = f'attachment; filename="{archive_filename(board)}"'
+    return response
+
+
 @app.route('/boards/<int:board_id>/delete', methods=['POST'])
 @login_required
 def delete_board(board_id):
-    board_to_delete = Board.query.get_or_404(board_id)
+    board_to_delete = _get_board_or_404(board_id)
     if not current_user.can_delete_board(board_to_delete):
         flash('У вас нет прав для удаления этой доски.', 'danger')
         return redirect(url_for('dashboard'))
 
     board_name = board_to_delete.name
-    db.session.delete(board_to_delete) 
+    # Доска сразу скрывается, а ее строки удаляются в фоне небольшими пачками (app/board_purge.py):
+    # каскадное удаление через ORM загружало бы всю доску в память и держало бы запись одной транзакцией
+    board_to_delete.deleted_at = datetime.utcnow()
+    board_to_delete.record_change('board', 'deleted', board_id)
+    enqueue('board.purge', {'board_id': board_id}, unique_key=str(board_id))
     db.session.commit()
+    invalidate_board_membership(board_id=board_id)
     flash(f'Доска "{board_name}" удалена.', 'success')
     return redirect(url_for('dashboard'))
 
@@ -299,8 +456,9 @@ def delete_board(board_id):
 @app.route('/boards/<int:board_id>/cards/<int:card_id_in_url>', methods=['GET'])
 @login_required
 def view_board(board_id, card_id_in_url=None):
-    board = Board.query.get_or_404(board_id)
-    if not current_user.can_edit_board(board):
+    board = _get_board_or_404(board_id)
+    can_edit = current_user.can_edit_board(board)
+    if not can_edit:
         flash('У вас нет доступа к этой доске.', 'danger')
         return redirect(url_for('dashboard'))
 
@@ -309,45 +467,44 @@ def view_board(board_id, card_id_in_url=None):
     comment_form = CommentForm() 
     tag_form = TagForm() 
 
-    _populate_assignee_choices(card_form, board) 
-    _populate_tag_choices(card_form, board) 
-
     if request.method == 'POST': 
         if column_form.validate_on_submit() and 'submit_column' in request.form: 
             last_column = Column.query.filter_by(board_id=board.id).order_by(Column.position.desc()).first()
             new_position = (last_column.position + 1) if last_column else 0
             new_column = Column(name=column_form.name.data, board_id=board.id, position=new_position)
             db.session.add(new_column)
+            db.session.flush()
+            board.record_change('column', 'created', new_column.id,
+                                {'id': new_column.id, 'name': new_column.name, 'position': new_column.position})
             db.session.commit()
             flash(f'Колонка "{new_column.name}" добавлена.', 'success')
             redirect_url = url_for('view_board', board_id=board.id, card_id_in_url=card_id_in_url) if card_id_in_url else url_for('view_board', board_id=board.id)
             return redirect(redirect_url)
 
-    columns = board.columns
-    
+    # Вся доска загружается фиксированным числом запросов, шаблон работает только со снимком
+    snapshot = load_board_snapshot(board)
+    card_form.assignees.choices = [(user.id, user.username) for user in snapshot.eligible_assignees]
+    card_form.tags.choices = [(tag.id, tag.name) for tag in snapshot.tags]
+
     card_to_open = None
     if card_id_in_url:
-        card_to_open_query = Card.query.join(Column).filter(Card.id == card_id_in_url, Column.board_id == board_id)
-        card_to_open = card_to_open_query.first()
+        card_to_open = snapshot.cards_by_id.get(card_id_in_url)
         if not card_to_open:
             flash(f'Карточка с ID {card_id_in_url} не найдена на этой доске.', 'warning')
             return redirect(url_for('view_board', board_id=board_id))
-    
-    board_all_users = board.get_eligible_assignees() 
-    board_all_tags = board.tags.order_by(Tag.name).all()
-
 
     return render_template('board.html', title=f"{board.name}", board=board,
-                           columns=columns, column_form=column_form, card_form=card_form,
+                           columns=snapshot.columns, column_form=column_form, card_form=card_form,
                            comment_form=comment_form, tag_form=tag_form, 
                            card_id_to_open_on_load=card_to_open.id if card_to_open else None,
-                           board_all_users=board_all_users, board_all_tags=board_all_tags)
+                           board_all_users=snapshot.eligible_assignees, board_all_tags=snapshot.tags,
+                           can_edit=can_edit, can_delete=current_user.can_delete_board(board))
 
 
 @app.route('/boards/<int:board_id>/invite', methods=['POST'])
 @login_required
 def invite_to_board(board_id):
-    board = Board.query.get_or_404(board_id)
+    board = _get_board_or_404(board_id)
     if not current_user.can_delete_board(board): 
         flash('Только владелец доски может приглашать участников.', 'danger')
         return redirect(url_for('edit_board', board_id=board.id, _anchor='members-management'))
@@ -359,13 +516,15 @@ def invite_to_board(board_id):
 
         if not user_to_invite:
             flash(f'Пользователь с email/именем "{identifier}" не найден.', 'warning')
-        elif user_to_invite == board.owner:
+        elif user_to_invite.id == board.user_id:
              flash('Владелец уже имеет полный доступ к доске.', 'info')
-        elif user_to_invite in board.members.all():
+        elif user_to_invite.is_board_member(board.id, use_cache=False):
             flash(f'Пользователь "{user_to_invite.username}" уже является участником этой доски.', 'info')
         else:
             board.members.append(user_to_invite)
+            board.record_change('member', 'created', user_to_invite.id, {'id': user_to_invite.id, 'username': user_to_invite.username})
             db.session.commit()
+            invalidate_board_membership(board.id, user_to_invite.id)
             flash(f'Пользователь "{user_to_invite.username}" успешно приглашен на доску "{board.name}".', 'success')
     else:
         for field, errors in invite_form.errors.items():
@@ -376,8 +535,8 @@ def invite_to_board(board_id):
 @app.route('/boards/<int:board_id>/members/<int:user_id>/remove', methods=['POST'])
 @login_required
 def remove_from_board(board_id, user_id):
-    board = Board.query.get_or_404(board_id)
-    user_to_remove = User.query.get_or_404(user_id)
+    board = _get_board_or_404(board_id)
+    user_to_remove = db.get_or_404(User, user_id)
     can_remove = False
     if current_user.can_delete_board(board): 
         if user_to_remove != current_user: 
@@ -385,22 +544,26 @@ def remove_from_board(board_id, user_id):
         else:
              flash('Владелец не может удалить себя из участников через эту форму. Передайте права или удалите доску.', 'warning')
     elif current_user == user_to_remove: 
-        if user_to_remove != board.owner: 
+        if user_to_remove.id != board.user_id: 
             can_remove = True
     else: 
         flash('У вас нет прав для удаления этого участника.', 'danger')
         return redirect(url_for('edit_board', board_id=board.id, _anchor='members-management'))
 
     if can_remove:
-        if user_to_remove in board.members:
-            board.members.remove(user_to_remove)
-            for column in board.columns: 
-                for card in column.cards:
-                    if user_to_remove in card.assignees:
-                        card.assignees.remove(user_to_remove)
+        if user_to_remove.is_board_member(board.id, use_cache=False):
+            # Два множественных DELETE в одной транзакции: стоимость не зависит от размера доски
+            board_card_ids = select(Card.id).join(Column, Column.id == Card.column_id) \
+                .where(Column.board_id == board.id)
+            db.session.execute(delete(card_assignees).where(
+                card_assignees.c.user_id == user_to_remove.id, card_assignees.c.card_id.in_(board_card_ids)))
+            db.session.execute(delete(board_members).where(
+                board_members.c.board_id == board.id, board_members.c.user_id == user_to_remove.id))
+            board.record_change('member', 'deleted', user_to_remove.id)
             db.session.commit()
+            invalidate_board_membership(board.id, user_to_remove.id)
             flash(f'Пользователь "{user_to_remove.username}" удален с доски "{board.name}".', 'success')
-        elif user_to_remove == board.owner: 
+        elif user_to_remove.id == board.user_id: 
              flash(f'Пользователь "{user_to_remove.username}" является владельцем и не может быть удален как участник.', 'info')
         else:
             flash(f'Пользователь "{user_to_remove.username}" не найден среди участников этой доски.', 'info')
@@ -409,7 +572,7 @@ def remove_from_board(board_id, user_id):
 @app.route('/columns/<int:column_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_column(column_id):
-    column = Column.query.get_or_404(column_id)
+    column = db.get_or_404(Column, column_id)
     board = column.board
     if not current_user.can_edit_board(board):
         flash('Нет прав для редактирования элементов этой доски.', 'danger')
@@ -417,6 +580,7 @@ def edit_column(column_id):
     form = ColumnForm(obj=column)
     if form.validate_on_submit():
         column.name = form.name.data
+        board.record_change('column', 'updated', column.id, {'id': column.id, 'name': column.name, 'position': column.position})
         db.session.commit()
         flash('Название колонки обновлено.', 'success')
         return redirect(url_for('view_board', board_id=board.id))
@@ -426,13 +590,14 @@ def edit_column(column_id):
 @app.route('/columns/<int:column_id>/delete', methods=['POST'])
 @login_required
 def delete_column(column_id):
-    column_to_delete = Column.query.get_or_404(column_id)
+    column_to_delete = db.get_or_404(Column, column_id)
     board = column_to_delete.board
     if not current_user.can_edit_board(board):
         flash('У вас нет прав для удаления элементов этой доски.', 'danger')
         return redirect(url_for('view_board', board_id=board.id))
     
     column_name = column_to_delete.name
+    board.record_change('column', 'deleted', column_to_delete.id)
     db.session.delete(column_to_delete) 
     db.session.commit()
     flash(f'Колонка "{column_name}" удалена.', 'success')
@@ -442,7 +607,7 @@ def delete_column(column_id):
 @app.route('/columns/<int:column_id>/cards/create', methods=['POST'])
 @login_required
 def create_card(column_id):
-    column = Column.query.get_or_404(column_id)
+    column = db.get_or_404(Column, column_id)
     board = column.board
     if not current_user.can_edit_board(board):
         flash('У вас нет прав для добавления карточек на эту доску.', 'danger')
@@ -458,12 +623,14 @@ def create_card(column_id):
             description=card_form.description.data,
             column_id=column.id
         )
+        assignees_to_add = []
         selected_assignee_ids = card_form.assignees.data 
         if selected_assignee_ids:
             assignees_to_add = User.query.filter(User.id.in_(selected_assignee_ids)).all()
             for user in assignees_to_add:
                 new_card.assignees.append(user)
         
+        tags_to_add = []
         selected_tag_ids = card_form.tags.data
         if selected_tag_ids:
             tags_to_add = Tag.query.filter(Tag.id.in_(selected_tag_ids), Tag.board_id == board.id).all()
@@ -471,6 +638,9 @@ def create_card(column_id):
                 new_card.tags.append(tag)
 
         db.session.add(new_card)
+        db.session.flush()
+        board.record_change('card', 'created', new_card.id, _card_change_data(
+            new_card, [u.id for u in assignees_to_add], [t.id for t in tags_to_add]))
         db.session.commit()
         flash(f'Карточка "{new_card.title}" добавлена в колонку "{column.name}".', 'success')
     else:
@@ -489,7 +659,7 @@ def create_card(column_id):
 @app.route('/cards/<int:card_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_card(card_id):
-    card = Card.query.get_or_404(card_id)
+    card = db.get_or_404(Card, card_id, options=[joinedload(Card.column).joinedload(Column.board)])
     column = card.column
     board = column.board
 
@@ -500,51 +670,18 @@ def edit_card(card_id):
         flash('Нет прав для редактирования карточек на этой доске.', 'danger')
         return redirect(url_for('view_board', board_id=board.id))
 
-    form = CardForm(request.form if request.method == 'POST' else None) 
-    _populate_assignee_choices(form, board) # Populates form.assignees.choices
-    _populate_tag_choices(form, board)      # Populates form.tags.choices
+    editor = CardEditorData(card, board)
 
     if request.method == 'GET':
-        form.title.data = card.title
-        form.description.data = card.description
-        form.assignees.data = [assignee.id for assignee in card.assignees.all()]
-        form.tags.data = [tag.id for tag in card.tags.all()] 
-        
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest': 
-            current_card_assignees_data = [{'id': u.id, 'username': u.username, 'avatar_url': u.get_avatar()} for u in card.assignees.all()]
-            current_card_tags_data = [{'id': t.id, 'name': t.name, 'color': t.color} for t in card.tags.all()]
-            
-            all_board_tags_data = [{'id': t.id, 'name': t.name, 'color': t.color} for t in board.tags.order_by(Tag.name).all()]
-            
-            # Prepare full list of eligible assignees for the board (for checkboxes in modal)
-            all_board_assignees_for_modal = []
-            for user_id, username in form.assignees.choices:
-                user_obj = User.query.get(user_id)
-                if user_obj:
-                    all_board_assignees_for_modal.append({
-                        'id': user_obj.id,
-                        'username': user_obj.username,
-                        'avatar_url': user_obj.get_avatar()
-                    })
-
-            return jsonify(
-                success=True, 
-                card={
-                    'id': card.id, 
-                    'title': card.title, 
-                    'description': card.description or "",
-                    'assignees': current_card_assignees_data, # Current assignees of THIS card
-                    'assignee_ids': [u.id for u in card.assignees.all()],
-                    'tags': current_card_tags_data,          # Current tags of THIS card
-                    'tag_ids': [t.id for t in card.tags.all()] 
-                },
-                all_board_assignees=all_board_assignees_for_modal, # All eligible assignees for the board
-                all_board_tags=all_board_tags_data                 # All tags for the board
-            )
+            return jsonify(success=True, **editor.to_dict())
         else: 
             flash('Для редактирования карточек используется модальное окно.', 'info')
             return redirect(url_for('view_board', board_id=board.id, card_id_in_url=card.id))
 
+    form = CardForm(request.form)
+    form.assignees.choices = editor.assignee_choices
+    form.tags.choices = editor.tag_choices
 
     if request.method == 'POST':
         # Form data for assignees and tags will be submitted based on the hidden SelectMultipleFields
@@ -553,57 +690,25 @@ def edit_card(card_id):
             try:
                 card.title = form.title.data
                 card.description = form.description.data
-                
-                new_assignee_ids = set(form.assignees.data if form.assignees.data else [])
-                current_assignee_ids_on_card = {user.id for user in card.assignees}
-                
-                ids_to_remove_from_card = current_assignee_ids_on_card - new_assignee_ids
-                if ids_to_remove_from_card:
-                    users_to_remove = User.query.filter(User.id.in_(ids_to_remove_from_card)).all()
-                    for user in users_to_remove:
-                        if user in card.assignees: 
-                            card.assignees.remove(user)
-                
-                ids_to_add_to_card = new_assignee_ids - current_assignee_ids_on_card
-                if ids_to_add_to_card:
-                    users_to_add = User.query.filter(User.id.in_(ids_to_add_to_card)).all()
-                    for user in users_to_add:
-                        if user not in card.assignees: 
-                             card.assignees.append(user)
 
+                # Допустимые значения уже проверены формой по участникам и тегам доски из editor,
+                # связи заменяются множественными DELETE и INSERT независимо от их числа
+                new_assignee_ids = set(form.assignees.data if form.assignees.data else [])
                 new_tag_ids = set(form.tags.data if form.tags.data else [])
-                current_tag_ids_on_card = {tag.id for tag in card.tags}
-
-                tag_ids_to_remove = current_tag_ids_on_card - new_tag_ids
-                if tag_ids_to_remove:
-                    tags_to_remove_objs = Tag.query.filter(Tag.id.in_(tag_ids_to_remove)).all()
-                    for tag_obj in tags_to_remove_objs:
-                        if tag_obj in card.tags:
-                            card.tags.remove(tag_obj)
-                
-                tag_ids_to_add = new_tag_ids - current_tag_ids_on_card
-                if tag_ids_to_add:
-                    tags_to_add_objs = Tag.query.filter(Tag.id.in_(tag_ids_to_add), Tag.board_id == board.id).all()
-                    for tag_obj in tags_to_add_objs:
-                        if tag_obj not in card.tags:
-                            card.tags.append(tag_obj)
-                
+                _replace_card_links(card_assignees.c.user_id, card.id,
+                                    {user.id for user in editor.card.assignees}, new_assignee_ids)
+                _replace_card_links(card_tags.c.tag_id, card.id, {tag.id for tag in editor.card.tags}, new_tag_ids)
+
+                card_data = card_to_dict(editor.updated_card(card, new_assignee_ids, new_tag_ids))  # до коммита, пока объекты не устарели
+                board.record_change('card', 'updated', card.id, _card_change_data(
+                    card, card_data['assignee_ids'], card_data['tag_ids']))
+                user_id = current_user.id
                 db.session.commit()
-                app.logger.info(f"Card {card.id} updated successfully by user {current_user.id}.")
+                # После коммита объекты устарели, в лог идут уже известные id без перезагрузки
+                app.logger.info(f"Card {card_id} updated successfully by user {user_id}.")
 
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    assignees_data = [{'id': u.id, 'username': u.username, 'avatar_url': u.get_avatar()} for u in card.assignees.all()]
-                    tags_data = [{'id': t.id, 'name': t.name, 'color': t.color} for t in card.tags.all()]
-
-                    return jsonify(success=True, card={
-                        'id': card.id,
-                        'title': card.title,
-                        'description': card.description or "",
-                        'assignees': assignees_data, 
-                        'assignee_ids': [u.id for u in card.assignees.all()],
-                        'tags': tags_data,
-                        'tag_ids': [t.id for t in card.tags.all()]
-                    })
+                    return jsonify(success=True, card=card_data)
                 else: 
                     flash('Карточка обновлена.', 'success')
                     return redirect(url_for('view_board', board_id=board.id))
@@ -632,7 +737,7 @@ def edit_card(card_id):
 @app.route('/cards/<int:card_id>/delete', methods=['POST'])
 @login_required
 def delete_card(card_id):
-    card_to_delete = Card.query.get_or_404(card_id)
+    card_to_delete = db.get_or_404(Card, card_id)
     column = card_to_delete.column
     board = column.board
     if not current_user.can_edit_board(board):
@@ -642,6 +747,7 @@ def delete_card(card_id):
         return redirect(url_for('view_board', board_id=board.id))
 
     card_title = card_to_delete.title
+    board.record_change('card', 'deleted', card_to_delete.id, {'column_id': card_to_delete.column_id})
     db.session.delete(card_to_delete) 
     db.session.commit()
     
@@ -653,57 +759,365 @@ def delete_card(card_id):
 @app.route('/api/cards/<int:card_id>/move', methods=['POST'])
 @login_required
 def move_card(card_id):
-    card = Card.query.get_or_404(card_id)
+    card = db.get_or_404(Card, card_id)
     board = card.column.board
     if not current_user.can_edit_board(board):
         return jsonify(success=False, error="Нет прав для изменения этой карточки."), 403
 
-    data = request.get_json()
+    data = request.get_json(silent=True)
     if not data or 'new_column_id' not in data:
         return jsonify(success=False, error="Отсутствует ID новой колонки."), 400
 
-    new_column_id = data.get('new_column_id')
-    new_column = Column.query.get(new_column_id)
+    try:
+        new_column = db.session.get(Column, int(data['new_column_id']))
+    except (TypeError, ValueError):
+        new_column = None
     if not new_column or new_column.board_id != board.id:
         return jsonify(success=False, error="Некорректный ID новой колонки."), 400
 
-    if card.column_id != new_column_id:
-        card.column_id = new_column_id
+    position_given = any(key in data for key in ('index', 'prev_card_id', 'next_card_id'))
+    if card.column_id == new_column.id and not position_given:
+        return jsonify(success=True, message="Карточка осталась в той же колонке.")
+
+    try:
+        new_rank = _ranks_for_move(new_column, data, [card.id])[0]
+    except ValueError as e:
+        return jsonify(success=False, error=str(e)), 400
+
+    # Перемещение меняет только одну строку: колонку и ранг самой карточки
+    card.column_id = new_column.id
+    card.rank = new_rank
+    board.record_change('card', 'moved', card.id, {'column_id': new_column.id, 'rank': new_rank})
+    # Задача сохраняется тем же коммитом, что и перемещение
+    if len(new_rank) > app.config['CARD_RANK_REBALANCE_LENGTH']:
+        _schedule_rank_rebalance(new_column.id)
+    db.session.commit()
+    return jsonify(success=True, message="Карточка перемещена.", column_id=new_column.id, rank=new_rank)
+
+
+BATCH_MAX_OPERATIONS = 500
+BATCH_MAX_CARDS_PER_OPERATION = 500
+
+def _batch_id_list(operation, field, single_field=None):
+    values = operation.get(field)
+    if values is None and single_field and operation.get(single_field) is not None:
+        values = [operation[single_field]]
+    if not isinstance(values, list) or not values:
+        raise ValueError(f"Поле '{field}' должно быть непустым списком ID.")
+    if len(values) > BATCH_MAX_CARDS_PER_OPERATION:
+        raise ValueError(f"В поле '{field}' не больше {BATCH_MAX_CARDS_PER_OPERATION} элементов.")
+    try:
+        # ID - целые числа или строки из цифр; bool и дробные числа не принимаются
+        if any(isinstance(value, bool) or not isinstance(value, (int, str)) for value in values):
+            raise TypeError
+        ids = [int(value) for value in values]
+    except (TypeError, ValueError):
+        raise ValueError(f"Поле '{field}' должно содержать числовые ID.")
+    return list(dict.fromkeys(ids))
+
+def _batch_card_ids(operation):
+    """ID карточек операции пакета: (список, None) или (None, описание ошибки)."""
+    if not isinstance(operation, dict):
+        return None, "Операция должна быть объектом."
+    try:
+        return _batch_id_list(operation, 'card_ids', 'card_id'), None
+    except ValueError as e:
+        return None, str(e)
+
+def _apply_batch_operation(operation, parsed_card_ids, context):
+    """Проверяет одну операцию пакета и выполняет ее набором множественных SQL-запросов.
+
+    parsed_card_ids - результат _batch_card_ids для этой операции.
+    """
+    card_ids, error = parsed_card_ids
+    if error:
+        raise ValueError(error)
+    op = operation.get('op')
+    unknown_ids = [card_id for card_id in card_ids if card_id not in context['card_columns']]
+    if unknown_ids:
+        raise ValueError(f"Карточки не найдены на этой доске: {unknown_ids}.")
+
+    if op == 'move':
+        try:
+            column = context['columns'].get(int(operation.get('column_id')))
+        except (TypeError, ValueError):
+            column = None
+        if column is None:
+            raise ValueError("Некорректный ID колонки.")
+        new_ranks = _ranks_for_move(column, operation, card_ids)
+        card_table = Card.__table__
+        db.session.execute(
+            update(card_table).where(card_table.c.id == bindparam('card_id')),
+            [{'card_id': card_id, 'column_id': column.id, 'rank': rank} for card_id, rank in zip(card_ids, new_ranks)]
+        )
+        for card_id in card_ids:
+            context['card_columns'][card_id] = column.id
+        return {'op': op, 'card_ids': card_ids, 'column_id': column.id, 'ranks': new_ranks}
+
+    if op in ('add_tags', 'remove_tags', 'add_assignees', 'remove_assignees'):
+        if op.endswith('_tags'):
+            table, value_column, allowed, field = card_tags, card_tags.c.tag_id, context['tag_ids'], 'tag_ids'
+        else:
+            table, value_column, allowed, field = card_assignees, card_assignees.c.user_id, context['member_ids'], 'user_ids'
+        value_ids = _batch_id_list(operation, field)
+        invalid_ids = [value_id for value_id in value_ids if value_id not in allowed]
+        if invalid_ids:
+            raise ValueError(f"Недопустимые значения в поле '{field}' для этой доски: {invalid_ids}.")
+
+        if op.startswith('remove_'):
+            db.session.execute(delete(table).where(table.c.card_id.in_(card_ids), value_column.in_(value_ids)))
+        else:
+            existing = set(db.session.execute(
+                select(table.c.card_id, value_column).where(table.c.card_id.in_(card_ids), value_column.in_(value_ids))
+            ).all())
+            rows = [{'card_id': card_id, value_column.key: value_id}
+                    for card_id in card_ids for value_id in value_ids if (card_id, value_id) not in existing]
+            if rows:
+                db.session.execute(table.insert(), rows)
+        return {'op': op, 'card_ids': card_ids, field: value_ids}
+
+    if op == 'delete':
+        # Каскады ON DELETE не полагаются на PRAGMA foreign_keys: связанные строки удаляются явно
+        for table in (card_tags, card_assignees, Comment.__table__):
+            db.session.execute(delete(table).where(table.c.card_id.in_(card_ids)))
+        db.session.execute(delete(Card.__table__).where(Card.__table__.c.id.in_(card_ids)))
+        for card_id in card_ids:
+            del context['card_columns'][card_id]
+        return {'op': op, 'card_ids': card_ids}
+
+    raise ValueError(f"Неизвестная операция: {op!r}.")
+
+
+@app.route('/api/boards/<int:board_id>/cards/batch', methods=['POST'])
+@login_required
+def batch_cards(board_id):
+    board = _get_board_or_404(board_id)
+    if not current_user.can_edit_board(board):
+        return jsonify(success=False, error="Нет прав для изменения карточек этой доски."), 403
+
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify(success=False, error="Ожидается непустой список operations."), 400
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return jsonify(success=False, error=f"Не больше {BATCH_MAX_OPERATIONS} операций за запрос."), 400
+    # Без atomic операции независимы: ошибочные отмечаются в results и пропускаются, остальные сохраняются
+    # одним коммитом (success=true, только если применены все). С atomic первая ошибка отменяет весь пакет.
+    atomic = bool(data.get('atomic'))
+
+    # ID карточек разбираются один раз, права и справочники доски загружаются один раз на весь пакет
+    parsed_card_ids = [_batch_card_ids(operation) for operation in operations]
+    requested_card_ids = {card_id for card_ids, _ in parsed_card_ids for card_id in card_ids or ()}
+    columns = Column.query.filter_by(board_id=board.id).all()
+    context = {
+        'columns': {column.id: column for column in columns},
+        'card_columns': dict(db.session.query(Card.id, Card.column_id).filter(
+            Card.id.in_(requested_card_ids), Card.column_id.in_([column.id for column in columns])).all())
+            if requested_card_ids else {},
+        'tag_ids': set(db.session.scalars(select(Tag.id).where(Tag.board_id == board.id))),
+        'member_ids': set(db.session.scalars(
+            select(board_members.c.user_id).where(board_members.c.board_id == board.id))) | {board.user_id},
+    }
+
+    results = []
+    applied = []
+    try:
+        for index, operation in enumerate(operations):
+            try:
+                applied.append(_apply_batch_operation(operation, parsed_card_ids[index], context))
+                results.append({'index': index, 'success': True})
+            except ValueError as e:
+                results.append({'index': index, 'success': False, 'error': str(e)})
+                if atomic:
+                    db.session.rollback()
+                    return jsonify(success=False, error="Пакет отменен: операция с ошибкой.", results=results), 400
+        if applied:
+            board.record_change('cards', 'batch', board.id, {'operations': applied})
+        for operation in applied:
+            if operation['op'] == 'move' and max(map(len, operation['ranks'])) > app.config['CARD_RANK_REBALANCE_LENGTH']:
+                _schedule_rank_rebalance(operation['column_id'])
         db.session.commit()
-        return jsonify(success=True, message="Карточка перемещена.")
-    return jsonify(success=True, message="Карточка осталась в той же колонке.")
+    except exc.SQLAlchemyError as e:
+        db.session.rollback()
+        app.logger.error(f"Error applying card batch on board {board_id}: {e}", exc_info=True)
+        return jsonify(success=False, error="Внутренняя ошибка сервера при выполнении пакета."), 500
+
+    return jsonify(success=all(result['success'] for result in results), revision=board.version, results=results)
+
+
+@app.route('/api/boards/<int:board_id>/state', methods=['GET'])
+@login_required
+def get_board_state(board_id):
+    board = _get_board_or_404(board_id)
+    if not current_user.can_edit_board(board):
+        return jsonify(success=False, error="Нет доступа к этой доске."), 403
+
+    # ETag строится из счетчика версии: неизменившаяся доска отдается как 304 без загрузки карточек
+    etag = board.state_etag
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        snapshot = load_board_snapshot(board)
+        response = jsonify(success=True, board=snapshot.to_dict())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _id_list_arg(name):
+    # Поддерживаются и повторяющиеся параметры (?tag=1&tag=2), и список через запятую (?tag=1,2)
+    ids = []
+    for value in request.args.getlist(name):
+        for part in value.split(','):
+            if part.strip():
+                ids.append(int(part))
+    return list(dict.fromkeys(ids))
+
+
+@app.route('/api/boards/<int:board_id>/cards', methods=['GET'])
+@login_required
+def get_board_cards(board_id):
+    board = _get_board_or_404(board_id)
+    if not current_user.can_edit_board(board):
+        return jsonify(success=False, error="Нет доступа к этой доске."), 403
+
+    try:
+        column_ids = _id_list_arg('column')
+        assignee_ids = _id_list_arg('assignee')
+        tag_ids = _id_list_arg('tag')
+    except ValueError:
+        return jsonify(success=False, error="Параметры column, assignee и tag должны быть числовыми ID."), 400
+    # ?fields=id - только ID всех подходящих карточек, без постраничного ограничения (для фильтра на доске)
+    if request.args.get('fields') == 'id':
+        card_ids = load_filtered_card_ids(board, column_ids, assignee_ids, tag_ids)
+        return jsonify(success=True, revision=board.version, has_more=False, card_ids=card_ids)
+    limit = max(1, min(request.args.get('limit', 500, type=int), 1000))
+    offset = max(request.args.get('offset', 0, type=int), 0)
+
+    cards, has_more = load_filtered_cards(board, column_ids, assignee_ids, tag_ids, limit, offset)
+    return jsonify(success=True, revision=board.version, has_more=has_more,
+                   cards=[card.to_dict() for card in cards])
+
+
+@app.route('/api/boards/<int:board_id>/changes', methods=['GET'])
+@login_required
+def get_board_changes(board_id):
+    board = _get_board_or_404(board_id)
+    if not current_user.can_edit_board(board):
+        return jsonify(success=False, error="Нет доступа к этой доске."), 403
+
+    since = request.args.get('since', type=int)
+    if since is None or since < 0:
+        return jsonify(success=False, error="Параметр since должен быть неотрицательным числом."), 400
+    limit = max(1, min(request.args.get('limit', 500, type=int), 500))
+
+    # Если нужные ревизии уже удалены из журнала, клиент должен заново загрузить /state
+    retention = app.config.get('BOARD_CHANGES_RETENTION')
+    revision = board.version
+    if since > revision or (retention and since < revision - retention):
+        return jsonify(success=True, revision=revision, reset=True, has_more=False, changes=[])
+
+    changes = BoardChange.query.filter(BoardChange.board_id == board.id, BoardChange.revision > since) \
+        .order_by(BoardChange.revision).limit(limit + 1).all()
+    has_more = len(changes) > limit
+    # Ревизия без записи в журнале: применить изменения по порядку нельзя, клиент перезагружает /state
+    if not has_more and len(changes) < revision - since:
+        return jsonify(success=True, revision=revision, reset=True, has_more=False, changes=[])
+    return jsonify(success=True, revision=revision, reset=False, has_more=has_more,
+                   changes=[change.to_dict() for change in changes[:limit]])
+
+
+@app.route('/boards/<int:board_id>/events', methods=['GET'])
+@login_required
+def board_events(board_id):
+    board = _get_board_or_404(board_id)
+    if not current_user.can_edit_board(board):
+        return jsonify(success=False, error="Нет доступа к этой доске."), 403
+
+    revision = board.version
+    subscription = broker.subscribe(board.id, app.config['BOARD_EVENTS_QUEUE_SIZE'])
+    heartbeat = app.config['BOARD_EVENTS_HEARTBEAT']
+    # Долгоживущее соединение не должно удерживать соединение с БД
+    db.session.remove()
+
+    def stream():
+        try:
+            # Клиент сравнивает ревизию со своей и при отставании догружает /changes
+            yield format_sse({'revision': revision}, event_name='hello', event_id=revision)
+            while True:
+                if subscription.overflowed:
+                    yield format_sse({}, event_name='reset')
+                    return
+                payload = subscription.get(timeout=heartbeat)
+                if payload is None:
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_sse(payload, event_name='change', event_id=payload['revision'])
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/api/search', methods=['GET'])
+@login_required
+def search():
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify(success=False, error="Пустой поисковый запрос."), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
+
+    results, has_more = search_cards(current_user.id, query, per_page, (page - 1) * per_page)
+    for result in results:
+        result['url'] = url_for('view_board', board_id=result['board_id'], card_id_in_url=result['card_id'])
+    return jsonify(success=True, query=query, page=page, per_page=per_page, has_more=has_more, results=results)
 
 
 # --- Маршруты для комментариев (AJAX) ---
 
+COMMENTS_PAGE_SIZE = 50
+COMMENTS_MAX_PAGE_SIZE = 200
+
+def _comment_cursor(comment):
+    return f"{comment.timestamp.isoformat()}_{comment.id}"
+
+def _parse_comment_cursor(cursor):
+    timestamp, _, comment_id = cursor.rpartition('_')
+    return datetime.fromisoformat(timestamp), int(comment_id)
+
 @app.route('/cards/<int:card_id>/comments', methods=['GET'])
 @login_required
 def get_comments(card_id):
-    card = Card.query.get_or_404(card_id)
+    card = db.get_or_404(Card, card_id, options=[joinedload(Card.column).joinedload(Column.board)])
     if not current_user.can_edit_board(card.column.board): 
         return jsonify(success=False, error="Нет доступа к комментариям этой карточки."), 403
     
-    comments = card.comments.order_by(Comment.timestamp.asc()).all()
-    comments_data = []
-    for comment in comments:
-        comments_data.append({
-            'id': comment.id,
-            'text': comment.text,
-            'timestamp': comment.timestamp.strftime('%d.%m.%Y %H:%M'),
-            'author': {
-                'id': comment.author.id,
-                'username': comment.author.username,
-                'avatar_url': comment.author.get_avatar()
-            },
-            'can_edit': current_user.id == comment.author.id,
-            'can_delete': current_user.id == comment.author.id
-        })
-    return jsonify(success=True, comments=comments_data)
+    limit = max(1, min(request.args.get('limit', COMMENTS_PAGE_SIZE, type=int), COMMENTS_MAX_PAGE_SIZE))
+    query = Comment.query.filter(Comment.card_id == card.id)
+    before = request.args.get('before')
+    if before:
+        try:
+            query = query.filter(tuple_(Comment.timestamp, Comment.id) < _parse_comment_cursor(before))
+        except ValueError:
+            return jsonify(success=False, error="Некорректный курсор before."), 400
+
+    # Берем самые новые комментарии перед курсором, отдаем их в хронологическом порядке
+    comments = query.order_by(Comment.timestamp.desc(), Comment.id.desc()).limit(limit + 1).all()
+    has_more = len(comments) > limit
+    comments = comments[:limit][::-1]
+
+    comments_data = comments_to_dict(comments, current_user)
+    next_before = _comment_cursor(comments[0]) if has_more else None
+    return jsonify(success=True, comments=comments_data, has_more=has_more, before=next_before)
 
 @app.route('/cards/<int:card_id>/comments/add', methods=['POST'])
 @login_required
 def add_comment(card_id):
-    card = Card.query.get_or_404(card_id)
+    card = db.get_or_404(Card, card_id, options=[joinedload(Card.column).joinedload(Column.board)])
     if not current_user.can_edit_board(card.column.board):
         return jsonify(success=False, error="Вы не можете комментировать на этой доске."), 403
 
@@ -711,19 +1125,11 @@ def add_comment(card_id):
     if form.validate_on_submit():
         comment = Comment(text=form.text.data, author=current_user, card_id=card.id)
         db.session.add(comment)
+        db.session.flush()
+        card.column.board.record_change('comment', 'created', comment.id, _comment_change_data(comment))
+        comment_data = comments_to_dict([comment], current_user, {current_user.id: current_user})[0]
         db.session.commit()
-        return jsonify(success=True, comment={
-            'id': comment.id,
-            'text': comment.text,
-            'timestamp': comment.timestamp.strftime('%d.%m.%Y %H:%M'),
-            'author': {
-                'id': current_user.id,
-                'username': current_user.username,
-                'avatar_url': current_user.get_avatar()
-            },
-            'can_edit': True,
-            'can_delete': True
-        }), 201 
+        return jsonify(success=True, comment=comment_data), 201
     
     errors = {field: error[0] for field, error in form.errors.items()}
     return jsonify(success=False, errors=errors), 400
@@ -732,7 +1138,9 @@ def add_comment(card_id):
 @app.route('/comments/<int:comment_id>/edit', methods=['POST'])
 @login_required
 def edit_comment(comment_id):
-    comment = Comment.query.get_or_404(comment_id)
+    comment = db.get_or_404(Comment, comment_id)
+    if comment.card.column.board.deleted_at is not None:
+        abort(404)
     if comment.author != current_user:
         return jsonify(success=False, error="Вы не можете редактировать этот комментарий."), 403
 
@@ -740,19 +1148,10 @@ def edit_comment(comment_id):
     if form.validate_on_submit():
         comment.text = form.text.data
         comment.timestamp = datetime.utcnow() 
+        comment.card.column.board.record_change('comment', 'updated', comment.id, _comment_change_data(comment))
+        comment_data = comments_to_dict([comment], current_user, {current_user.id: current_user})[0]
         db.session.commit()
-        return jsonify(success=True, comment={
-            'id': comment.id,
-            'text': comment.text,
-            'timestamp': comment.timestamp.strftime('%d.%m.%Y %H:%M'),
-             'author': { 
-                'id': comment.author.id,
-                'username': comment.author.username,
-                'avatar_url': comment.author.get_avatar()
-            },
-            'can_edit': True,
-            'can_delete': True
-        })
+        return jsonify(success=True, comment=comment_data)
     
     errors = {field: error[0] for field, error in form.errors.items()}
     return jsonify(success=False, errors=errors), 400
@@ -761,10 +1160,13 @@ def edit_comment(comment_id):
 @app.route('/comments/<int:comment_id>/delete', methods=['POST'])
 @login_required
 def delete_comment(comment_id):
-    comment = Comment.query.get_or_404(comment_id)
+    comment = db.get_or_404(Comment, comment_id)
+    if comment.card.column.board.deleted_at is not None:
+        abort(404)
     if comment.author != current_user:
         return jsonify(success=False, error="Вы не можете удалить этот комментарий."), 403
     
+    comment.card.column.board.record_change('comment', 'deleted', comment.id, {'card_id': comment.card_id})
     db.session.delete(comment)
     db.session.commit()
     return jsonify(success=True, message="Комментарий удален.")
@@ -775,7 +1177,7 @@ def delete_comment(comment_id):
 @app.route('/api/boards/<int:board_id>/tags', methods=['GET'])
 @login_required
 def get_board_tags(board_id):
-    board = Board.query.get_or_404(board_id)
+    board = _get_board_or_404(board_id)
     if not current_user.can_edit_board(board):
         return jsonify(success=False, error="Нет доступа к тегам этой доски."), 403
     
@@ -786,7 +1188,7 @@ def get_board_tags(board_id):
 @app.route('/api/boards/<int:board_id>/tags/create', methods=['POST'])
 @login_required
 def create_tag_for_board(board_id):
-    board = Board.query.get_or_404(board_id)
+    board = _get_board_or_404(board_id)
     if not current_user.can_edit_board(board): 
         return jsonify(success=False, error="Нет прав для создания тегов на этой доске."), 403
 
@@ -795,6 +1197,8 @@ def create_tag_for_board(board_id):
         try:
             new_tag = Tag(name=form.name.data, color=form.color.data, board_id=board.id)
             db.session.add(new_tag)
+            db.session.flush()
+            board.record_change('tag', 'created', new_tag.id, {'id': new_tag.id, 'name': new_tag.name, 'color': new_tag.color})
             db.session.commit()
             return jsonify(success=True, tag={'id': new_tag.id, 'name': new_tag.name, 'color': new_tag.color}), 201
         except exc.IntegrityError: 
@@ -812,7 +1216,7 @@ def create_tag_for_board(board_id):
 @app.route('/api/tags/<int:tag_id>/edit', methods=['POST'])
 @login_required
 def edit_tag(tag_id):
-    tag_to_edit = Tag.query.get_or_404(tag_id)
+    tag_to_edit = db.get_or_404(Tag, tag_id)
     board = tag_to_edit.board
     if not current_user.can_edit_board(board): 
         return jsonify(success=False, error="Нет прав для редактирования тегов этой доски."), 403
@@ -827,6 +1231,7 @@ def edit_tag(tag_id):
             
             tag_to_edit.name = form.name.data
             tag_to_edit.color = form.color.data
+            board.record_change('tag', 'updated', tag_to_edit.id, {'id': tag_to_edit.id, 'name': tag_to_edit.name, 'color': tag_to_edit.color})
             db.session.commit()
             return jsonify(success=True, tag={'id': tag_to_edit.id, 'name': tag_to_edit.name, 'color': tag_to_edit.color})
         except exc.IntegrityError: 
@@ -844,13 +1249,14 @@ def edit_tag(tag_id):
 @app.route('/api/tags/<int:tag_id>/delete', methods=['POST'])
 @login_required
 def delete_tag(tag_id):
-    tag_to_delete = Tag.query.get_or_404(tag_id)
+    tag_to_delete = db.get_or_404(Tag, tag_id)
     board = tag_to_delete.board
     if not current_user.can_edit_board(board): 
         return jsonify(success=False, error="Нет прав для удаления тегов этой доски."), 403
     
     try:
         tag_name = tag_to_delete.name
+        board.record_change('tag', 'deleted', tag_to_delete.id)
         db.session.delete(tag_to_delete) 
         db.session.commit()
         return jsonify(success=True, message=f'Тег "{tag_name}" удален.')
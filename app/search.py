@@ -0,0 +1,181 @@
+# app/search.py
+
+# Полнотекстовый поиск по карточкам и комментариям на SQLite FTS5.
+# Индекс синхронизируется триггерами на таблицах card и comment, поэтому в него
+# попадают и ORM-изменения, и множественные UPDATE/DELETE (пакетные операции).
+# rowid строки индекса: 2*card.id для карточек и 2*comment.id+1 для комментариев.
+
+import re
+from markupsafe import escape
+from sqlalchemy import event, text
+from app import db
+
+SEARCH_TABLE = 'search_index'
+
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        title, body, kind UNINDEXED, card_id UNINDEXED, comment_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')""",
+    f"""CREATE TRIGGER IF NOT EXISTS card_search_insert AFTER INSERT ON card BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind, card_id, comment_id)
+        VALUES (new.id * 2, new.title, coalesce(new.description, ''), 'card', new.id, NULL);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS card_search_update AFTER UPDATE OF title, description ON card BEGIN
+        UPDATE {SEARCH_TABLE} SET title = new.title, body = coalesce(new.description, '') WHERE rowid = new.id * 2;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS card_search_delete AFTER DELETE ON card BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS comment_search_insert AFTER INSERT ON comment BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind, card_id, comment_id)
+        VALUES (new.id * 2 + 1, '', new.text, 'comment', new.card_id, new.id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS comment_search_update AFTER UPDATE OF text ON comment BEGIN
+        UPDATE {SEARCH_TABLE} SET body = new.text WHERE rowid = new.id * 2 + 1;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS comment_search_delete AFTER DELETE ON comment BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2 + 1;
+    END""",
+]
+
+_SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS card_search_insert',
+    'DROP TRIGGER IF EXISTS card_search_update',
+    'DROP TRIGGER IF EXISTS card_search_delete',
+    'DROP TRIGGER IF EXISTS comment_search_insert',
+    'DROP TRIGGER IF EXISTS comment_search_update',
+    'DROP TRIGGER IF EXISTS comment_search_delete',
+    f'DROP TABLE IF EXISTS {SEARCH_TABLE}',
+]
+
+
+def install_search_index(connection):
+    """Создает FTS5-таблицу и триггеры синхронизации (только SQLite)."""
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in _SQLITE_DDL:
+        connection.exec_driver_sql(statement)
+
+
+def drop_search_index(connection):
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in _SQLITE_DROP:
+        connection.exec_driver_sql(statement)
+
+
+def rebuild_search_index(connection):
+    """Заполняет индекс заново по текущим карточкам и комментариям."""
+    if connection.dialect.name != 'sqlite':
+        return 0
+    install_search_index(connection)
+    connection.exec_driver_sql(f'DELETE FROM {SEARCH_TABLE}')
+    connection.exec_driver_sql(
+        f"""INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind, card_id, comment_id)
+            SELECT id * 2, title, coalesce(description, ''), 'card', id, NULL FROM card""")
+    connection.exec_driver_sql(
+        f"""INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind, card_id, comment_id)
+            SELECT id * 2 + 1, '', text, 'comment', card_id, id FROM comment""")
+    return connection.exec_driver_sql(f'SELECT count(*) FROM {SEARCH_TABLE}').scalar()
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_index(target, connection, **kw):
+    install_search_index(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    drop_search_index(connection)
+
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+# Доски, доступные пользователю: свои и те, где он участник
+_ACCESSIBLE_BOARDS = """(SELECT board.id FROM board WHERE board.user_id = :user_id
+                         UNION SELECT board_members.board_id FROM board_members WHERE board_members.user_id = :user_id)"""
+
+
+def build_match_query(raw_query):
+    """Превращает пользовательский ввод в безопасный FTS5-запрос: все слова, с поиском по префиксу."""
+    words = _WORD_RE.findall(raw_query or '')[:10]
+    return ' '.join('"' + word.replace('"', '') + '"*' for word in words)
+
+
+def _truncate(snippet, length=200):
+    if len(snippet) <= length:
+        return snippet
+    snippet = snippet[:length].rstrip()
+    # Подсветка, оборванная на границе, закрывается: иначе в HTML останется незакрытый <mark>
+    if snippet.rfind(_MARK_START) > snippet.rfind(_MARK_END):
+        snippet += _MARK_END
+    return snippet + '…'
+
+
+def _like_pattern(word):
+    """Шаблон LIKE для поиска подстроки: %, _ и \\ в слове ищутся буквально (ESCAPE '\\')."""
+    return '%' + word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def _snippet_html(snippet):
+    return str(escape(snippet)).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def _fts_rows(params, match_query):
+    params['match'] = match_query
+    return db.session.execute(text(f"""
+        SELECT s.kind, s.card_id, s.comment_id, card.title AS card_title, "column".board_id, board.name AS board_name,
+               snippet({SEARCH_TABLE}, -1, '{_MARK_START}', '{_MARK_END}', '…', 16) AS snippet
+        FROM {SEARCH_TABLE} AS s
+        JOIN card ON card.id = s.card_id
+        JOIN "column" ON "column".id = card.column_id
+        JOIN board ON board.id = "column".board_id
+        WHERE {SEARCH_TABLE} MATCH :match AND board.id IN {_ACCESSIBLE_BOARDS} AND board.deleted_at IS NULL
+        ORDER BY bm25({SEARCH_TABLE}, 10.0, 1.0)
+        LIMIT :limit OFFSET :offset"""), params).mappings().all()
+
+
+def _like_rows(params, raw_query):
+    # Без FTS5 (например, PostgreSQL) - поиск подстроки, карточки раньше комментариев
+    conditions = []
+    for i, word in enumerate(_WORD_RE.findall(raw_query)[:10]):
+        params[f'word{i}'] = _like_pattern(word)
+        conditions.append(f"lower(hit.title || ' ' || hit.body) LIKE lower(:word{i}) ESCAPE '\\'")
+    return db.session.execute(text(f"""
+        SELECT hit.kind, hit.card_id, hit.comment_id, card.title AS card_title, "column".board_id, board.name AS board_name,
+               hit.body AS snippet
+        FROM (SELECT 'card' AS kind, card.id AS card_id, NULL AS comment_id, card.title AS title,
+                     coalesce(card.description, '') AS body, 0 AS sort_group FROM card
+              UNION ALL
+              SELECT 'comment', comment.card_id, comment.id, '', comment.text, 1 FROM comment) AS hit
+        JOIN card ON card.id = hit.card_id
+        JOIN "column" ON "column".id = card.column_id
+        JOIN board ON board.id = "column".board_id
+        WHERE {' AND '.join(conditions)} AND board.id IN {_ACCESSIBLE_BOARDS} AND board.deleted_at IS NULL
+        ORDER BY hit.sort_group, hit.card_id DESC, hit.comment_id DESC
+        LIMIT :limit OFFSET :offset"""), params).mappings().all()
+
+
+def search_cards(user_id, raw_query, limit, offset):
+    """Возвращает (результаты, есть_еще) по доскам пользователя, лучшие совпадения первыми."""
+    match_query = build_match_query(raw_query)
+    if not match_query:
+        return [], False
+    params = {'user_id': user_id, 'limit': limit + 1, 'offset': offset}
+
+    if db.engine.dialect.name == 'sqlite':
+        rows = _fts_rows(params, match_query)
+    else:
+        rows = _like_rows(params, raw_query)
+
+    results = [{
+        'kind': row['kind'],
+        'card_id': row['card_id'],
+        'comment_id': row['comment_id'],
+        'card_title': row['card_title'],
+        'board_id': row['board_id'],
+        'board_name': row['board_name'],
+        'snippet_html': _snippet_html(_truncate(row['snippet'] or '')),
+    } for row in rows[:limit]]
+    return results, len(rows) > limit
@@ -0,0 +1,89 @@
+# app/serializers.py
+
+# JSON-представления карточек и комментариев для AJAX-ответов.
+# Все связанные данные (теги, исполнители, авторы) загружаются пачками, поэтому число
+# SQL-запросов не зависит от числа участников доски, тегов и комментариев.
+
+from app.board_snapshot import CardSnapshot, load_card_relations, load_eligible_assignees
+from app.models import User, Tag
+
+
+def user_to_dict(user):
+    return {'id': user.id, 'username': user.username, 'avatar_url': user.get_avatar()}
+
+
+def tag_to_dict(tag):
+    return {'id': tag.id, 'name': tag.name, 'color': tag.color}
+
+
+def card_to_dict(snapshot):
+    """Карточка с исполнителями и тегами, как ее ожидает модальное окно."""
+    return {
+        'id': snapshot.id,
+        'title': snapshot.title,
+        'description': snapshot.description or "",
+        'column_id': snapshot.column_id,
+        'assignees': [user_to_dict(user) for user in snapshot.assignees],
+        'assignee_ids': [user.id for user in snapshot.assignees],
+        'tags': [tag_to_dict(tag) for tag in snapshot.tags],
+        'tag_ids': [tag.id for tag in snapshot.tags],
+    }
+
+
+def load_card(card):
+    """CardSnapshot одной карточки с тегами и исполнителями (два запроса)."""
+    snapshot = CardSnapshot(card)
+    load_card_relations({card.id: snapshot})
+    return snapshot
+
+
+class CardEditorData:
+    """Все, что нужно для редактирования карточки: сама карточка, участники и теги доски."""
+
+    def __init__(self, card, board):
+        self.card = load_card(card)
+        self.eligible_assignees = load_eligible_assignees(board)
+        self.board_tags = Tag.query.filter_by(board_id=board.id).order_by(Tag.name).all()
+
+    @property
+    def assignee_choices(self):
+        return [(user.id, user.username) for user in self.eligible_assignees]
+
+    @property
+    def tag_choices(self):
+        return [(tag.id, tag.name) for tag in self.board_tags]
+
+    def updated_card(self, card, assignee_ids, tag_ids):
+        """CardSnapshot карточки после изменения из уже загруженных участников и тегов доски."""
+        snapshot = CardSnapshot(card)
+        snapshot.assignees = sorted((user for user in self.eligible_assignees if user.id in assignee_ids),
+                                    key=lambda user: user.id)
+        snapshot.tags = sorted((tag for tag in self.board_tags if tag.id in tag_ids), key=lambda tag: tag.id)
+        return snapshot
+
+    def to_dict(self):
+        return {
+            'card': card_to_dict(self.card),
+            'all_board_assignees': [user_to_dict(user) for user in self.eligible_assignees],
+            'all_board_tags': [tag_to_dict(tag) for tag in self.board_tags],
+        }
+
+
+def comments_to_dict(comments, viewer, authors=None):
+    """Комментарии с авторами; недостающие авторы загружаются одним запросом.
+
+    authors - уже загруженные пользователи {id: User}, например текущий пользователь.
+    """
+    authors = dict(authors or {})
+    missing_ids = {comment.user_id for comment in comments} - set(authors)
+    if missing_ids:
+        authors.update((user.id, user) for user in User.query.filter(User.id.in_(missing_ids)))
+    author_data = {user_id: user_to_dict(user) for user_id, user in authors.items()}  # аватар - один раз на автора
+    return [{
+        'id': comment.id,
+        'text': comment.text,
+        'timestamp': comment.timestamp.strftime('%d.%m.%Y %H:%M'),
+        'author': author_data[comment.user_id],
+        'can_edit': viewer.id == comment.user_id,
+        'can_delete': viewer.id == comment.user_id,
+    } for comment in comments]
@@ -30,6 +30,9 @@ document.addEventListener('DOMContentLoaded', function () {
     const resetFiltersBtn = document.getElementById('resetFiltersBtn');
     
     let columnSortStates = {}; 
+    // ID карточек, прошедших фильтры по исполнителям и тегам на сервере; null - фильтры не выбраны
+    let serverFilteredCardIds = null;
+    let cardFilterRequest = 0;
 
 
     if (cardDetailModalEl) {
@@ -264,7 +267,7 @@ document.addEventListener('DOMContentLoaded', function () {
             .then(({ status, body }) => {
                 if (status === 200 && body.success) {
                     updateCardDisplay(body.card); 
-                    applyFiltersAndSort(); 
+                    refreshCardFilter(); 
 
                     saveButton.textContent = 'Сохранено!';
                     saveButton.classList.remove('btn-primary');
@@ -467,6 +470,7 @@ document.addEventListener('DOMContentLoaded', function () {
                     if (commentsLoader) commentsLoader.style.display = 'none';
                     if (data.success) {
                         renderComments(data.comments);
+                        renderOlderCommentsButton(cardIdToFetch, data.has_more ? data.before : null);
                     } else {
                         commentsListContainer.innerHTML = `<div class="list-group-item text-danger small">${data.error || 'Не удалось загрузить комментарии.'}</div>`;
                     }
@@ -490,6 +494,39 @@ document.addEventListener('DOMContentLoaded', function () {
             });
             commentsListContainer.scrollTop = commentsListContainer.scrollHeight; 
         }
+        // Более ранние комментарии подгружаются страницами по курсору before
+        function renderOlderCommentsButton(cardIdToFetch, beforeCursor) {
+            const existingButton = commentsListContainer.querySelector('.load-older-comments-btn');
+            if (existingButton) existingButton.remove();
+            if (!beforeCursor) return;
+
+            const button = document.createElement('button');
+            button.type = 'button';
+            button.className = 'list-group-item list-group-item-action text-center small text-primary load-older-comments-btn';
+            button.textContent = 'Показать более ранние комментарии';
+            button.addEventListener('click', function () {
+                button.disabled = true;
+                fetch(`/cards/${cardIdToFetch}/comments?before=${encodeURIComponent(beforeCursor)}`)
+                    .then(response => response.json())
+                    .then(data => {
+                        if (!data.success || cardIdToFetch !== currentCardId) {
+                            button.disabled = false;
+                            return;
+                        }
+                        const previousHeight = commentsListContainer.scrollHeight;
+                        const fragment = document.createDocumentFragment();
+                        data.comments.forEach(comment => fragment.appendChild(createCommentElement(comment)));
+                        button.after(fragment);
+                        renderOlderCommentsButton(cardIdToFetch, data.has_more ? data.before : null);
+                        commentsListContainer.scrollTop += commentsListContainer.scrollHeight - previousHeight;
+                    })
+                    .catch(error => {
+                        button.disabled = false;
+                        console.error('Error fetching older comments:', error);
+                    });
+            });
+            commentsListContainer.prepend(button);
+        }
         function createCommentElement(comment) {
             const div = document.createElement('div');
             div.className = 'list-group-item comment-item py-2 px-3';
@@ -927,7 +964,7 @@ document.addEventListener('DOMContentLoaded', function () {
                             }
 
                             updateAllCardTagDisplays(tagId, null, false, true); 
-                            applyFiltersAndSort(); 
+                            refreshCardFilter(); 
                         } else {
                             alert('Ошибка удаления тега: ' + (body.error || body.message || "Неизвестная ошибка."));
                         }
@@ -1003,23 +1040,46 @@ document.addEventListener('DOMContentLoaded', function () {
         });
     } 
 
-    function applyFiltersAndSort() {
-        const searchTerm = searchInput ? searchInput.value.toLowerCase() : '';
-        
-        const selectedAssigneeIds = [];
-        if (filterAssigneesList) {
-            filterAssigneesList.querySelectorAll('.filter-checkbox:checked').forEach(cb => {
-                selectedAssigneeIds.push(cb.value);
-            });
-        }
+    function checkedFilterValues(listElement) {
+        return listElement
+            ? Array.from(listElement.querySelectorAll('.filter-checkbox:checked')).map(cb => cb.value)
+            : [];
+    }
 
-        const selectedTagIds = [];
-        if (filterTagsList) {
-            filterTagsList.querySelectorAll('.filter-checkbox:checked').forEach(cb => {
-                selectedTagIds.push(cb.value);
-            });
+    // Фильтрация по исполнителям и тегам выполняется на сервере, чтобы не разбирать данные всех карточек в браузере
+    function refreshCardFilter() {
+        const selectedAssigneeIds = checkedFilterValues(filterAssigneesList);
+        const selectedTagIds = checkedFilterValues(filterTagsList);
+        const requestNumber = ++cardFilterRequest;
+
+        if ((selectedAssigneeIds.length === 0 && selectedTagIds.length === 0) || !currentBoardId) {
+            serverFilteredCardIds = null;
+            applyFiltersAndSort();
+            return;
         }
 
+        // Нужны только ID, зато все: постраничная выдача скрыла бы подходящие карточки за пределами первой страницы
+        const params = new URLSearchParams({ fields: 'id' });
+        if (selectedAssigneeIds.length > 0) params.set('assignee', selectedAssigneeIds.join(','));
+        if (selectedTagIds.length > 0) params.set('tag', selectedTagIds.join(','));
+
+        fetch(`/api/boards/${currentBoardId}/cards?${params}`, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+            .then(response => response.json())
+            .then(data => {
+                if (requestNumber !== cardFilterRequest) return; // пришел ответ на устаревший запрос
+                if (!data.success) {
+                    console.error('Error filtering cards:', data.error);
+                    return;
+                }
+                serverFilteredCardIds = new Set(data.card_ids.map(cardId => cardId.toString()));
+                applyFiltersAndSort();
+            })
+            .catch(error => console.error('Error filtering cards:', error));
+    }
+
+    function applyFiltersAndSort() {
+        const searchTerm = searchInput ? searchInput.value.toLowerCase() : '';
+
         document.querySelectorAll('.card-list').forEach(columnList => {
             const columnId = columnList.dataset.columnId;
             let visibleCardsInColumn = [];
@@ -1027,28 +1087,11 @@ document.addEventListener('DOMContentLoaded', function () {
             columnList.querySelectorAll('.draggable-card').forEach(cardEl => {
                 const cardTitle = (cardEl.dataset.cardTitle || '').toLowerCase();
                 const cardDescription = (cardEl.dataset.cardDescription || '').toLowerCase();
-                
-                let cardAssignees = [];
-                try { cardAssignees = JSON.parse(cardEl.dataset.cardAssignees || '[]').map(a => a.id.toString()); } 
-                catch (e) { console.warn('Error parsing card assignees for filter:', e, cardEl.dataset.cardAssignees); }
-
-                let cardTags = [];
-                try { cardTags = JSON.parse(cardEl.dataset.cardTags || '[]').map(t => t.id.toString()); }
-                catch (e) { console.warn('Error parsing card tags for filter:', e, cardEl.dataset.cardTags); }
 
                 const searchMatch = searchTerm === '' || cardTitle.includes(searchTerm) || cardDescription.includes(searchTerm);
+                const filterMatch = serverFilteredCardIds === null || serverFilteredCardIds.has(cardEl.dataset.cardId);
 
-                let assigneeMatch = true;
-                if (selectedAssigneeIds.length > 0) {
-                    assigneeMatch = selectedAssigneeIds.some(id => cardAssignees.includes(id));
-                }
-
-                let tagMatch = true;
-                if (selectedTagIds.length > 0) {
-                    tagMatch = selectedTagIds.some(id => cardTags.includes(id));
-                }
-
-                if (searchMatch && assigneeMatch && tagMatch) {
+                if (searchMatch && filterMatch) {
                     cardEl.style.display = '';
                     visibleCardsInColumn.push(cardEl);
                 } else {
@@ -1080,7 +1123,7 @@ document.addEventListener('DOMContentLoaded', function () {
     }
     
     document.querySelectorAll('.filter-checkbox').forEach(checkbox => {
-        checkbox.addEventListener('change', applyFiltersAndSort);
+        checkbox.addEventListener('change', refreshCardFilter);
     });
 
     if (resetFiltersBtn) {
@@ -1095,7 +1138,7 @@ document.addEventListener('DOMContentLoaded', function () {
             });
             columnSortStates = {}; 
 
-            applyFiltersAndSort();
+            refreshCardFilter();
         });
     }
     
@@ -1170,7 +1213,12 @@ document.addEventListener('DOMContentLoaded', function () {
                 updateNoCardsPlaceholder(toList);
                 updateNoCardsPlaceholder(fromList);
 
-                const payload = { new_column_id: newColumnId };
+                // Соседи по DOM определяют новый ранг карточки на сервере
+                const payload = {
+                    new_column_id: newColumnId,
+                    prev_card_id: siblingCardId(itemEl, 'previousElementSibling'),
+                    next_card_id: siblingCardId(itemEl, 'nextElementSibling')
+                };
 
                 if (!csrfTokenForDrag) {
                     console.error('CSRF token not found for drag-and-drop.');
@@ -1198,6 +1246,9 @@ document.addEventListener('DOMContentLoaded', function () {
                     return response.json();
                 })
                 .then(data => {
+                    if (data.success && data.rank) {
+                        itemEl.dataset.cardRank = data.rank;
+                    }
                     if (!data.success) {
                         console.error('Failed to move card (API):', data.error || data.message);
                         fromList.insertBefore(itemEl, fromList.children[oldIndex]);
@@ -1216,6 +1267,13 @@ document.addEventListener('DOMContentLoaded', function () {
             }
         });
     });
+    function siblingCardId(cardEl, direction) {
+        let sibling = cardEl[direction];
+        while (sibling && !sibling.classList.contains('draggable-card')) {
+            sibling = sibling[direction];
+        }
+        return sibling ? parseInt(sibling.dataset.cardId, 10) : null;
+    }
     function updateNoCardsPlaceholder(listElement) {
         if (!listElement) return;
         let placeholder = listElement.querySelector('.no-cards-placeholder');
@@ -1240,4 +1298,79 @@ document.addEventListener('DOMContentLoaded', function () {
         updateNoCardsPlaceholder(list);
     });
     applyFiltersAndSort(); 
+
+    // --- Живые обновления доски (Server-Sent Events) ---
+    const currentUserId = boardContainer ? parseInt(boardContainer.dataset.currentUserId, 10) : null;
+    let knownBoardRevision = boardContainer ? parseInt(boardContainer.dataset.boardVersion, 10) : null;
+
+    function showBoardChangedNotice() {
+        if (document.getElementById('boardChangedNotice')) return;
+        const header = document.querySelector('.board-controls-header');
+        if (!header) return;
+        const notice = document.createElement('div');
+        notice.id = 'boardChangedNotice';
+        notice.className = 'alert alert-info alert-dismissible fade show py-1 px-2 mt-2 mb-0 small';
+        notice.innerHTML = `Доска изменена другими участниками. <a href="#" class="alert-link" id="boardChangedReloadLink">Обновить</a>
+            <button type="button" class="btn-close py-1" data-bs-dismiss="alert" aria-label="Close"></button>`;
+        header.appendChild(notice);
+        document.getElementById('boardChangedReloadLink').addEventListener('click', function (event) {
+            event.preventDefault();
+            window.location.reload();
+        });
+    }
+
+    function applyRemoteBoardChange(change) {
+        if (change.revision && knownBoardRevision !== null && change.revision > knownBoardRevision) {
+            knownBoardRevision = change.revision;
+        }
+        if (currentUserId && change.user_id === currentUserId) return; // Свои изменения уже отображены
+
+        if (change.entity === 'board' && change.action === 'deleted') {
+            window.location.href = '/dashboard'; // Доска удалена владельцем и больше недоступна
+            return;
+        }
+
+        if (change.entity === 'card' && change.action === 'moved' && change.data) {
+            const cardEl = document.getElementById(`card-${change.id}`);
+            const targetList = document.getElementById(`column-${change.data.column_id}`);
+            if (cardEl && targetList) {
+                const fromList = cardEl.parentElement;
+                cardEl.dataset.cardRank = change.data.rank;
+                const nextCardEl = Array.from(targetList.querySelectorAll('.draggable-card'))
+                    .find(el => el !== cardEl && el.dataset.cardRank > change.data.rank);
+                targetList.insertBefore(cardEl, nextCardEl || targetList.querySelector('.no-cards-placeholder'));
+                updateNoCardsPlaceholder(fromList);
+                updateNoCardsPlaceholder(targetList);
+                return;
+            }
+        }
+        if (change.entity === 'card' && change.action === 'deleted') {
+            const cardEl = document.getElementById(`card-${change.id}`);
+            if (cardEl) {
+                const fromList = cardEl.parentElement;
+                cardEl.remove();
+                updateNoCardsPlaceholder(fromList);
+            }
+            return;
+        }
+        if (change.entity === 'comment') return; // Комментарии загружаются при открытии карточки
+        showBoardChangedNotice();
+    }
+
+    if (window.EventSource && currentBoardId) {
+        const boardEvents = new EventSource(`/boards/${currentBoardId}/events`);
+        boardEvents.addEventListener('hello', function (event) {
+            const data = JSON.parse(event.data);
+            if (knownBoardRevision !== null && data.revision > knownBoardRevision) {
+                showBoardChangedNotice(); // Изменения, пропущенные во время переподключения
+            }
+        });
+        boardEvents.addEventListener('change', function (event) {
+            applyRemoteBoardChange(JSON.parse(event.data));
+        });
+        boardEvents.addEventListener('reset', function () {
+            showBoardChangedNotice();
+        });
+        window.addEventListener('beforeunload', () => boardEvents.close());
+    }
 });
\ No newline at end of file
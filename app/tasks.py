@@ -0,0 +1,75 @@
+# app/tasks.py
+
+# Обработчики фоновых задач (см. app/jobs.py). Аргументы задачи - JSON-совместимые значения,
+# объекты БД перечитываются по id: к моменту выполнения они могли измениться или исчезнуть.
+
+import os
+import time
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.avatars import AvatarError, process_avatar, remove_avatar_files, save_avatar
+from app.board_purge import purge_board_batch
+from app.jobs import PermanentJobError, enqueue, job_handler
+from app.models import User, Board, Column
+
+
+@job_handler('rank.rebalance', max_attempts=3)
+def rebalance_column_ranks(column_id):
+    column = db.session.get(Column, column_id)
+    if column:
+        column.rebalance_card_ranks()
+
+
+@job_handler('avatar.process', max_attempts=3)
+def process_uploaded_avatar(user_id, upload):
+    """Превращает загруженный файл в миниатюры аватара и назначает их пользователю."""
+    avatars_dir = current_app.config['UPLOADED_AVATARS_DEST']
+    upload_path = os.path.join(current_app.config['UPLOADS_PENDING_DEST'], os.path.basename(upload))
+    user = db.session.get(User, user_id)
+    if not os.path.exists(upload_path):
+        return  # уже обработан при предыдущей попытке
+    if user is None:
+        os.remove(upload_path)
+        return
+    try:
+        with open(upload_path, 'rb') as f:
+            avatar_name, variants = process_avatar(f, current_app.config['AVATAR_SIZES'],
+                                                   current_app.config['AVATAR_FORMAT'])
+    except AvatarError as e:
+        os.remove(upload_path)
+        raise PermanentJobError(str(e)) from e
+
+    save_avatar(avatars_dir, avatar_name, variants)
+    old_avatar = user.avatar_url
+    user.avatar_url = avatar_name
+    with current_app.test_request_context():  # URL аватара в журнале доски строится через url_for
+        user.touch_boards()
+    db.session.commit()
+    os.remove(upload_path)
+
+    # Файлы с тем же хэшем могут принадлежать другим пользователям, загрузившим ту же картинку
+    if old_avatar != avatar_name and not User.query.filter_by(avatar_url=old_avatar).first():
+        try:
+            remove_avatar_files(avatars_dir, old_avatar, current_app.config['AVATAR_SIZES'])
+        except OSError as e:
+            current_app.logger.error(f"Error deleting old avatar: {e}")
+
+
+@job_handler('board.purge', max_attempts=10)
+def purge_deleted_board(board_id):
+    """Удаляет строки удаленной доски пачками, каждая пачка - отдельная короткая транзакция."""
+    config = current_app.config
+    deleted_at = db.session.execute(select(Board.deleted_at).where(Board.id == board_id)).scalar()
+    if deleted_at is None:
+        return  # доска уже удалена целиком
+    deadline = time.monotonic() + config['BOARD_PURGE_TIME_BUDGET']
+    while purge_board_batch(board_id, config['BOARD_PURGE_BATCH_SIZE']):
+        db.session.commit()
+        if time.monotonic() >= deadline:
+            # Большую доску дочищает следующая задача, очередь не занята одной задачей надолго
+            enqueue('board.purge', {'board_id': board_id}, unique_key=str(board_id))
+            return
+        time.sleep(config['BOARD_PURGE_PAUSE'])
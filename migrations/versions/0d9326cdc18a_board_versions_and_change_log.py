@@ -0,0 +1,50 @@
+"""board versions and change log
+
+Счетчик версии доски (ETag, журнал изменений) и сам журнал board_change.
+ADD COLUMN со значением по умолчанию не перестраивает таблицу ни в SQLite, ни в PostgreSQL 11+.
+
+Revision ID: 0d9326cdc18a
+Revises: 6a252379884b
+Create Date: 2026-10-18 19:33:54.639050
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0d9326cdc18a'
+down_revision = '6a252379884b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('board', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+    op.create_table('board_change',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('board_id', sa.Integer(), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=20), nullable=False),
+        sa.Column('action', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('data', sa.Text(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['board_id'], ['board.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('board_change', schema=None) as batch_op:
+        batch_op.create_index('ix_board_change_board_revision', ['board_id', 'revision'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('board_change', schema=None) as batch_op:
+        batch_op.drop_index('ix_board_change_board_revision')
+
+    op.drop_table('board_change')
+    with op.batch_alter_table('board', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,48 @@
+"""dashboard indexes
+
+Индексы списка досок пользователя: доски по владельцу и участники по доске (для счетчиков).
+В PostgreSQL индексы строятся CONCURRENTLY вне транзакции, чтобы не блокировать запись.
+
+Revision ID: 21f4c4af5478
+Revises: 7aac00114fc4
+Create Date: 2026-10-18 19:47:57.307805
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+INDEXES = [
+    ('ix_board_user_id', 'board', ['user_id', 'id']),
+    ('ix_board_members_board_user', 'board_members', ['board_id', 'user_id']),
+]
+
+
+def _is_postgresql():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+# revision identifiers, used by Alembic.
+revision = '21f4c4af5478'
+down_revision = '7aac00114fc4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True)
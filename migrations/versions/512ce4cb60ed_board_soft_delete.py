@@ -0,0 +1,28 @@
+"""board soft delete
+
+Пометка удаленной доски: доска скрывается сразу, строки удаляются фоновой задачей board.purge.
+
+Revision ID: 512ce4cb60ed
+Revises: 87e01271e464
+Create Date: 2026-10-18 19:57:19.231122
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '512ce4cb60ed'
+down_revision = '87e01271e464'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('board', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('board', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
@@ -0,0 +1,28 @@
+"""full text search index
+
+FTS5-индекс карточек и комментариев с триггерами синхронизации (только SQLite,
+на других СУБД поиск работает без индекса). Индекс сразу заполняется текущими данными.
+
+Revision ID: 7aac00114fc4
+Revises: c433b1a120e3
+Create Date: 2026-10-18 19:33:57.549031
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.search import drop_search_index, rebuild_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = '7aac00114fc4'
+down_revision = 'c433b1a120e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    rebuild_search_index(op.get_bind())
+
+
+def downgrade():
+    drop_search_index(op.get_bind())
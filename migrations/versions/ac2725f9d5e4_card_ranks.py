@@ -0,0 +1,72 @@
+"""card ranks
+
+Дробные ранги карточек. Колонка добавляется сразу NOT NULL с временным значением
+по умолчанию (без перестройки таблицы), затем ранги заполняются пачками по колонкам
+в порядке id - так карточки отображались до появления рангов. В SQLite снять DEFAULT
+без перестройки таблицы нельзя, поэтому там он остается; приложение всегда задает ранг само.
+
+Revision ID: ac2725f9d5e4
+Revises: 0d9326cdc18a
+Create Date: 2026-10-18 19:33:55.603512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BATCH_SIZE = 1000
+
+
+def _spread_ranks(count):
+    # Копия app.ranking.spread_ranks на момент миграции: равномерные ранги минимальной длины
+    width = 1
+    while len(DIGITS) ** width <= count:
+        width += 1
+    step = len(DIGITS) ** width // (count + 1)
+    ranks = []
+    for i in range(1, count + 1):
+        value, digits = i * step, []
+        for _ in range(width):
+            value, digit = divmod(value, len(DIGITS))
+            digits.append(DIGITS[digit])
+        ranks.append(''.join(reversed(digits)).rstrip('0'))
+    return ranks
+
+
+# revision identifiers, used by Alembic.
+revision = 'ac2725f9d5e4'
+down_revision = '0d9326cdc18a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('card', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rank', sa.String(length=64), server_default='i', nullable=False))
+
+    connection = op.get_bind()
+    card = sa.table('card', sa.column('id', sa.Integer), sa.column('column_id', sa.Integer), sa.column('rank', sa.String))
+    update = card.update().where(card.c.id == sa.bindparam('card_id')).values(rank=sa.bindparam('new_rank'))
+    column_ids = connection.execute(sa.select(card.c.column_id).distinct()).scalars().all()
+    params = []
+    for column_id in column_ids:
+        card_ids = connection.execute(
+            sa.select(card.c.id).where(card.c.column_id == column_id).order_by(card.c.id)).scalars().all()
+        params.extend({'card_id': card_id, 'new_rank': rank} for card_id, rank in zip(card_ids, _spread_ranks(len(card_ids))))
+        if len(params) >= BATCH_SIZE:
+            connection.execute(update, params)
+            params = []
+    if params:
+        connection.execute(update, params)
+
+    if connection.dialect.name != 'sqlite':
+        with op.batch_alter_table('card', schema=None) as batch_op:
+            batch_op.alter_column('rank', server_default=None)
+    with op.batch_alter_table('card', schema=None) as batch_op:
+        batch_op.create_index('ix_card_column_rank', ['column_id', 'rank'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('card', schema=None) as batch_op:
+        batch_op.drop_index('ix_card_column_rank')
+        batch_op.drop_column('rank')
@@ -0,0 +1,50 @@
+"""read path indexes
+
+Индексы для фильтров карточек, обратных связей и постраничных комментариев.
+В PostgreSQL индексы строятся CONCURRENTLY вне транзакции, чтобы не блокировать запись.
+
+Revision ID: c433b1a120e3
+Revises: ac2725f9d5e4
+Create Date: 2026-10-18 19:33:56.591323
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+INDEXES = [
+    ('ix_card_assignees_card_user', 'card_assignees', ['card_id', 'user_id']),
+    ('ix_card_tags_tag_card', 'card_tags', ['tag_id', 'card_id']),
+    ('ix_column_board_position', 'column', ['board_id', 'position']),
+    ('ix_comment_card_timestamp_id', 'comment', ['card_id', 'timestamp', 'id']),
+]
+
+
+def _is_postgresql():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+# revision identifiers, used by Alembic.
+revision = 'c433b1a120e3'
+down_revision = 'ac2725f9d5e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,37 @@
+"""comment timestamp not null
+
+Время комментария обязательно: по ключу (timestamp, id) идет постраничная выборка,
+строки с NULL в нее не попадали. Пустое время заполняется самым ранним временем
+комментариев той же карточки (такие строки и раньше шли первыми), иначе текущим.
+
+Revision ID: e5b7c1d94a20
+Revises: 512ce4cb60ed
+Create Date: 2026-10-18 20:41:07.362518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b7c1d94a20'
+down_revision = '512ce4cb60ed'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    comment = sa.table('comment', sa.column('card_id', sa.Integer), sa.column('timestamp', sa.DateTime))
+    earliest = sa.alias(comment, 'earliest')
+    earliest_timestamp = sa.select(sa.func.min(earliest.c.timestamp)) \
+        .where(earliest.c.card_id == comment.c.card_id).scalar_subquery()
+    op.execute(comment.update().where(comment.c.timestamp.is_(None))
+               .values(timestamp=sa.func.coalesce(earliest_timestamp, sa.func.current_timestamp())))
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=True)
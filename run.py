@@ -2,46 +2,50 @@
 
 import os
 import click 
+import sqlite3
+import time
 from app import app, db
-from app.models import User, Board, Column, Card, Comment, Tag # Добавлен Tag
+from app.models import User, Board, Column, Card, Comment, Tag, Job
+from app.search import rebuild_search_index
+from app.datagen import generate_dataset
+from app.jobs import JobWorker, requeue_stale_jobs, run_pending_jobs
+from app.board_archive import ArchiveError, encode_archive, export_board_records, import_board, read_archive
 from werkzeug.security import generate_password_hash
-from sqlalchemy import inspect
+from app.database import get_backend
+from app.backup import create_backup, rotate_backups
+from flask_migrate import stamp, upgrade
 from datetime import datetime
 
 # --- Функции для создания таблиц и наполнения данными (будут вызываться через CLI) ---
 
+# Первая миграция: схема, которую создавал db.create_all() до появления миграций
+BASELINE_REVISION = '6a252379884b'
+
 def _create_tables():
-    """Создает таблицы БД, если их не существует."""
-    print("Проверка и создание таблиц БД...")
+    """Создает или обновляет таблицы БД применением миграций Alembic."""
+    print("Проверка и обновление схемы БД...")
     with app.app_context():
-        inspector = inspect(db.engine)
-        tables_to_check = ["user", "card_assignees", "comment", "tag", "card_tags"]
-        existing_tables = inspector.get_table_names()
-        
-        all_tables_exist = True
-        for table_name in tables_to_check:
-            if table_name not in existing_tables:
-                all_tables_exist = False
-                print(f"Таблица '{table_name}' не найдена.")
-                break
-        
-        if not all_tables_exist:
-            print("Не все необходимые таблицы существуют, пересоздаем все таблицы...")
-            db.create_all() 
-            print("Таблицы успешно созданы/пересозданы.")
-        else:
-            print("Все необходимые таблицы уже существуют.")
+        backend = get_backend(db.engine)
+        existing_tables = backend.table_names()
+        if existing_tables and 'alembic_version' not in existing_tables:
+            # БД создана без миграций: отмечаем, с какой версии схемы начинать
+            if backend.missing_tables(db.metadata):
+                print(f"БД без истории миграций, считаем ее схему исходной ({BASELINE_REVISION}).")
+                stamp(revision=BASELINE_REVISION)
+            else:
+                print("БД без истории миграций, но со всеми таблицами - отмечаем последнюю версию.")
+                stamp(revision='head')
+        upgrade()
+        print("Схема БД соответствует последней миграции.")
 
 
 def _seed_data():
     """Наполняет БД тестовыми данными (админ, пользователи, доски и т.д.), если админа нет."""
     with app.app_context():
-        inspector = inspect(db.engine)
-        required_tables = ["user", "card_assignees", "comment", "tag", "card_tags"] # Добавлены tag, card_tags
-        for table_name in required_tables:
-            if not inspector.has_table(table_name):
-                print(f"Ошибка: Таблица '{table_name}' не найдена. Сначала создайте таблицы командой 'flask db-create' или 'flask db-init'.")
-                return
+        missing_tables = get_backend(db.engine).missing_tables(db.metadata)
+        if missing_tables:
+            print(f"Ошибка: Таблицы не найдены: {', '.join(missing_tables)}. Сначала создайте таблицы командой 'flask db-create' или 'flask db-init'.")
+            return
 
         print("Проверка необходимости наполнения БД...")
         admin_user = User.query.filter_by(email='admin@gmai.com').first()
@@ -182,53 +186,198 @@ def seed_db_command():
 @app.cli.command("db-init")
 @click.option('--force', is_flag=True, help='Удалить существующую БД перед инициализацией.')
 def init_db_command(force):
-    db_path = os.path.join(app.instance_path, 'mydatabase.db')
-    db_exists_at_start = os.path.exists(db_path)
-
-    if force:
-        if db_exists_at_start:
-            print(f"Попытка удаления существующей БД: {db_path}...")
-            with app.app_context():
-                print("Попытка закрыть активные сессии и удалить таблицы через SQLAlchemy...")
-                try:
-                    db.session.close() 
-                    print("Сессия SQLAlchemy закрыта (если была активна).")
-                except Exception as e_session:
-                    print(f"Примечание: Ошибка при попытке закрыть сессию SQLAlchemy: {e_session}")
-                try:
-                    db.drop_all()       
-                    print("Таблицы БД успешно удалены через SQLAlchemy.")
-                except Exception as e_drop:
-                    print(f"Ошибка при удалении таблиц через SQLAlchemy: {e_drop}")
-                    print("Это может произойти, если файл БД все еще заблокирован.")
-            if os.path.exists(db_path):
-                print(f"Файл БД все еще существует ({db_path}). Попытка физического удаления...")
+    with app.app_context():
+        backend = get_backend(db.engine)
+        db_exists_at_start = backend.exists()
+
+        if force:
+            if db_exists_at_start:
+                print(f"Удаление существующей БД ({backend.name}): {backend.location}...")
+                db.session.remove()
                 try:
-                    os.remove(db_path)
-                    print("Файл БД успешно физически удален.")
+                    backend.drop(db.metadata)
+                    print("БД успешно удалена.")
                 except PermissionError as e_perm: 
-                    print(f"ОШИБКА ФИЗИЧЕСКОГО УДАЛЕНИЯ: {e_perm}")
-                    print(f"Файл '{db_path}' заблокирован другим процессом.")
-                except Exception as e_rem:
-                    print(f"Не удалось физически удалить файл БД: {e_rem}")
-            else:
-                if db_exists_at_start: 
-                     print("Файл БД был удален (вероятно, в результате db.drop_all()).")
-        else: 
-            print("Файл БД не найден, удаление не требуется.")
-    elif db_exists_at_start: 
-         print(f"Файл БД '{db_path}' уже существует. Используйте '--force', чтобы удалить и пересоздать.")
-         print("Инициализация прервана.")
-         return 
+                    print(f"ОШИБКА УДАЛЕНИЯ: {e_perm}")
+                    print("Файл БД заблокирован другим процессом.")
+                except Exception as e_drop:
+                    print(f"Не удалось удалить БД: {e_drop}")
+            else: 
+                print("БД не найдена, удаление не требуется.")
+        elif db_exists_at_start: 
+             print(f"БД '{backend.location}' уже существует. Используйте '--force', чтобы удалить и пересоздать.")
+             print("Инициализация прервана.")
+             return 
     print("Создание таблиц...")
     _create_tables() 
     print("Наполнение данными...")
     _seed_data()   
     print("Инициализация БД завершена.")
 
+@app.cli.command("ranks-rebalance")
+@click.option('--board-id', type=int, default=None, help='Выровнять ранги только на этой доске.')
+def rebalance_ranks_command(board_id):
+    """Переназначает короткие ранги карточкам во всех колонках (порядок не меняется)."""
+    with app.app_context():
+        query = Column.query.order_by(Column.id)
+        if board_id is not None:
+            query = query.filter_by(board_id=board_id)
+        for column in query.all():
+            updated = column.rebalance_card_ranks()
+            db.session.commit()
+            if updated:
+                print(f"Колонка {column.id} ({column.name}): обновлено рангов - {updated}.")
+    print("Выравнивание рангов завершено.")
+
+@app.cli.command("search-reindex")
+def search_reindex_command():
+    """Перестраивает полнотекстовый индекс карточек и комментариев."""
+    with app.app_context():
+        with db.engine.begin() as connection:
+            indexed = rebuild_search_index(connection)
+    print(f"Поисковый индекс перестроен, записей: {indexed}.")
+
+@app.cli.command("db-generate")
+@click.option('--users', type=int, default=50, show_default=True, help='Количество пользователей.')
+@click.option('--boards', type=int, default=10, show_default=True, help='Количество досок.')
+@click.option('--cards-per-board', type=int, default=100, show_default=True, help='Карточек на доске.')
+@click.option('--comments-per-card', type=int, default=3, show_default=True, help='Комментариев к карточке.')
+@click.option('--members-per-board', type=int, default=5, show_default=True, help='Участников доски помимо владельца.')
+@click.option('--prefix', default='load', show_default=True, help='Префикс имен и email создаваемых пользователей.')
+@click.option('--password', default='password', show_default=True, help='Пароль всех создаваемых пользователей.')
+@click.option('--seed', type=int, default=None, help='Зерно генератора случайных чисел для воспроизводимых данных.')
+def generate_data_command(users, boards, cards_per_board, comments_per_card, members_per_board, prefix, password, seed):
+    """Быстро наполняет БД большим объемом синтетических данных для нагрузочных тестов."""
+    started = time.perf_counter()
+    with app.app_context():
+        try:
+            counts = generate_dataset(users, boards, cards_per_board, comments_per_card, prefix=prefix,
+                                      password=password, members_per_board=members_per_board, seed=seed)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    print(", ".join(f"{table}: {count}" for table, count in counts.items()))
+    print(f"Данные сгенерированы за {time.perf_counter() - started:.1f} с. "
+          f"Вход: {prefix}1@example.com ... {prefix}{users}@example.com, пароль '{password}'.")
+
+@app.cli.command("board-export")
+@click.argument('board_id', type=int)
+@click.option('--output', '-o', type=click.Path(dir_okay=False, allow_dash=True), default=None,
+              help='Файл архива (по умолчанию board-<id>.ndjson.gz, "-" - stdout).')
+@click.option('--gzip/--no-gzip', 'compress', default=None,
+              help='Сжимать архив (по умолчанию - если имя файла оканчивается на .gz).')
+def board_export_command(board_id, output, compress):
+    """Выгружает доску со всем содержимым в архив NDJSON."""
+    output = output or f'board-{board_id}.ndjson.gz'
+    if compress is None:
+        compress = output.endswith('.gz')
+    with app.app_context():
+        board = Board.query.filter_by(id=board_id, deleted_at=None).first()
+        if board is None:
+            raise click.ClickException(f"Доска {board_id} не найдена.")
+        with click.open_file(output, 'wb', atomic=output != '-') as f:
+            for chunk in encode_archive(export_board_records(board), compress=compress):
+                f.write(chunk)
+    if output != '-':
+        print(f"Доска {board_id} выгружена в {output}.")
+
+@app.cli.command("board-import")
+@click.argument('archive', type=click.File('rb'))
+@click.option('--owner', default=None, help='Email владельца новой доски (по умолчанию владелец из архива).')
+@click.option('--name', default=None, help='Название новой доски (по умолчанию из архива).')
+def board_import_command(archive, owner, name):
+    """Создает новую доску из архива, выгруженного board-export или со страницы настроек доски."""
+    started = time.perf_counter()
+    with app.app_context():
+        owner_user = None
+        if owner is not None:
+            owner_user = User.query.filter_by(email=owner).first()
+            if owner_user is None:
+                raise click.ClickException(f"Пользователь {owner} не найден.")
+        try:
+            board_id, counts = import_board(read_archive(archive), owner=owner_user, name=name)
+        except ArchiveError as e:
+            raise click.ClickException(str(e))
+    print(", ".join(f"{kind}: {count}" for kind, count in counts.items()))
+    print(f"Создана доска {board_id} за {time.perf_counter() - started:.1f} с.")
+
+def _run_backup(output_dir, compress, keep):
+    backend = get_backend(db.engine)
+    started = time.perf_counter()
+    path = create_backup(backend, output_dir, compress=compress, pages_per_step=app.config['BACKUP_PAGES_PER_STEP'],
+                         pause=app.config['BACKUP_STEP_PAUSE'], max_restarts=app.config['BACKUP_MAX_RESTARTS'])
+    print(f"Копия {path} ({os.path.getsize(path) / 1024 / 1024:.1f} МБ) создана за {time.perf_counter() - started:.1f} с.")
+    for removed in rotate_backups(output_dir, backend.path, keep):
+        print(f"Удалена старая копия {removed}.")
+
+@app.cli.command("db-backup")
+@click.option('--output-dir', '-o', default=None, help='Каталог копий (по умолчанию BACKUP_DIR).')
+@click.option('--gzip', 'compress', is_flag=True, help='Сжать копию gzip.')
+@click.option('--keep', type=int, default=None, help='Сколько последних копий хранить (по умолчанию BACKUP_KEEP, 0 - все).')
+@click.option('--every', type=int, default=None, help='Повторять каждые N минут до Ctrl+C.')
+def db_backup_command(output_dir, compress, keep, every):
+    """Создает согласованную копию БД, не останавливая приложение."""
+    output_dir = output_dir or app.config['BACKUP_DIR']
+    keep = app.config['BACKUP_KEEP'] if keep is None else keep
+    with app.app_context():
+        backend = get_backend(db.engine)
+        if not backend.supports_backup:
+            raise click.UsageError(f"flask db-backup работает только с SQLite, текущая БД - {backend.name}. "
+                                   "Для PostgreSQL используйте pg_dump.")
+        if every is None:
+            try:
+                _run_backup(output_dir, compress, keep)
+            except (ValueError, OSError, sqlite3.Error) as e:
+                raise click.ClickException(str(e))
+            return
+        print(f"Копии каждые {every} мин., остановка - Ctrl+C.")
+        try:
+            while True:
+                next_run = time.monotonic() + every * 60
+                try:
+                    _run_backup(output_dir, compress, keep)
+                except (ValueError, OSError, sqlite3.Error) as e:
+                    # Сбой одной копии не останавливает расписание
+                    app.logger.error(f"Backup failed: {e}", exc_info=True)
+                time.sleep(max(0.0, next_run - time.monotonic()))
+        except KeyboardInterrupt:
+            print("Остановка.")
+
+@app.cli.group("jobs")
+def jobs_group():
+    """Фоновые задачи: воркер и состояние очереди."""
+
+@jobs_group.command("run")
+@click.option('--workers', type=int, default=1, show_default=True, help='Число потоков-воркеров.')
+@click.option('--once', is_flag=True, help='Выполнить готовые задачи и завершиться.')
+def jobs_run_command(workers, once):
+    """Выполняет фоновые задачи из очереди (до Ctrl+C или, с --once, пока очередь не опустеет)."""
+    with app.app_context():
+        requeued = requeue_stale_jobs(app.config['JOBS_LOCK_TIMEOUT'])
+        if requeued:
+            print(f"Возвращено в очередь зависших задач: {requeued}.")
+        if once:
+            print(f"Выполнено задач: {run_pending_jobs(app.config)}.")
+            return
+    worker = JobWorker(app, workers, app.config['JOBS_POLL_INTERVAL']).start()
+    print(f"Воркер запущен ({workers} потоков), остановка - Ctrl+C.")
+    try:
+        worker.join()
+    except KeyboardInterrupt:
+        print("Остановка воркера после текущих задач...")
+        worker.stop()
+
+@jobs_group.command("status")
+def jobs_status_command():
+    """Показывает число задач по состояниям и последние ошибки."""
+    with app.app_context():
+        counts = db.session.query(Job.status, db.func.count()).group_by(Job.status).all()
+        print(", ".join(f"{status}: {count}" for status, count in counts) or "Очередь пуста.")
+        for job in Job.query.filter_by(status='failed').order_by(Job.finished_at.desc()).limit(10):
+            print(f"  #{job.id} {job.kind} ({job.attempts} попыток): {job.last_error}")
+
 if __name__ == '__main__':
     print("Запуск Flask development-сервера...")
     print("Для создания/пересоздания БД выполните: flask db-init --force")
-    print("Для простого создания таблиц (если БД нет): flask db-create")
+    print("Для создания или обновления схемы БД миграциями: flask db-create (или flask db upgrade)")
     print("Для наполнения данными (если БД пуста): flask db-seed")
     app.run(debug=True, port=5001)
\ No newline at end of file
@@ -0,0 +1,176 @@
+# scripts/load_test.py
+
+"""Нагрузочный тест: параллельные пользователи открывают доски, карточки, комментарии и двигают карточки.
+
+Пользователи берутся из flask db-generate (email <prefix><n>@example.com, общий пароль).
+Пример:
+    flask db-generate --users 50 --boards 10 --cards-per-board 1000
+    flask run --port 5001 &
+    python scripts/load_test.py --base-url http://127.0.0.1:5001 --users 20 --duration 60
+"""
+
+import argparse
+import http.cookiejar
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# Доля каждой операции в сценарии пользователя
+SCENARIO_WEIGHTS = {
+    'view_board': 15,
+    'get_comments': 30,
+    'edit_card_get': 25,
+    'edit_card_post': 10,
+    'move_card': 20,
+}
+
+CSRF_RE = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+BOARD_LINK_RE = re.compile(r'href="/boards/(\d+)"')
+
+
+class SimulatedUser:
+    """Отдельная сессия (cookies, CSRF-токен) одного пользователя."""
+
+    def __init__(self, base_url, email, password, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.csrf_token = None
+        self.boards = {}
+        self._login(email, password)
+
+    def request(self, method, path, data=None, json_body=None, ajax=False):
+        headers = {}
+        if ajax:
+            headers['X-Requested-With'] = 'XMLHttpRequest'
+        if method == 'POST' and self.csrf_token:
+            headers['X-CSRFToken'] = self.csrf_token
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            body = urllib.parse.urlencode(data, doseq=True).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def _login(self, email, password):
+        status, page = self.request('GET', '/login')
+        self.csrf_token = CSRF_RE.search(page.decode()).group(1)
+        status, page = self.request('POST', '/login', data={
+            'email': email, 'password': password, 'csrf_token': self.csrf_token, 'submit': 'Войти'})
+        html = page.decode()
+        if '/logout' not in html:
+            raise RuntimeError(f'Не удалось войти как {email}')
+        board_ids = sorted({int(board_id) for board_id in BOARD_LINK_RE.findall(html)})
+        for board_id in board_ids:
+            status, body = self.request('GET', f'/api/boards/{board_id}/state')
+            if status == 200:
+                self.boards[board_id] = json.loads(body)['board']
+
+    def pick_card(self, rng):
+        board = self.boards[rng.choice(list(self.boards))]
+        cards = [card for column in board['columns'] for card in column['cards']]
+        return board, (rng.choice(cards) if cards else None)
+
+
+def run_operation(user, name, rng):
+    board, card = user.pick_card(rng)
+    if name == 'view_board' or card is None:
+        return 'view_board', user.request('GET', f"/boards/{board['id']}")[0]
+    if name == 'get_comments':
+        return name, user.request('GET', f"/cards/{card['id']}/comments", ajax=True)[0]
+    if name == 'edit_card_get':
+        return name, user.request('GET', f"/cards/{card['id']}/edit", ajax=True)[0]
+    if name == 'edit_card_post':
+        return name, user.request('POST', f"/cards/{card['id']}/edit", ajax=True, data={
+            'title': card['title'], 'description': card['description'] + ' ',
+            'assignees': card['assignee_ids'], 'tags': card['tag_ids'], 'csrf_token': user.csrf_token})[0]
+    column = rng.choice(board['columns'])
+    status, body = user.request('POST', f"/api/cards/{card['id']}/move", ajax=True, json_body={
+        'new_column_id': column['id'], 'index': rng.randint(0, len(column['cards']))})
+    return name, status
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:5001')
+    parser.add_argument('--users', type=int, default=10, help='число параллельных пользователей')
+    parser.add_argument('--duration', type=float, default=30, help='длительность теста в секундах')
+    parser.add_argument('--prefix', default='load', help='префикс пользователей из flask db-generate')
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--think-time', type=float, default=0.0, help='пауза пользователя между запросами, с')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    print(f'Вход {args.users} пользователей...')
+    users = []
+    for n in range(1, args.users + 1):
+        user = SimulatedUser(args.base_url, f'{args.prefix}{n}@example.com', args.password, args.timeout)
+        if user.boards:
+            users.append(user)
+    if not users:
+        raise SystemExit('Ни у одного пользователя нет досок, сначала выполните flask db-generate.')
+
+    names, weights = zip(*SCENARIO_WEIGHTS.items())
+    results = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def worker(user, worker_seed):
+        rng = random.Random(worker_seed)
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                name, status = run_operation(user, rng.choices(names, weights)[0], rng)
+            except Exception as e:  # сетевые ошибки считаем отдельно, тест продолжается
+                name, status = 'error', repr(e)
+            elapsed = time.perf_counter() - started
+            with lock:
+                stats = results.setdefault(name, {'latencies': [], 'errors': 0})
+                stats['latencies'].append(elapsed)
+                if not isinstance(status, int) or status >= 400:
+                    stats['errors'] += 1
+            if args.think_time:
+                time.sleep(args.think_time)
+
+    print(f'Нагрузка: {len(users)} пользователей, {args.duration:.0f} с...')
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(user, (args.seed or 0) + i)) for i, user in enumerate(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.monotonic() - started
+
+    print(f"\n{'операция':<16}{'запросов':>10}{'ошибок':>8}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'запр/с':>10}")
+    total = 0
+    for name in sorted(results):
+        latencies = sorted(results[name]['latencies'])
+        total += len(latencies)
+        print(f"{name:<16}{len(latencies):>10}{results[name]['errors']:>8}"
+              f"{percentile(latencies, 0.50) * 1000:>10.1f}{percentile(latencies, 0.95) * 1000:>10.1f}"
+              f"{percentile(latencies, 0.99) * 1000:>10.1f}{len(latencies) / wall_time:>10.1f}")
+    print(f'\nВсего {total} запросов за {wall_time:.1f} с, пропускная способность {total / wall_time:.1f} запр/с.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# tests/benchmarks/conftest.py
+
+# Наборы данных для бенчмарков и сравнение с сохраненным эталоном.
+# Бенчмарки по умолчанию не выбираются, запуск: python -m pytest -m benchmark
+# Эталон (tests/benchmarks/baseline.json) хранит число SQL-запросов и медиану времени
+# каждого бенчмарка. Число запросов не должно расти вообще - это проверяется всегда.
+# Время зависит от машины, на которой записан эталон, поэтому сверяется только с --bench-latency
+# (на той же машине): не больше чем в BENCH_LATENCY_TOLERANCE раз (по умолчанию 2) плюс
+# BENCH_LATENCY_SLACK_MS (5 мс, чтобы быстрые запросы не падали от шума). Обновить эталон:
+#     python -m pytest -m benchmark --bench-update-baseline
+
+import json
+import os
+
+import pytest
+
+from app import db
+from app.datagen import generate_dataset
+from app.models import Board, Card, Column, User, card_assignees, card_tags
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+BENCH_SIZES = [int(size) for size in os.environ.get('BENCH_SIZES', '10,100,1000,10000').split(',')]
+BENCH_PASSWORD = 'password'
+ADMIN_EMAIL = 'bench-admin@example.com'
+
+
+def pytest_generate_tests(metafunc):
+    if 'bench_size' in metafunc.fixturenames:
+        metafunc.parametrize('bench_size', BENCH_SIZES, ids=lambda size: f'{size}_cards')
+
+
+@pytest.fixture(scope='session')
+def bench_data(app):
+    """По одной доске на каждый размер из BENCH_SIZES: {размер: сведения о доске}."""
+    data = {}
+    with app.app_context():
+        admin = User(username='bench-admin', email=ADMIN_EMAIL, is_admin=True)
+        admin.set_password(BENCH_PASSWORD)
+        db.session.add(admin)
+        db.session.commit()
+
+        for size in BENCH_SIZES:
+            prefix = f'bench{size}-'
+            generate_dataset(users=6, boards=1, cards_per_board=size, comments_per_card=3,
+                             prefix=prefix, password=BENCH_PASSWORD, seed=size)
+            board = Board.query.filter_by(name=f'Доска {prefix} 1').one()
+            column_ids = [column.id for column in Column.query.filter_by(board_id=board.id).order_by(Column.position)]
+            card = Card.query.filter(Card.column_id.in_(column_ids)).order_by(Card.id).first()
+            data[size] = {
+                'board_id': board.id,
+                'owner_email': db.session.get(User, board.user_id).email,
+                'column_ids': column_ids,
+                'card_id': card.id,
+                'card_title': card.title,
+                'assignee_ids': [row.user_id for row in db.session.query(card_assignees.c.user_id)
+                                 .filter(card_assignees.c.card_id == card.id)],
+                'tag_ids': [row.tag_id for row in db.session.query(card_tags.c.tag_id)
+                            .filter(card_tags.c.card_id == card.id)],
+            }
+        db.session.remove()
+    return data
+
+
+@pytest.fixture
+def board(bench_data, bench_size):
+    return bench_data[bench_size] | {'size': bench_size}
+
+
+@pytest.fixture
+def owner_client(login, board):
+    return login(board['owner_email'], BENCH_PASSWORD)
+
+
+@pytest.fixture(scope='session')
+def admin_client(login, bench_data):
+    return login(ADMIN_EMAIL, BENCH_PASSWORD)
+
+
+@pytest.fixture(scope='session')
+def perf_baseline(request):
+    update = request.config.getoption('--bench-update-baseline')
+    check_latency = request.config.getoption('--bench-latency')
+    tolerance = float(os.environ.get('BENCH_LATENCY_TOLERANCE', '2.0'))
+    slack_ms = float(os.environ.get('BENCH_LATENCY_SLACK_MS', '5'))
+    stored = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding='utf-8') as f:
+            stored = json.load(f)
+    results = {}
+
+    def check(name, queries, median_ms):
+        results[name] = {'queries': queries, 'median_ms': round(median_ms, 2) if median_ms is not None else None}
+        expected = stored.get(name)
+        if update or expected is None:
+            return
+        assert queries <= expected['queries'], \
+            f"{name}: {queries} SQL-запросов, в эталоне {expected['queries']} (возможна проблема N+1)"
+        if check_latency and median_ms is not None and expected.get('median_ms'):
+            limit = expected['median_ms'] * tolerance + slack_ms
+            assert median_ms <= limit, \
+                f"{name}: медиана {median_ms:.1f} мс, эталон {expected['median_ms']:.1f} мс (допуск x{tolerance})"
+
+    yield check
+
+    if update and results:
+        stored.update(results)
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(stored.items())), f, indent=2, ensure_ascii=False)
+            f.write('\n')
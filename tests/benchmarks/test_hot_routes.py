@@ -0,0 +1,69 @@
+# tests/benchmarks/test_hot_routes.py
+
+import pytest
+
+# Модуль выполняется только с -m benchmark (см. pytest.ini)
+pytestmark = pytest.mark.benchmark
+
+ROUNDS = 5
+AJAX = {'X-Requested-With': 'XMLHttpRequest'}
+
+
+def run_benchmark(benchmark, query_counter, perf_baseline, name, send, expected_status=200):
+    """Замеряет запрос через pytest-benchmark и сверяет время и число SQL-запросов с эталоном."""
+    state = {}
+
+    def call():
+        with query_counter.counting():
+            response = send()
+        assert response.status_code == expected_status, response.get_data(as_text=True)[:500]
+        state['queries'] = query_counter.count
+
+    benchmark.pedantic(call, rounds=ROUNDS, iterations=1, warmup_rounds=1)
+    benchmark.extra_info['queries'] = state['queries']
+    median_ms = benchmark.stats.stats.median * 1000 if benchmark.stats else None
+    perf_baseline(name, state['queries'], median_ms)
+
+
+def test_view_board(benchmark, query_counter, perf_baseline, owner_client, board):
+    run_benchmark(benchmark, query_counter, perf_baseline, f"view_board[{board['size']}]",
+                  lambda: owner_client.get(f"/boards/{board['board_id']}"))
+
+
+def test_dashboard(benchmark, query_counter, perf_baseline, owner_client, board):
+    run_benchmark(benchmark, query_counter, perf_baseline, f"dashboard[{board['size']}]",
+                  lambda: owner_client.get('/dashboard'))
+
+
+def test_edit_card_get(benchmark, query_counter, perf_baseline, owner_client, board):
+    run_benchmark(benchmark, query_counter, perf_baseline, f"edit_card_get[{board['size']}]",
+                  lambda: owner_client.get(f"/cards/{board['card_id']}/edit", headers=AJAX))
+
+
+def test_edit_card_post(benchmark, query_counter, perf_baseline, owner_client, board):
+    form = {'title': board['card_title'], 'description': 'Обновлено бенчмарком',
+            'assignees': board['assignee_ids'], 'tags': board['tag_ids']}
+    run_benchmark(benchmark, query_counter, perf_baseline, f"edit_card_post[{board['size']}]",
+                  lambda: owner_client.post(f"/cards/{board['card_id']}/edit", data=form, headers=AJAX))
+
+
+def test_get_comments(benchmark, query_counter, perf_baseline, owner_client, board):
+    run_benchmark(benchmark, query_counter, perf_baseline, f"get_comments[{board['size']}]",
+                  lambda: owner_client.get(f"/cards/{board['card_id']}/comments", headers=AJAX))
+
+
+def test_move_card(benchmark, query_counter, perf_baseline, owner_client, board):
+    # Карточка по очереди переносится в начало первой и последней колонки
+    targets = [board['column_ids'][-1], board['column_ids'][0]]
+    moves = iter(range(10 ** 6))
+
+    def move():
+        column_id = targets[next(moves) % 2]
+        return owner_client.post(f"/api/cards/{board['card_id']}/move", json={'new_column_id': column_id, 'index': 0})
+
+    run_benchmark(benchmark, query_counter, perf_baseline, f"move_card[{board['size']}]", move)
+
+
+def test_admin_dashboard(benchmark, query_counter, perf_baseline, admin_client):
+    run_benchmark(benchmark, query_counter, perf_baseline, 'admin_dashboard',
+                  lambda: admin_client.get('/admin'))
@@ -0,0 +1,169 @@
+# tests/conftest.py
+
+# Тесты работают с отдельной БД: по умолчанию временный файл SQLite, либо TEST_DATABASE_URL
+# (например, postgresql+psycopg://localhost/kanban_test). С TEST_PG=1 и без TEST_DATABASE_URL
+# тесты поднимают временный кластер PostgreSQL (initdb/pg_ctl, каталог с программами - PG_BIN,
+# иначе pg_config --bindir или PATH) и удаляют его после прогона. URL нужно задать до импорта app,
+# потому что движок БД создается при импорте.
+
+import atexit
+import glob
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+
+def _postgres_bindir():
+    if os.environ.get('PG_BIN'):
+        return os.environ['PG_BIN']
+    pg_config = shutil.which('pg_config')
+    if pg_config:
+        return subprocess.run([pg_config, '--bindir'], capture_output=True, text=True, check=True).stdout.strip()
+    # Debian/Ubuntu не кладут initdb в PATH
+    candidates = [shutil.which('initdb')] + sorted(glob.glob('/usr/lib/postgresql/*/bin/initdb'), reverse=True)
+    initdb = next((path for path in candidates if path), None)
+    if initdb is None:
+        raise RuntimeError('TEST_PG=1: не найдены программы PostgreSQL (initdb, pg_ctl), укажите каталог в PG_BIN.')
+    return os.path.dirname(initdb)
+
+
+def _start_postgres(directory):
+    """Запускает временный кластер PostgreSQL в directory и возвращает URL его БД."""
+    bindir = _postgres_bindir()
+    data_dir = os.path.join(directory, 'pgdata')
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    subprocess.run([os.path.join(bindir, 'initdb'), '-D', data_dir, '-U', 'postgres', '-A', 'trust', '-E', 'UTF8',
+                    '--no-locale'], check=True, stdout=subprocess.DEVNULL)
+    # Надежность записи тестовой БД не нужна: без fsync прогон заметно быстрее
+    subprocess.run([os.path.join(bindir, 'pg_ctl'), '-D', data_dir, '-l', os.path.join(directory, 'postgres.log'),
+                    '-o', f"-p {port} -c listen_addresses=127.0.0.1 -c unix_socket_directories='' "
+                          '-c fsync=off -c synchronous_commit=off -c full_page_writes=off',
+                    '-w', 'start'], check=True, stdout=subprocess.DEVNULL)
+    atexit.register(subprocess.run, [os.path.join(bindir, 'pg_ctl'), '-D', data_dir, '-m', 'fast', '-w', 'stop'],
+                    stdout=subprocess.DEVNULL)
+    return f'postgresql+psycopg://postgres@127.0.0.1:{port}/postgres'
+
+
+_test_db_dir = tempfile.mkdtemp(prefix='kanban-tests-')
+atexit.register(shutil.rmtree, _test_db_dir, ignore_errors=True)
+if os.environ.get('TEST_DATABASE_URL'):
+    os.environ['DATABASE_URL'] = os.environ['TEST_DATABASE_URL']
+elif os.environ.get('TEST_PG', '').lower() in ('1', 'true', 'yes', 'on'):
+    os.environ['DATABASE_URL'] = _start_postgres(_test_db_dir)
+else:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_test_db_dir, 'test.db')
+
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import event, select
+
+from app import app as flask_app, db
+from app.database import get_backend
+from app.datagen import generate_dataset
+from app.models import Board, Card, Column, Tag, User, board_members
+
+# Пароль всех пользователей, которых создают тесты
+PASSWORD = 'password'
+
+
+def pytest_addoption(parser):
+    parser.addoption('--bench-update-baseline', action='store_true', default=False,
+                     help='Записать результаты бенчмарков в tests/benchmarks/baseline.json вместо проверки.')
+    parser.addoption('--bench-latency', action='store_true', default=False,
+                     help='Сверять с эталоном и время бенчмарков, а не только число SQL-запросов.')
+
+
+class QueryCounter:
+    """Считает SQL-запросы, выполненные движком внутри блока counting()."""
+
+    def __init__(self, engine):
+        self.count = 0
+        self.statements = []
+        self._active = False
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._active:
+            self.count += 1
+            self.statements.append(statement)
+
+    @contextmanager
+    def counting(self):
+        self.count = 0
+        self.statements = []
+        self._active = True
+        try:
+            yield self
+        finally:
+            self._active = False
+
+
+@pytest.fixture(scope='session')
+def app():
+    # Фоновые задачи тесты выполняют явно через app.jobs.run_pending_jobs
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, JOBS_INPROCESS_WORKERS=0)
+    with flask_app.app_context():
+        backend = get_backend(db.engine)
+        if backend.exists():
+            backend.drop(db.metadata)
+        upgrade()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+        get_backend(db.engine).drop(db.metadata)
+
+
+@pytest.fixture(scope='session')
+def query_counter(app):
+    with app.app_context():
+        return QueryCounter(db.engine)
+
+
+@pytest.fixture(scope='session')
+def login(app):
+    """Возвращает функцию, создающую тестовый клиент с выполненным входом."""
+    def make_client(email, password=PASSWORD):
+        client = app.test_client()
+        response = client.post('/login', data={'email': email, 'password': password})
+        assert response.status_code == 302, f'Не удалось войти как {email}'
+        return client
+    return make_client
+
+
+@pytest.fixture(scope='session')
+def make_board(app):
+    """Возвращает функцию, создающую доску с пользователями через generate_dataset.
+
+    Пользователи получают email вида <prefix><n>@example.com и пароль PASSWORD; функция возвращает
+    словарь с id доски, владельца, участников, колонок (по позиции), карточек и тегов (по id).
+    """
+    def make(prefix, users=3, cards=10, comments=0, members=2, seed=1):
+        with app.app_context():
+            generate_dataset(users=users, boards=1, cards_per_board=cards, comments_per_card=comments,
+                             prefix=prefix, password=PASSWORD, members_per_board=members, seed=seed)
+            board = Board.query.filter_by(name=f'Доска {prefix} 1').one()
+            member_ids = db.session.execute(select(board_members.c.user_id).where(board_members.c.board_id == board.id)
+                                            .order_by(board_members.c.user_id)).scalars().all()
+            emails = dict(db.session.execute(select(User.id, User.email)
+                                             .where(User.id.in_(member_ids + [board.user_id]))).all())
+            data = {
+                'board_id': board.id,
+                'owner_id': board.user_id,
+                'owner_email': emails[board.user_id],
+                'member_ids': member_ids,
+                'member_emails': [emails[user_id] for user_id in member_ids],
+                'column_ids': db.session.execute(select(Column.id).where(Column.board_id == board.id)
+                                                 .order_by(Column.position, Column.id)).scalars().all(),
+                'card_ids': db.session.execute(select(Card.id).join(Column, Column.id == Card.column_id)
+                                               .where(Column.board_id == board.id).order_by(Card.id)).scalars().all(),
+                'tag_ids': db.session.execute(select(Tag.id).where(Tag.board_id == board.id)
+                                              .order_by(Tag.id)).scalars().all(),
+            }
+            db.session.remove()
+        return data
+    return make
@@ -0,0 +1,104 @@
+# tests/test_avatars.py
+
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app import db
+from app.jobs import run_pending_jobs
+from app.models import User
+
+PASSWORD = 'password'
+
+
+def _image_bytes(image_format, size=(900, 600), color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    image = Image.new('RGB', size, color)
+    if image_format == 'JPEG':
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera'
+        image.save(buffer, image_format, exif=exif)
+    else:
+        image.save(buffer, image_format)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def avatars_dir(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOADED_AVATARS_DEST', str(tmp_path / 'avatars'))
+    monkeypatch.setitem(app.config, 'UPLOADS_PENDING_DEST', str(tmp_path / 'uploads'))
+    (tmp_path / 'avatars').mkdir()
+    return tmp_path / 'avatars'
+
+
+@pytest.fixture(scope='module')
+def avatar_users(app):
+    with app.app_context():
+        users = []
+        for n in (1, 2):
+            user = User(username=f'avatar{n}', email=f'avatar{n}@example.com')
+            user.set_password(PASSWORD)
+            db.session.add(user)
+            users.append(user)
+        db.session.commit()
+        data = [user.id for user in users]
+        db.session.remove()
+    return data
+
+
+def _upload(client, data, name):
+    """Загружает аватар и сразу выполняет фоновую задачу его обработки."""
+    response = client.post('/profile/update_avatar', data={'avatar': (data, name)},
+                           content_type='multipart/form-data')
+    with client.application.app_context():
+        run_pending_jobs(client.application.config)
+    return response
+
+
+def _avatar_url(app, user_id):
+    with app.app_context():
+        return db.session.get(User, user_id).avatar_url
+
+
+def test_upload_produces_thumbnails_without_metadata(app, login, avatars_dir, avatar_users):
+    client = login('avatar1@example.com', PASSWORD)
+    assert _upload(client, _image_bytes('JPEG'), 'photo.jpg').status_code == 302
+
+    avatar_url = _avatar_url(app, avatar_users[0])
+    digest = avatar_url.split('.')[0]
+    assert sorted(os.listdir(avatars_dir)) == sorted(f'{digest}-{size}.webp' for size in app.config['AVATAR_SIZES'])
+    for size in app.config['AVATAR_SIZES']:
+        with Image.open(avatars_dir / f'{digest}-{size}.webp') as thumbnail:
+            assert thumbnail.size == (size, size)
+            assert not thumbnail.getexif()
+
+    with app.test_request_context():
+        url = db.session.get(User, avatar_users[0]).get_avatar(40)
+    assert url == f'/avatars/{digest}-64.webp'
+    response = client.get(url)
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    response.close()
+
+
+def test_replaced_avatar_files_are_removed_unless_shared(app, login, avatars_dir, avatar_users):
+    first, second = login('avatar1@example.com', PASSWORD), login('avatar2@example.com', PASSWORD)
+    _upload(first, _image_bytes('PNG'), 'a.png')
+    _upload(second, _image_bytes('PNG'), 'a.png')  # та же картинка - те же файлы
+    shared = _avatar_url(app, avatar_users[0])
+    assert _avatar_url(app, avatar_users[1]) == shared
+
+    _upload(first, _image_bytes('PNG', color=(0, 0, 255)), 'b.png')
+    assert (avatars_dir / shared.replace('.webp', '-64.webp')).exists()
+    _upload(second, _image_bytes('PNG', color=(0, 255, 0)), 'c.png')
+    assert not (avatars_dir / shared.replace('.webp', '-64.webp')).exists()
+
+
+def test_invalid_image_is_rejected(app, login, avatars_dir, avatar_users):
+    client = login('avatar1@example.com', PASSWORD)
+    before = _avatar_url(app, avatar_users[0])
+    _upload(client, io.BytesIO(b'not an image'), 'fake.png')
+    assert _avatar_url(app, avatar_users[0]) == before
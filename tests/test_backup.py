@@ -0,0 +1,143 @@
+# tests/test_backup.py
+
+import gzip
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+
+from app import db
+from app.backup import backup_filename, create_backup, rotate_backups
+from app.database import SQLiteBackend, get_backend
+import run  # noqa: F401 - регистрирует CLI-команды приложения
+
+
+@pytest.fixture
+def backend(app):
+    with app.app_context():
+        backend = get_backend(db.engine)
+        if backend.name != 'sqlite':
+            pytest.skip('Резервное копирование средствами приложения есть только для SQLite')
+        yield backend
+
+
+class _Writer(threading.Thread):
+    """Пишет в БД отдельным соединением, пока идет копирование."""
+
+    def __init__(self, path):
+        super().__init__(daemon=True)
+        self.path = path
+        self.started = threading.Event()
+        self.stopping = threading.Event()
+        self.writes = 0
+        connection = sqlite3.connect(path, isolation_level=None, timeout=30)
+        connection.execute('CREATE TABLE IF NOT EXISTS backup_probe (id INTEGER PRIMARY KEY, value TEXT)')
+        connection.close()
+
+    def run(self):
+        connection = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+        while not self.stopping.is_set():
+            connection.execute("INSERT INTO backup_probe (value) VALUES ('x')")
+            self.writes += 1
+            self.started.set()
+        connection.close()
+
+    def start(self):
+        super().start()
+        self.started.wait()
+
+    def stop(self, drop=False):
+        self.stopping.set()
+        self.join()
+        if drop:
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            connection.execute('DROP TABLE backup_probe')
+            connection.close()
+
+
+def _table_count(path, table):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(f'SELECT count(*) FROM {table}').fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_backup_is_standalone_consistent_copy(backend, tmp_path):
+    path = create_backup(backend, str(tmp_path), pages_per_step=8, pause=0)
+    assert os.path.basename(path).endswith('.db') and os.listdir(tmp_path) == [os.path.basename(path)]
+    connection = sqlite3.connect(path)
+    assert connection.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    assert connection.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+    connection.close()
+    assert _table_count(path, 'board') == _table_count(backend.path, 'board')
+
+
+def test_compressed_backup(backend, tmp_path):
+    path = create_backup(backend, str(tmp_path), compress=True)
+    assert path.endswith('.db.gz')
+    with gzip.open(path, 'rb') as f:
+        assert f.read(16) == b'SQLite format 3\x00'
+
+
+def test_backup_does_not_stop_writers(backend, tmp_path):
+    writer = _Writer(backend.path)
+    writer.start()
+    try:
+        writes_before = writer.writes
+        path = create_backup(backend, str(tmp_path), pages_per_step=4, pause=0.001)
+        writes_after = writer.writes
+    finally:
+        writer.stop(drop=True)
+    # Копия - снимок на момент начала: запись шла все время копирования, но в копию не попала
+    assert writes_after > writes_before
+    assert writes_before <= _table_count(path, 'backup_probe') <= writes_after
+
+
+def test_backup_without_wal_finishes_after_restarts(tmp_path):
+    path = str(tmp_path / 'rollback.db')
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute('PRAGMA journal_mode = DELETE')
+    connection.execute('CREATE TABLE backup_probe (id INTEGER PRIMARY KEY, value TEXT)')
+    connection.executemany('INSERT INTO backup_probe (value) VALUES (?)', [('x' * 200,)] * 5000)
+    connection.close()
+
+    engine = create_engine(f'sqlite:///{path}')
+    writer = _Writer(path)
+    writer.start()
+    try:
+        pages = SQLiteBackend(engine).backup(str(tmp_path / 'copy.db'), pages_per_step=2, pause=0.001,
+                                             max_restarts=1)
+    finally:
+        writer.stop()
+        engine.dispose()
+    assert pages > 0 and _table_count(str(tmp_path / 'copy.db'), 'backup_probe') >= 5000
+
+
+def test_rotate_backups_keeps_newest(tmp_path):
+    names = [backup_filename('/data/mydatabase.db', datetime(2026, 1, day), compress=day % 2 == 0)
+             for day in range(1, 6)]
+    for name in names + ['other-20260101-000000.db', 'notes.txt']:
+        (tmp_path / name).write_bytes(b'')
+
+    removed = rotate_backups(str(tmp_path), '/data/mydatabase.db', keep=2)
+    assert sorted(os.path.basename(path) for path in removed) == names[:3]
+    assert sorted(os.listdir(tmp_path)) == sorted(names[3:] + ['other-20260101-000000.db', 'notes.txt'])
+    assert rotate_backups(str(tmp_path), '/data/mydatabase.db', keep=0) == []
+
+
+def test_backup_command(app, backend, tmp_path):
+    result = app.test_cli_runner().invoke(args=['db-backup', '-o', str(tmp_path), '--gzip'])
+    assert result.exit_code == 0, result.output
+    assert [name.endswith('.db.gz') for name in os.listdir(tmp_path)] == [True]
+
+
+def test_backup_command_rejects_unsupported_database(app, monkeypatch, tmp_path):
+    with app.app_context():
+        monkeypatch.setattr(type(get_backend(db.engine)), 'supports_backup', False)
+    result = app.test_cli_runner().invoke(args=['db-backup', '-o', str(tmp_path)])
+    assert result.exit_code == 2 and 'работает только с SQLite' in result.output
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,126 @@
+# tests/test_board_archive.py
+
+import gzip
+import io
+import json
+
+import pytest
+from sqlalchemy import select
+
+from app import db
+from app.board_archive import ArchiveError, encode_archive, export_board_records, import_board, read_archive
+from app.models import Board, Card, Column, Comment, Job, Tag, User, board_members, card_assignees, card_tags
+
+@pytest.fixture(scope='module')
+def source(make_board):
+    return make_board('archive-', users=4, cards=40, comments=3, members=3, seed=11)
+
+
+@pytest.fixture
+def ctx(app):
+    with app.app_context():
+        Job.query.delete()
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+def _export(board_id, compress=False):
+    return b''.join(encode_archive(export_board_records(db.session.get(Board, board_id)), compress=compress))
+
+
+def _board_content(board_id):
+    """Содержимое доски без id: колонки, теги, карточки со связями и комментарии."""
+    columns = dict(db.session.execute(select(Column.id, Column.name).where(Column.board_id == board_id)).all())
+    tags = dict(db.session.execute(select(Tag.id, Tag.name).where(Tag.board_id == board_id)).all())
+    cards = db.session.execute(select(Card.id, Card.column_id, Card.title, Card.rank)
+                               .where(Card.column_id.in_(columns))).all()
+    titles = {card.id: card.title for card in cards}
+    card_ids = list(titles)
+    return {
+        'columns': sorted(columns.values()),
+        'tags': sorted(tags.values()),
+        'cards': sorted((columns[card.column_id], card.title, card.rank) for card in cards),
+        'assignees': sorted((titles[card_id], email) for card_id, email in db.session.execute(
+            select(card_assignees.c.card_id, User.email).join(User, User.id == card_assignees.c.user_id)
+            .where(card_assignees.c.card_id.in_(card_ids))).all()),
+        'card_tags': sorted((titles[card_id], tags[tag_id]) for card_id, tag_id in db.session.execute(
+            select(card_tags.c.card_id, card_tags.c.tag_id).where(card_tags.c.card_id.in_(card_ids))).all()),
+        'comments': sorted((titles[card_id], user_id, text) for card_id, user_id, text in db.session.execute(
+            select(Comment.card_id, Comment.user_id, Comment.text).where(Comment.card_id.in_(card_ids))).all()),
+        'members': sorted(db.session.execute(select(board_members.c.user_id)
+                                             .where(board_members.c.board_id == board_id)).scalars().all()),
+    }
+
+
+def test_export_import_round_trip(ctx, source):
+    archive = _export(source['board_id'], compress=True)
+    assert archive[:2] == b'\x1f\x8b'
+    records = [json.loads(line) for line in gzip.decompress(archive).decode('utf-8').splitlines()]
+    assert records[0]['type'] == 'board' and records[0]['owner'] == source['owner_email']
+
+    board_id, counts = import_board(read_archive(io.BytesIO(archive)), batch_size=7)
+    assert counts['card'] == 40 and counts['comment'] == 120
+    board = db.session.get(Board, board_id)
+    assert board.deleted_at is None and board.name == 'Доска archive- 1'
+    assert _board_content(board_id) == _board_content(source['board_id'])
+
+
+def test_import_maps_missing_users(ctx, source):
+    owner = User.query.filter_by(email='archive-1@example.com').one()
+    records = list(read_archive(io.BytesIO(_export(source['board_id']))))
+    for record in records:
+        if record['type'] in ('member', 'assignee'):
+            record['email'] = 'nobody-' + record['email']
+        elif record['type'] == 'comment':
+            record['author'] = 'nobody-' + record['author']
+
+    board_id, counts = import_board(records, owner=owner, name='Копия')
+    content = _board_content(board_id)
+    assert db.session.get(Board, board_id).user_id == owner.id
+    assert content['members'] == [] and content['assignees'] == []
+    # Комментарии неизвестных авторов достаются владельцу
+    assert {user_id for _, user_id, _ in content['comments']} == {owner.id}
+    assert counts['comment'] == 120
+
+
+def test_broken_archive_leaves_no_visible_board(ctx, source):
+    archive = _export(source['board_id'])
+    truncated = archive[:len(archive) // 2].rsplit(b'\n', 1)[0] + b'\n{"type": "comment", "card_id": 1'
+    boards_before = Board.query.filter_by(deleted_at=None).count()
+
+    with pytest.raises(ArchiveError):
+        import_board(read_archive(io.BytesIO(truncated)), batch_size=10)
+    assert Board.query.filter_by(deleted_at=None).count() == boards_before
+    assert Job.query.filter_by(kind='board.purge', status='queued').count() == 1
+
+    with pytest.raises(ArchiveError):
+        import_board(read_archive(io.BytesIO(b'{"type": "card", "id": 1}\n')))
+
+
+@pytest.mark.parametrize('rank', ['', 'a0', 'A1', 'a-b', 'z' * 65, 5, None])
+def test_import_rejects_invalid_rank(ctx, source, rank):
+    records = list(read_archive(io.BytesIO(_export(source['board_id']))))
+    card = next(record for record in records if record['type'] == 'card')
+    card['rank'] = rank
+    boards_before = Board.query.filter_by(deleted_at=None).count()
+
+    with pytest.raises(ArchiveError, match='некорректный ранг'):
+        import_board(records)
+    assert Board.query.filter_by(deleted_at=None).count() == boards_before
+
+
+def test_owner_downloads_archive_from_board_settings(app, login, source):
+    other_email = next(email for email in ('archive-1@example.com', 'archive-2@example.com')
+                       if email != source['owner_email'])
+    owner = login(source['owner_email'])
+    assert f"/boards/{source['board_id']}/export" in owner.get(f"/boards/{source['board_id']}/edit") \
+        .get_data(as_text=True)
+
+    response = owner.get(f"/boards/{source['board_id']}/export")
+    assert response.status_code == 200 and response.mimetype == 'application/gzip'
+    assert 'attachment' in response.headers['Content-Disposition']
+    lines = gzip.decompress(response.get_data()).decode('utf-8').splitlines()
+    assert sum(json.loads(line)['type'] == 'comment' for line in lines) == 120
+
+    assert login(other_email).get(f"/boards/{source['board_id']}/export").status_code == 302
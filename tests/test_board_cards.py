@@ -0,0 +1,49 @@
+# tests/test_board_cards.py
+
+import pytest
+
+from app import db
+from app.models import card_assignees
+
+
+@pytest.fixture(scope='module')
+def board(app, make_board):
+    board = make_board('cards-filter-', users=3, cards=40, members=2, seed=4)
+    member_id = board['member_ids'][0]
+    with app.app_context():
+        # Под фильтр по участнику подходят все карточки доски, кроме первой
+        db.session.execute(card_assignees.delete().where(card_assignees.c.user_id == member_id))
+        db.session.execute(card_assignees.insert(), [{'card_id': card_id, 'user_id': member_id}
+                                                     for card_id in board['card_ids'][1:]])
+        db.session.commit()
+        db.session.remove()
+    return board | {'member_id': member_id}
+
+
+def test_filter_pages_cover_all_matches(login, board):
+    client = login(board['owner_email'])
+    card_ids, offset = [], 0
+    while True:
+        body = client.get(f"/api/boards/{board['board_id']}/cards",
+                          query_string={'assignee': board['member_id'], 'limit': 15, 'offset': offset}).get_json()
+        card_ids += [card['id'] for card in body['cards']]
+        offset += 15
+        if not body['has_more']:
+            break
+    assert offset == 45
+    assert len(card_ids) == len(set(card_ids)) and sorted(card_ids) == board['card_ids'][1:]
+
+
+def test_filter_ids_are_not_limited_by_page_size(login, query_counter, board):
+    client = login(board['owner_email'])
+    url = f"/api/boards/{board['board_id']}/cards"
+    page = client.get(url, query_string={'assignee': board['member_id'], 'limit': 10}).get_json()
+    assert page['has_more'] is True and len(page['cards']) == 10
+
+    with query_counter.counting():
+        body = client.get(url, query_string={'assignee': board['member_id'], 'limit': 10, 'fields': 'id'}).get_json()
+    assert body['success'] and body['has_more'] is False and 'cards' not in body
+    assert sorted(body['card_ids']) == board['card_ids'][1:]
+    assert body['card_ids'][:10] == [card['id'] for card in page['cards']]
+    # Теги и исполнители карточек не загружаются
+    assert query_counter.count <= 4
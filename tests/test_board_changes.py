@@ -0,0 +1,97 @@
+# tests/test_board_changes.py
+
+import pytest
+from sqlalchemy import update
+
+from app import db
+from app.models import Board
+
+
+@pytest.fixture(scope='module')
+def board(make_board):
+    board = make_board('changes-', cards=3, seed=3)
+    return board | {'member_id': board['member_ids'][0], 'member_email': board['member_emails'][0]}
+
+
+def _revision(client, board_id):
+    return client.get(f'/api/boards/{board_id}/state').get_json()['board']['version']
+
+
+def test_member_rename_is_reported_in_changes(login, board):
+    owner = login(board['owner_email'])
+    member = login(board['member_email'])
+    since = _revision(owner, board['board_id'])
+
+    response = member.post('/profile/edit_account', data={'username': 'changes-renamed',
+                                                          'email': board['member_email']})
+    assert response.status_code == 302
+
+    body = owner.get(f"/api/boards/{board['board_id']}/changes?since={since}").get_json()
+    assert body['reset'] is False and body['revision'] > since
+    assert len(body['changes']) == body['revision'] - since
+    change = body['changes'][-1]
+    assert (change['entity'], change['action'], change['id']) == ('member', 'updated', board['member_id'])
+    assert change['data']['username'] == 'changes-renamed' and change['data']['avatar_url']
+
+
+def test_revision_without_journal_entry_resets_client(app, login, board):
+    owner = login(board['owner_email'])
+    since = _revision(owner, board['board_id'])
+    with app.app_context():
+        db.session.execute(update(Board).where(Board.id == board['board_id']).values(version=Board.version + 1))
+        db.session.commit()
+
+    body = owner.get(f"/api/boards/{board['board_id']}/changes?since={since}").get_json()
+    assert body['reset'] is True and body['revision'] == since + 1 and body['changes'] == []
+
+
+def _touch_board(client, board):
+    # Перемещение с явной позицией всегда записывает изменение в журнал
+    response = client.post(f"/api/cards/{board['card_ids'][0]}/move",
+                           json={'new_column_id': board['column_ids'][0], 'index': 0})
+    assert response.get_json()['success'] is True
+
+
+def test_state_etag_answers_not_modified_until_board_changes(login, board):
+    owner = login(board['owner_email'])
+    url = f"/api/boards/{board['board_id']}/state"
+    first = owner.get(url)
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag
+
+    cached = owner.get(url, headers={'If-None-Match': etag})
+    assert cached.status_code == 304 and cached.data == b'' and cached.headers['ETag'] == etag
+
+    _touch_board(owner, board)
+    fresh = owner.get(url, headers={'If-None-Match': etag})
+    assert fresh.status_code == 200 and fresh.headers['ETag'] != etag
+    assert fresh.get_json()['board']['version'] == first.get_json()['board']['version'] + 1
+    assert owner.get(url, headers={'If-None-Match': fresh.headers['ETag']}).status_code == 304
+
+
+def test_changes_outside_retention_reset_client(app, login, monkeypatch, board):
+    monkeypatch.setitem(app.config, 'BOARD_CHANGES_RETENTION', 2)
+    owner = login(board['owner_email'])
+    since = _revision(owner, board['board_id'])
+    for _ in range(3):
+        _touch_board(owner, board)
+    url = f"/api/boards/{board['board_id']}/changes"
+
+    body = owner.get(url, query_string={'since': since}).get_json()
+    assert body['reset'] is True and body['revision'] == since + 3 and body['changes'] == []
+    # Последние две ревизии еще в журнале
+    body = owner.get(url, query_string={'since': since + 1}).get_json()
+    assert body['reset'] is False and [change['revision'] for change in body['changes']] == [since + 2, since + 3]
+
+
+def test_since_ahead_of_revision_resets_client(login, board):
+    owner = login(board['owner_email'])
+    revision = _revision(owner, board['board_id'])
+    body = owner.get(f"/api/boards/{board['board_id']}/changes?since={revision + 5}").get_json()
+    assert body['reset'] is True and body['revision'] == revision and body['changes'] == []
+
+
+@pytest.mark.parametrize('since', ['', 'abc', '1.5', '-1'])
+def test_invalid_since_is_rejected(login, board, since):
+    response = login(board['owner_email']).get(f"/api/boards/{board['board_id']}/changes?since={since}")
+    assert response.status_code == 400 and response.get_json()['success'] is False
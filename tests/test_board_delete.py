@@ -0,0 +1,103 @@
+# tests/test_board_delete.py
+
+import pytest
+from sqlalchemy import func, select
+
+from app import db
+from app.jobs import run_pending_jobs
+from app.models import (Board, BoardChange, Card, Column, Comment, Job, Tag, board_members, card_assignees,
+                        card_tags)
+
+
+@pytest.fixture
+def new_board(make_board):
+    def make(prefix):
+        board = make_board(prefix, users=3, cards=30, comments=2, members=2, seed=5)
+        return board | {'member_id': board['member_ids'][0], 'member_email': board['member_emails'][0]}
+    return make
+
+
+def _board_row_counts(board_id):
+    card_ids = select(Card.id).join(Column).where(Column.board_id == board_id)
+    queries = {
+        'board': select(func.count()).select_from(Board).where(Board.id == board_id),
+        'column': select(func.count()).select_from(Column).where(Column.board_id == board_id),
+        'card': select(func.count()).select_from(Card).where(Card.id.in_(card_ids)),
+        'comment': select(func.count()).select_from(Comment).where(Comment.card_id.in_(card_ids)),
+        'tag': select(func.count()).select_from(Tag).where(Tag.board_id == board_id),
+        'board_change': select(func.count()).select_from(BoardChange).where(BoardChange.board_id == board_id),
+        'board_members': select(func.count()).select_from(board_members).where(board_members.c.board_id == board_id),
+    }
+    return {name: db.session.execute(query).scalar() for name, query in queries.items()}
+
+
+@pytest.fixture
+def ctx(app):
+    with app.app_context():
+        Job.query.delete()
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+def test_deleted_board_is_hidden_before_purge(app, login, ctx, new_board):
+    board = new_board('delete-hidden-')
+    board_id = board['board_id']
+    owner = login(board['owner_email'])
+    member = login(board['member_email'])
+    card_id = board['card_ids'][0]
+
+    assert owner.post(f'/boards/{board_id}/delete').status_code == 302
+    # Строки еще не удалены, но доска уже недоступна
+    assert _board_row_counts(board_id)['card'] == 30
+    for client in (owner, member):
+        assert client.get(f'/boards/{board_id}').status_code == 404
+        assert client.get(f'/api/boards/{board_id}/state').status_code == 404
+        assert f'href="/boards/{board_id}"' not in client.get('/dashboard').get_data(as_text=True)
+    assert member.get(f'/cards/{card_id}/comments').status_code == 403
+    assert Job.query.filter_by(kind='board.purge', status='queued').count() == 1
+
+
+def test_purge_deletes_board_rows_in_batches(app, login, query_counter, ctx, new_board):
+    board, other = new_board('delete-purge-'), new_board('delete-other-')
+    other_counts = _board_row_counts(other['board_id'])
+    card_ids = select(Card.id).join(Column).where(Column.board_id == board['board_id'])
+    assert db.session.execute(select(func.count()).select_from(card_tags)
+                              .where(card_tags.c.card_id.in_(card_ids))).scalar() > 0
+    assert login(board['owner_email']).post(f"/boards/{board['board_id']}/delete").status_code == 302
+
+    app.config.update(BOARD_PURGE_BATCH_SIZE=7, BOARD_PURGE_PAUSE=0)
+    try:
+        with query_counter.counting():
+            assert run_pending_jobs(app.config) == 1
+    finally:
+        app.config.update(BOARD_PURGE_BATCH_SIZE=500, BOARD_PURGE_PAUSE=0.05)
+
+    assert set(_board_row_counts(board['board_id']).values()) == {0}
+    assert db.session.execute(select(func.count()).select_from(card_tags)
+                              .where(card_tags.c.card_id.in_(card_ids))).scalar() == 0
+    assert db.session.execute(select(func.count()).select_from(card_assignees)
+                              .where(card_assignees.c.user_id == board['member_id'])).scalar() == 0
+    assert _board_row_counts(other['board_id']) == other_counts
+    # Ни один DELETE не выбирает строки доски без ограничения размера пачки
+    deletes = [statement for statement in query_counter.statements if statement.startswith('DELETE')]
+    assert len(deletes) > 30 // 7
+    assert all('LIMIT' in statement or ' IN (' in statement or 'board.id = ' in statement
+               for statement in deletes)
+
+
+def test_purge_continues_in_next_job_after_time_budget(app, login, ctx, new_board):
+    board = new_board('delete-budget-')
+    assert login(board['owner_email']).post(f"/boards/{board['board_id']}/delete").status_code == 302
+
+    app.config.update(BOARD_PURGE_BATCH_SIZE=10, BOARD_PURGE_PAUSE=0, BOARD_PURGE_TIME_BUDGET=0)
+    try:
+        assert run_pending_jobs(app.config, limit=1) == 1
+        assert Job.query.filter_by(kind='board.purge', status='queued').count() == 1
+        assert _board_row_counts(board['board_id'])['board'] == 1
+        run_pending_jobs(app.config)
+    finally:
+        app.config.update(BOARD_PURGE_BATCH_SIZE=500, BOARD_PURGE_PAUSE=0.05, BOARD_PURGE_TIME_BUDGET=30)
+
+    assert set(_board_row_counts(board['board_id']).values()) == {0}
+    assert Job.query.filter_by(kind='board.purge', status='failed').count() == 0
@@ -0,0 +1,62 @@
+# tests/test_board_members.py
+
+import pytest
+from sqlalchemy import func, select
+
+from app import db
+from app.models import User, board_members, card_assignees
+
+
+def _make_board(make_board, prefix, cards):
+    board = make_board(prefix, users=4, cards=cards, members=3, seed=2)
+    member_id = board['member_ids'][0]
+    # Участник назначен исполнителем всех карточек доски
+    db.session.execute(card_assignees.delete().where(card_assignees.c.user_id == member_id))
+    db.session.execute(card_assignees.insert(), [{'card_id': card_id, 'user_id': member_id}
+                                                 for card_id in board['card_ids']])
+    db.session.commit()
+    return board | {'member_id': member_id}
+
+
+@pytest.fixture(scope='module')
+def boards(app, make_board):
+    with app.app_context():
+        data = {'small': _make_board(make_board, 'members-small-', 5),
+                'large': _make_board(make_board, 'members-large-', 500),
+                'other': _make_board(make_board, 'members-other-', 5)}
+        db.session.remove()
+    return data
+
+
+def _assigned_cards(user_id):
+    return db.session.execute(select(func.count()).select_from(card_assignees)
+                              .where(card_assignees.c.user_id == user_id)).scalar()
+
+
+def test_remove_from_board_is_independent_of_board_size(app, login, query_counter, boards):
+    counts = {}
+    for size in ('small', 'large'):
+        board = boards[size]
+        client = login(board['owner_email'])
+        with query_counter.counting():
+            response = client.post(f"/boards/{board['board_id']}/members/{board['member_id']}/remove")
+        assert response.status_code == 302
+        counts[size] = query_counter.count
+        with app.app_context():
+            assert not db.session.get(User, board['member_id']).is_board_member(board['board_id'], use_cache=False)
+            assert _assigned_cards(board['member_id']) == 0
+    assert counts['small'] == counts['large']
+
+
+def test_remove_from_board_keeps_assignments_on_other_boards(app, login, boards):
+    board, other = boards['small'], boards['other']
+    with app.app_context():
+        # Участник другой доски назначается и на карточку этой доски; удаление с нее не трогает другую
+        db.session.execute(board_members.insert().values(board_id=board['board_id'], user_id=other['member_id']))
+        db.session.execute(card_assignees.insert().values(card_id=board['card_ids'][0], user_id=other['member_id']))
+        db.session.commit()
+        before = _assigned_cards(other['member_id'])
+    client = login(board['owner_email'])
+    assert client.post(f"/boards/{board['board_id']}/members/{other['member_id']}/remove").status_code == 302
+    with app.app_context():
+        assert _assigned_cards(other['member_id']) == before - 1
@@ -0,0 +1,139 @@
+# tests/test_card_batch.py
+
+from itertools import count
+
+import pytest
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Card, Comment, card_assignees, card_tags
+
+
+_board_numbers = count()
+
+
+@pytest.fixture
+def board(make_board):
+    # Пакет меняет и удаляет карточки, поэтому каждому тесту - своя доска
+    return make_board(f'batch-{next(_board_numbers)}-', users=3, cards=6, comments=2, members=2, seed=6)
+
+
+def _batch(client, board, operations, **kwargs):
+    return client.post(f"/api/boards/{board['board_id']}/cards/batch", json={'operations': operations, **kwargs})
+
+
+def _revision(client, board):
+    return client.get(f"/api/boards/{board['board_id']}/state").get_json()['board']['version']
+
+
+def _card_state(app, card_ids):
+    with app.app_context():
+        rows = db.session.execute(select(Card.id, Card.column_id, Card.rank).where(Card.id.in_(card_ids))).all()
+        db.session.remove()
+    return {card_id: (column_id, rank) for card_id, column_id, rank in rows}
+
+
+def test_non_atomic_batch_commits_valid_operations(app, login, board):
+    client = login(board['owner_email'])
+    since = _revision(client, board)
+    card_id, column_id = board['card_ids'][0], board['column_ids'][-1]
+
+    body = _batch(client, board, [
+        {'op': 'move', 'card_ids': [str(card_id)], 'column_id': column_id},
+        {'op': 'add_tags', 'card_ids': [card_id], 'tag_ids': [10 ** 9]},
+    ]).get_json()
+    assert body['success'] is False and body['revision'] == since + 1
+    assert [result['success'] for result in body['results']] == [True, False]
+    assert _card_state(app, [card_id])[card_id][0] == column_id
+
+
+def test_atomic_batch_rolls_back_everything(app, login, board):
+    client = login(board['owner_email'])
+    since = _revision(client, board)
+    card_id = board['card_ids'][0]
+    before = _card_state(app, [card_id])
+
+    response = _batch(client, board, [
+        {'op': 'move', 'card_ids': [card_id], 'column_id': board['column_ids'][-1]},
+        {'op': 'delete', 'card_ids': [10 ** 9]},
+    ], atomic=True)
+    assert response.status_code == 400 and response.get_json()['success'] is False
+    assert _card_state(app, [card_id]) == before and _revision(client, board) == since
+
+
+def test_move_keeps_requested_order(app, login, board):
+    client = login(board['owner_email'])
+    card_ids = [board['card_ids'][4], board['card_ids'][1], board['card_ids'][3]]
+    column_id = board['column_ids'][0]
+
+    body = _batch(client, board, [{'op': 'move', 'card_ids': card_ids, 'column_id': column_id, 'index': 0}]).get_json()
+    assert body['success'] is True
+    with app.app_context():
+        ordered = db.session.scalars(select(Card.id).where(Card.column_id == column_id)
+                                     .order_by(Card.rank, Card.id)).all()
+        db.session.remove()
+    assert ordered[:3] == card_ids
+
+
+def test_add_tags_twice_is_idempotent(app, login, board):
+    client = login(board['owner_email'])
+    card_ids, tag_ids = board['card_ids'][:3], board['tag_ids'][:2]
+    operation = {'op': 'add_tags', 'card_ids': card_ids, 'tag_ids': tag_ids}
+
+    for _ in range(2):
+        assert _batch(client, board, [operation]).get_json()['success'] is True
+    with app.app_context():
+        pairs = db.session.execute(select(card_tags.c.card_id, card_tags.c.tag_id)
+                                   .where(card_tags.c.card_id.in_(card_ids))).all()
+        db.session.remove()
+    expected = {(card_id, tag_id) for card_id in card_ids for tag_id in tag_ids}
+    # Каждая пара ровно один раз: повторное добавление не создает дублей
+    assert sorted(pair for pair in pairs if pair in expected) == sorted(expected)
+
+
+def test_delete_removes_related_rows(app, login, board):
+    client = login(board['owner_email'])
+    card_ids = board['card_ids'][:2]
+    body = _batch(client, board, [
+        {'op': 'add_tags', 'card_ids': card_ids, 'tag_ids': board['tag_ids'][:1]},
+        {'op': 'add_assignees', 'card_ids': card_ids, 'user_ids': [board['owner_id']]},
+        {'op': 'delete', 'card_ids': card_ids},
+    ]).get_json()
+    assert body['success'] is True
+
+    with app.app_context():
+        for table in (Card.__table__, card_tags, card_assignees, Comment.__table__):
+            key = table.c.id if table is Card.__table__ else table.c.card_id
+            assert db.session.scalar(select(func.count()).select_from(table).where(key.in_(card_ids))) == 0
+        db.session.remove()
+
+
+@pytest.mark.parametrize('operation', [
+    {'op': 'archive', 'card_ids': [0]},
+    {'card_ids': [0]},
+    {'op': 'delete', 'card_ids': 'all'},
+    {'op': 'delete', 'card_ids': []},
+    {'op': 'delete', 'card_ids': [True]},
+    {'op': 'delete', 'card_ids': [1.5]},
+    {'op': 'delete', 'card_ids': ['x']},
+    {'op': 'add_tags', 'card_ids': [0], 'tag_ids': 'x'},
+    ['delete', 1],
+])
+def test_malformed_operation_is_rejected(app, login, board, operation):
+    client = login(board['owner_email'])
+    operation = operation.copy()
+    if isinstance(operation, dict) and operation.get('card_ids') == [0]:
+        operation['card_ids'] = [board['card_ids'][0]]
+    since = _revision(client, board)
+
+    body = _batch(client, board, [operation]).get_json()
+    assert body['success'] is False and body['results'][0]['success'] is False
+    assert body['revision'] == since
+    assert board['card_ids'][0] in _card_state(app, board['card_ids'][:1])
+
+
+@pytest.mark.parametrize('payload', [None, {}, {'operations': []}, {'operations': {'op': 'delete'}}])
+def test_batch_without_operations_is_rejected(login, board, payload):
+    client = login(board['owner_email'])
+    response = client.post(f"/api/boards/{board['board_id']}/cards/batch", json=payload)
+    assert response.status_code == 400 and response.get_json()['success'] is False
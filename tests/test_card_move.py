@@ -0,0 +1,131 @@
+# tests/test_card_move.py
+
+from itertools import count
+
+import pytest
+from sqlalchemy import select, update
+
+import run  # noqa: F401 - регистрирует CLI-команды приложения
+from app import db
+from app.jobs import run_job
+from app.models import Card, Column, Job
+
+_board_numbers = count()
+
+
+@pytest.fixture
+def board(app, make_board):
+    """Доска с пятью карточками в первой колонке (ранги a..e) и одной во второй."""
+    board = make_board(f'move-{next(_board_numbers)}-', users=2, cards=0, members=1)
+    with app.app_context():
+        cards = [Card(title=f'Карточка {rank}', column_id=board['column_ids'][0], rank=rank) for rank in 'abcde']
+        foreign = Card(title='Чужая колонка', column_id=board['column_ids'][1], rank='i')
+        db.session.add_all(cards + [foreign])
+        db.session.commit()
+        board |= {'card_ids': [card.id for card in cards], 'foreign_card_id': foreign.id}
+        db.session.remove()
+    return board
+
+
+def _order(app, column_id):
+    with app.app_context():
+        rows = db.session.execute(select(Card.id, Card.rank).where(Card.column_id == column_id)
+                                  .order_by(Card.rank, Card.id)).all()
+        db.session.remove()
+    return [card_id for card_id, _ in rows], [rank for _, rank in rows]
+
+
+def _move(client, card_id, column_id, **position):
+    return client.post(f'/api/cards/{card_id}/move', json={'new_column_id': column_id, **position})
+
+
+@pytest.mark.parametrize('position, expected', [
+    ({'index': 0}, [4, 0, 1, 2, 3]),
+    ({'index': 2}, [0, 1, 4, 2, 3]),
+    ({'index': 99}, [0, 1, 2, 3, 4]),
+    ({'prev_card_id': 0}, [0, 4, 1, 2, 3]),
+    ({'next_card_id': 0}, [4, 0, 1, 2, 3]),
+    ({'prev_card_id': 1, 'next_card_id': 2}, [0, 1, 4, 2, 3]),
+])
+def test_move_within_column_sorts_by_rank(app, login, board, position, expected):
+    card_ids, column_id = board['card_ids'], board['column_ids'][0]
+    position = {key: card_ids[value] if key.endswith('_card_id') else value for key, value in position.items()}
+
+    body = _move(login(board['owner_email']), card_ids[4], column_id, **position).get_json()
+    assert body['success'] is True
+    order, ranks = _order(app, column_id)
+    assert order == [card_ids[i] for i in expected]
+    assert ranks == sorted(set(ranks)) and body['rank'] == ranks[expected.index(4)]
+
+
+def test_move_to_other_column_updates_one_row(app, login, query_counter, board):
+    client = login(board['owner_email'])
+    target_id = board['column_ids'][1]
+    with query_counter.counting():
+        response = _move(client, board['card_ids'][2], target_id, prev_card_id=board['foreign_card_id'])
+    assert response.get_json()['success'] is True
+    card_updates = [statement for statement in query_counter.statements if statement.startswith('UPDATE card ')]
+    assert len(card_updates) == 1
+    assert _order(app, target_id)[0] == [board['foreign_card_id'], board['card_ids'][2]]
+
+
+@pytest.mark.parametrize('position', [
+    {'index': -1}, {'index': '1'}, {'index': True},
+    {'prev_card_id': 'self'}, {'next_card_id': 'self'}, {'prev_card_id': 'foreign'}, {'next_card_id': 'x'},
+])
+def test_invalid_position_is_rejected(app, login, board, position):
+    card_id, column_id = board['card_ids'][1], board['column_ids'][0]
+    substitutes = {'self': card_id, 'foreign': board['foreign_card_id']}
+    position = {key: substitutes.get(value, value) if isinstance(value, str) else value
+                for key, value in position.items()}
+    before = _order(app, column_id)
+
+    response = _move(login(board['owner_email']), card_id, column_id, **position)
+    assert response.status_code == 400 and response.get_json()['success'] is False
+    assert _order(app, column_id) == before
+
+
+def _stretch_ranks(app, board):
+    # Длинные, но упорядоченные ранги, как после многих вставок в одно место
+    with app.app_context():
+        card_table = Card.__table__
+        for i, card_id in enumerate(board['card_ids']):
+            db.session.execute(update(card_table).where(card_table.c.id == card_id).values(rank='a' + '1' * (i + 12)))
+        db.session.commit()
+        db.session.remove()
+
+
+def test_rebalance_shortens_ranks_and_keeps_order(app, board):
+    column_id = board['column_ids'][0]
+    _stretch_ranks(app, board)
+    order_before, _ = _order(app, column_id)
+
+    result = app.test_cli_runner().invoke(args=['ranks-rebalance', '--board-id', str(board['board_id'])])
+    assert result.exit_code == 0, result.output
+    order, ranks = _order(app, column_id)
+    assert order == order_before == board['card_ids']
+    assert max(map(len, ranks)) == 1 and ranks == sorted(set(ranks))
+
+    with app.app_context():
+        # Повторное выравнивание ничего не меняет
+        assert db.session.get(Column, column_id).rebalance_card_ranks() == 0
+        db.session.remove()
+
+
+def test_long_rank_schedules_single_rebalance_job(app, login, monkeypatch, board):
+    monkeypatch.setitem(app.config, 'CARD_RANK_REBALANCE_LENGTH', 1)
+    client = login(board['owner_email'])
+    card_ids, column_id = board['card_ids'], board['column_ids'][0]
+
+    # Между соседними рангами 'a' и 'b' новый ранг длиннее одного символа
+    assert len(_move(client, card_ids[4], column_id, index=1).get_json()['rank']) > 1
+    assert len(_move(client, card_ids[3], column_id, index=1).get_json()['rank']) > 1
+    with app.app_context():
+        jobs = Job.query.filter_by(kind='rank.rebalance', unique_key=str(column_id), status='queued').all()
+        assert len(jobs) == 1
+        assert run_job(jobs[0].id, app.config) is True
+        db.session.remove()
+
+    order, ranks = _order(app, column_id)
+    assert order == [card_ids[i] for i in (0, 3, 4, 1, 2)]
+    assert max(map(len, ranks)) == 1
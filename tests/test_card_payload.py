@@ -0,0 +1,116 @@
+# tests/test_card_payload.py
+
+# Число SQL-запросов модального окна карточки и комментариев не должно зависеть
+# от числа участников доски, тегов и комментариев.
+
+import re
+
+import pytest
+
+from app import db
+from app.models import Board, Comment, Tag
+
+AJAX = {'X-Requested-With': 'XMLHttpRequest'}
+# Загрузка пользователей по списку id; в PostgreSQL имя таблицы user заключается в кавычки
+USERS_BY_IDS_RE = re.compile(r'^SELECT .*\bFROM "?user"?\s.*(?<![\w.])"?user"?\.id IN\b', re.S)
+
+
+@pytest.fixture(scope='module')
+def boards(app, make_board):
+    data = {}
+    for size, members in (('small', 2), ('large', 60)):
+        board = make_board(f'payload-{size}-', users=members + 1, cards=5, comments=members, members=members)
+        with app.app_context():
+            # Исполнители в том порядке, в котором их показывает окно карточки
+            assignees = db.session.get(Board, board['board_id']).get_eligible_assignees()
+            data[size] = board | {'card_id': board['card_ids'][0], 'assignee_ids': [user.id for user in assignees]}
+            db.session.remove()
+    return data
+
+
+def _count(query_counter, send):
+    with query_counter.counting():
+        response = send()
+    assert response.status_code in (200, 201), response.get_data(as_text=True)[:500]
+    return response, query_counter.count
+
+
+def test_edit_card_get_queries_do_not_depend_on_members(login, query_counter, boards):
+    counts = {}
+    for size, board in boards.items():
+        client = login(board['owner_email'])
+        response, counts[size] = _count(query_counter,
+                                        lambda: client.get(f"/cards/{board['card_id']}/edit", headers=AJAX))
+        data = response.get_json()
+        assert [user['id'] for user in data['all_board_assignees']] == board['assignee_ids']
+        assert sorted(tag['id'] for tag in data['all_board_tags']) == sorted(board['tag_ids'])
+        assert data['card']['assignee_ids'] == [user['id'] for user in data['card']['assignees']]
+    assert counts['small'] == counts['large'] <= 7
+
+
+def test_edit_card_post_returns_updated_card(login, query_counter, boards):
+    counts = {}
+    for size, board in boards.items():
+        client = login(board['owner_email'])
+        assignee_ids, tag_ids = board['assignee_ids'][:2], board['tag_ids'][:3]
+        form = {'title': 'Новый заголовок', 'description': 'Описание', 'assignees': assignee_ids, 'tags': tag_ids}
+        response, counts[size] = _count(query_counter, lambda: client.post(
+            f"/cards/{board['card_id']}/edit", data=form, headers=AJAX))
+        card = response.get_json()['card']
+        assert card['title'] == 'Новый заголовок'
+        assert card['assignee_ids'] == sorted(assignee_ids)
+        assert card['tag_ids'] == sorted(tag_ids)
+
+        reloaded = client.get(f"/cards/{board['card_id']}/edit", headers=AJAX).get_json()['card']
+        assert reloaded['assignee_ids'] == card['assignee_ids'] and reloaded['tag_ids'] == card['tag_ids']
+    # Не больше одного DELETE и одного INSERT на связующую таблицу, сколько бы связей ни менялось
+    assert max(counts.values()) <= 14
+
+
+def test_edit_card_post_statements_do_not_depend_on_labels(app, login, query_counter, boards):
+    board = boards['large']
+    with app.app_context():
+        extra_tags = [Tag(name=f'Метка {n}', color='#777777', board_id=board['board_id']) for n in range(40)]
+        db.session.add_all(extra_tags)
+        db.session.commit()
+        tag_ids = board['tag_ids'] + [tag.id for tag in extra_tags]
+        db.session.remove()
+    client = login(board['owner_email'])
+
+    def save(assignee_ids, tag_ids):
+        form = {'title': 'Метки', 'assignees': assignee_ids, 'tags': tag_ids}
+        response, count = _count(query_counter, lambda: client.post(
+            f"/cards/{board['card_id']}/edit", data=form, headers=AJAX))
+        assert response.get_json()['card']['tag_ids'] == sorted(tag_ids)
+        return count
+
+    save([], [])
+    few = save(board['assignee_ids'][:1], tag_ids[:1])
+    save([], [])
+    many = save(board['assignee_ids'], tag_ids)
+    assert few == many
+    replaced = save(board['assignee_ids'][:1], tag_ids[:1])  # удаление десятков связей - тоже по одному DELETE
+    assert replaced == many
+
+
+def test_comments_queries_do_not_depend_on_authors(login, query_counter, boards):
+    counts = {}
+    for size, board in boards.items():
+        client = login(board['owner_email'])
+        response, counts[size] = _count(query_counter,
+                                        lambda: client.get(f"/cards/{board['card_id']}/comments", headers=AJAX))
+        comments = response.get_json()['comments']
+        assert comments and all(comment['author']['username'] for comment in comments)
+    assert counts['small'] == counts['large'] <= 6
+
+
+def test_add_comment_does_not_reload_author(app, login, query_counter, boards):
+    board = boards['small']
+    client = login(board['owner_email'])
+    response, count = _count(query_counter, lambda: client.post(
+        f"/cards/{board['card_id']}/comments/add", data={'text': 'Проверка'}, headers=AJAX))
+    comment = response.get_json()['comment']
+    assert comment['author']['username'] == board['owner_email'].split('@')[0]
+    with app.app_context():
+        assert db.session.get(Comment, comment['id']).text == 'Проверка'
+    assert not [statement for statement in query_counter.statements if USERS_BY_IDS_RE.search(statement)]
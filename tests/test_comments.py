@@ -0,0 +1,59 @@
+# tests/test_comments.py
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Card, Comment
+
+
+@pytest.fixture(scope='module')
+def card(app, make_board):
+    """Карточка с семью комментариями; у трех одинаковое время, порядок между ними - по id."""
+    board = make_board('comments-', users=2, cards=0, members=1)
+    started = datetime(2026, 1, 1, 12, 0)
+    with app.app_context():
+        card = Card(title='Обсуждение', column_id=board['column_ids'][0], rank='i')
+        db.session.add(card)
+        db.session.flush()
+        comments = [Comment(text=f'Комментарий {n}', user_id=board['owner_id'], card_id=card.id,
+                            timestamp=started + timedelta(minutes=min(n, 3)))
+                    for n in range(7)]
+        db.session.add_all(comments)
+        db.session.commit()
+        result = board | {'card_id': card.id, 'comment_ids': [comment.id for comment in comments]}
+        db.session.remove()
+    return result
+
+
+def _page(client, card, **params):
+    return client.get(f"/cards/{card['card_id']}/comments", query_string=params)
+
+
+def test_before_cursor_pages_through_all_comments(login, card):
+    client = login(card['owner_email'])
+    pages, params = [], {'limit': 3}
+    while True:
+        body = _page(client, card, **params).get_json()
+        pages.append([comment['id'] for comment in body['comments']])
+        if not body['has_more']:
+            assert body['before'] is None
+            break
+        params['before'] = body['before']
+
+    # Страницы идут от новых к старым, внутри страницы - хронологический порядок
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [comment_id for page in reversed(pages) for comment_id in page] == card['comment_ids']
+
+
+def test_last_page_reports_no_more(login, card):
+    body = _page(login(card['owner_email']), card, limit=7).get_json()
+    assert body['has_more'] is False and body['before'] is None
+    assert [comment['id'] for comment in body['comments']] == card['comment_ids']
+
+
+@pytest.mark.parametrize('before', ['x', '123', '_5', '2026-01-01T12:00:00_', '2026-01-01T12:00:00_x', 'вчера_1'])
+def test_invalid_cursor_is_rejected(login, card, before):
+    response = _page(login(card['owner_email']), card, before=before)
+    assert response.status_code == 400 and response.get_json()['success'] is False
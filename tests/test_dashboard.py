@@ -0,0 +1,62 @@
+# tests/test_dashboard.py
+
+import pytest
+from sqlalchemy import select
+
+from app import db
+from app.models import Board
+from app.routes import _dashboard_boards
+
+
+@pytest.fixture(scope='module')
+def member(app, login, make_board):
+    """Участник чужой доски, создавший еще пять своих досок через дашборд."""
+    board = make_board('dashboard-', users=3, cards=2, members=2, seed=8)
+    client = login(board['member_emails'][0])
+    for n in range(5):
+        assert client.post('/dashboard', data={'name': f'Своя доска {n}'}).status_code == 302
+    with app.app_context():
+        own_ids = db.session.scalars(select(Board.id).where(Board.user_id == board['member_ids'][0])).all()
+        db.session.remove()
+    return {'user_id': board['member_ids'][0], 'client': client, 'shared_board_id': board['board_id'],
+            'own_board_ids': own_ids}
+
+
+def _pages(app, user_id, limit):
+    pages, before = [], None
+    with app.app_context():
+        while True:
+            rows, has_more = _dashboard_boards(user_id, before, limit)
+            pages.append(rows)
+            if not has_more:
+                break
+            before = rows[-1].id
+        db.session.remove()
+    return pages
+
+
+def test_pages_have_no_duplicates_or_gaps(app, member):
+    expected = sorted(member['own_board_ids'] + [member['shared_board_id']], reverse=True)
+    for limit in (1, 2, 5, 6, 50):
+        pages = _pages(app, member['user_id'], limit)
+        assert [row.id for page in pages for row in page] == expected
+        assert all(len(page) == limit for page in pages[:-1]) and 0 < len(pages[-1]) <= limit
+
+
+def test_new_board_has_last_activity(app, member):
+    (rows,) = _pages(app, member['user_id'], 50)
+    created = [row for row in rows if row.id in member['own_board_ids']]
+    assert len(created) == 5
+    assert all(row.last_activity is not None and row.card_count == 0 and row.member_count == 0 for row in created)
+    assert 'Изменена' in member['client'].get('/dashboard').get_data(as_text=True)
+
+
+def test_before_link_continues_listing(app, monkeypatch, member):
+    monkeypatch.setattr('app.routes.DASHBOARD_PAGE_SIZE', 4)
+    first = member['client'].get('/dashboard').get_data(as_text=True)
+    ids = sorted(member['own_board_ids'] + [member['shared_board_id']], reverse=True)
+    assert f'?before={ids[3]}' in first
+    second = member['client'].get(f'/dashboard?before={ids[3]}').get_data(as_text=True)
+    assert all(f'href="/boards/{board_id}"' in first for board_id in ids[:4])
+    assert all(f'href="/boards/{board_id}"' in second for board_id in ids[4:])
+    assert not any(f'href="/boards/{board_id}"' in second for board_id in ids[:4])
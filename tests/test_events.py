@@ -0,0 +1,73 @@
+# tests/test_events.py
+
+from sqlalchemy import select
+
+from app import db
+from app.events import BoardEventBroker, broker, queue_board_event
+
+
+def _drain(subscription):
+    events = []
+    while (payload := subscription.get(timeout=0)) is not None:
+        events.append(payload)
+    return events
+
+
+def test_overflowing_subscriber_is_dropped_others_keep_receiving():
+    events = BoardEventBroker(max_queue_size=3)
+    slow, fast, other_board = events.subscribe(1), events.subscribe(1), events.subscribe(2)
+
+    received = []
+    for revision in range(1, 6):
+        events.publish(1, {'revision': revision})
+        received += _drain(fast)
+
+    assert slow.overflowed is True and fast.overflowed is False
+    assert events.subscriber_count(1) == 1 and events.subscriber_count() == 2
+    assert [payload['revision'] for payload in received] == [1, 2, 3, 4, 5]
+    # Отключенная подписка больше ничего не получает, ее очередь не растет
+    assert [payload['revision'] for payload in _drain(slow)] == [1, 2, 3]
+    events.publish(1, {'revision': 6})
+    assert _drain(slow) == [] and _drain(fast) == [{'revision': 6}]
+    assert _drain(other_board) == [] and other_board.overflowed is False
+
+
+def test_subscription_queue_size_can_be_overridden():
+    events = BoardEventBroker(max_queue_size=100)
+    subscription = events.subscribe(1, max_queue_size=1)
+    events.publish(1, {'revision': 1})
+    events.publish(1, {'revision': 2})
+    assert subscription.overflowed is True and events.subscriber_count(1) == 0
+
+
+def test_events_are_published_only_after_commit(app):
+    subscription = broker.subscribe(-1)
+    try:
+        with app.app_context():
+            # События ставятся в очередь внутри транзакции, как в Board.record_change
+            db.session.execute(select(1))
+            queue_board_event(db.session(), -1, {'revision': 1})
+            db.session.rollback()
+            db.session.execute(select(1))
+            queue_board_event(db.session(), -1, {'revision': 2})
+            db.session.commit()
+            db.session.remove()
+        assert _drain(subscription) == [{'revision': 2}]
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def test_overflowed_stream_sends_reset(app, login, monkeypatch, make_board):
+    board = make_board('events-', users=1, cards=1, members=0)
+    monkeypatch.setitem(app.config, 'BOARD_EVENTS_QUEUE_SIZE', 2)
+    client = login(board['owner_email'])
+    response = client.get(f"/boards/{board['board_id']}/events", buffered=False)
+    chunks = response.response
+    try:
+        assert b'event: hello' in next(chunks)
+        for revision in range(1, 4):
+            broker.publish(board['board_id'], {'revision': revision})
+        assert broker.subscriber_count(board['board_id']) == 0
+        assert b'event: reset' in next(chunks) and next(chunks, None) is None
+    finally:
+        response.close()
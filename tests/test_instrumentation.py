@@ -0,0 +1,103 @@
+# tests/test_instrumentation.py
+
+import logging
+import re
+
+import pytest
+
+from app import db
+from app.instrumentation import metrics
+from app.models import User
+
+@pytest.fixture(scope='module')
+def board(app, make_board):
+    board = make_board('metrics-', users=2, cards=10, comments=1, members=1, seed=7)
+    with app.app_context():
+        User.query.filter_by(id=board['owner_id']).update({User.is_admin: True})
+        db.session.commit()
+    return board
+
+
+@pytest.fixture
+def instrumented(app):
+    app.config.update(INSTRUMENTATION_ENABLED=True, SLOW_REQUEST_THRESHOLD_MS=60000)
+    metrics.reset()
+    yield app
+    app.config.update(INSTRUMENTATION_ENABLED=False, SLOW_REQUEST_THRESHOLD_MS=500)
+    metrics.reset()
+
+
+def _sql_count(response):
+    return int(re.search(r'desc="(\d+) SQL"', response.headers['Server-Timing']).group(1))
+
+
+def test_server_timing_only_when_enabled(app, login, board):
+    client = login(board['owner_email'])
+    assert 'Server-Timing' not in client.get(f"/boards/{board['board_id']}").headers
+
+    app.config['INSTRUMENTATION_ENABLED'] = True
+    try:
+        response = client.get(f"/boards/{board['board_id']}")
+    finally:
+        app.config['INSTRUMENTATION_ENABLED'] = False
+    assert re.fullmatch(r'db;dur=[\d.]+;desc="\d+ SQL", tpl;dur=[\d.]+, total;dur=[\d.]+',
+                        response.headers['Server-Timing'])
+    assert _sql_count(response) > 0
+    assert 'Server-Timing' not in client.get(f"/boards/{board['board_id']}").headers
+
+
+def test_query_counts_per_endpoint(instrumented, login, query_counter, board):
+    client = login(board['owner_email'])
+    counts = []
+    for _ in range(3):
+        with query_counter.counting():
+            response = client.get(f"/boards/{board['board_id']}")
+        assert _sql_count(response) == query_counter.count
+        counts.append(query_counter.count)
+
+    stats = metrics.snapshot()['view_board']
+    assert stats['requests'] == 3 and stats['queries'] == sum(counts)
+    assert stats['slow_requests'] == 0 and stats['errors'] == 0
+
+
+def test_admin_metrics_html_and_prometheus(instrumented, login, board):
+    client = login(board['owner_email'])
+    client.get(f"/boards/{board['board_id']}")
+    client.get(f"/boards/{board['board_id']}")
+
+    html = client.get('/admin/metrics').get_data(as_text=True)
+    assert '<code>view_board</code>' in html and 'Сбор метрик выключен' not in html
+
+    response = client.get('/admin/metrics?format=prometheus')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert '# TYPE kanban_request_duration_seconds summary' in text
+    assert 'kanban_request_duration_seconds_count{endpoint="view_board"} 2' in text
+    assert re.search(r'kanban_request_duration_seconds_sum\{endpoint="view_board"\} [\d.e-]+\n', text)
+    assert re.search(r'kanban_request_duration_seconds\{endpoint="view_board",quantile="0.95"\} [\d.e-]+\n', text)
+    assert '# TYPE kanban_sql_duration_seconds_total counter' in text
+    # Суммы без числа наблюдений не экспортируются: _sum есть только у summary
+    assert set(re.findall(r'^(\w+)_sum\{', text, re.M)) == {'kanban_request_duration_seconds'}
+
+
+def test_slow_request_is_logged_with_slowest_statements(instrumented, login, board, caplog):
+    client = login(board['owner_email'])
+    with caplog.at_level(logging.WARNING, logger=instrumented.logger.name):
+        client.get(f"/boards/{board['board_id']}")
+        assert not [record for record in caplog.records if 'Медленный запрос' in record.getMessage()]
+
+        instrumented.config.update(SLOW_REQUEST_THRESHOLD_MS=0, SLOW_REQUEST_LOGGED_STATEMENTS=2)
+        try:
+            client.get(f"/boards/{board['board_id']}")
+        finally:
+            instrumented.config['SLOW_REQUEST_LOGGED_STATEMENTS'] = 5
+
+    messages = [record.getMessage() for record in caplog.records if 'Медленный запрос' in record.getMessage()]
+    assert len(messages) == 1
+    message = messages[0]
+    assert f"GET /boards/{board['board_id']} (view_board)" in message
+    statements = message.split('Самые долгие SQL:\n')[1].splitlines()
+    assert len(statements) == 2 and all(re.match(r'  [\d.]+ мс: SELECT ', line) for line in statements)
+    durations = [float(line.split()[0]) for line in statements]
+    assert durations == sorted(durations, reverse=True)
+    assert metrics.snapshot()['view_board']['slow_requests'] == 1
@@ -0,0 +1,114 @@
+# tests/test_jobs.py
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.jobs import (PermanentJobError, claim_next_job, enqueue, job_handler, purge_finished_jobs,
+                      requeue_stale_jobs, run_pending_jobs)
+from app.models import Job
+
+calls = []
+
+
+@job_handler('test.flaky', max_attempts=3)
+def flaky(key, failures):
+    calls.append(key)
+    if calls.count(key) <= failures:
+        raise RuntimeError(f'сбой {calls.count(key)}')
+
+
+@job_handler('test.permanent')
+def permanent():
+    raise PermanentJobError('неверные данные')
+
+
+@pytest.fixture
+def ctx(app):
+    with app.app_context():
+        Job.query.delete()
+        db.session.commit()
+        calls.clear()
+        yield app
+        db.session.remove()
+
+
+def _make_due():
+    Job.query.filter_by(status='queued').update({Job.run_at: datetime.utcnow()})
+    db.session.commit()
+
+
+def test_job_runs_only_after_commit(ctx):
+    enqueue('test.flaky', {'key': 'a', 'failures': 0})
+    db.session.rollback()
+    assert run_pending_jobs(ctx.config) == 0
+
+    job = enqueue('test.flaky', {'key': 'a', 'failures': 0})
+    db.session.commit()
+    assert run_pending_jobs(ctx.config) == 1
+    assert db.session.get(Job, job.id).status == 'done' and calls == ['a']
+
+
+def test_failed_job_is_retried_with_backoff(ctx):
+    job = enqueue('test.flaky', {'key': 'b', 'failures': 2})
+    db.session.commit()
+    job_id = job.id
+
+    run_pending_jobs(ctx.config)
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.attempts) == ('queued', 1)
+    assert job.run_at > datetime.utcnow() + timedelta(seconds=ctx.config['JOBS_BACKOFF_BASE'] * 0.7)
+    assert 'сбой 1' in job.last_error
+    assert run_pending_jobs(ctx.config) == 0  # задержка еще не прошла
+
+    _make_due()
+    run_pending_jobs(ctx.config)
+    _make_due()
+    run_pending_jobs(ctx.config)
+    db.session.expire_all()
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.attempts, job.last_error) == ('done', 3, None)
+
+
+def test_job_fails_after_max_attempts_or_permanent_error(ctx):
+    jobs = [enqueue('test.flaky', {'key': 'c', 'failures': 10}), enqueue('test.permanent')]
+    db.session.commit()
+    flaky_id, permanent_id = (job.id for job in jobs)
+    for _ in range(3):
+        _make_due()
+        run_pending_jobs(ctx.config)
+    db.session.expire_all()
+    assert (db.session.get(Job, flaky_id).status, db.session.get(Job, flaky_id).attempts) == ('failed', 3)
+    assert (db.session.get(Job, permanent_id).status, db.session.get(Job, permanent_id).attempts) == ('failed', 1)
+
+
+def test_unique_key_deduplicates_pending_jobs(ctx):
+    first = enqueue('test.flaky', {'key': 'd', 'failures': 0}, unique_key='d')
+    second = enqueue('test.flaky', {'key': 'd', 'failures': 0}, unique_key='d')
+    db.session.commit()
+    assert first.id == second.id
+    assert Job.query.count() == 1
+
+
+def test_claimed_job_is_not_claimed_twice_and_stale_jobs_return(ctx):
+    enqueue('test.flaky', {'key': 'e', 'failures': 0})
+    db.session.commit()
+    job_id = claim_next_job()
+    assert job_id is not None and claim_next_job() is None
+
+    assert requeue_stale_jobs(ctx.config['JOBS_LOCK_TIMEOUT']) == 0
+    Job.query.filter_by(id=job_id).update({Job.locked_at: datetime.utcnow() - timedelta(hours=1)})
+    db.session.commit()
+    assert requeue_stale_jobs(ctx.config['JOBS_LOCK_TIMEOUT']) == 1
+    assert run_pending_jobs(ctx.config) == 1
+
+
+def test_old_finished_jobs_are_purged(ctx):
+    enqueue('test.flaky', {'key': 'f', 'failures': 0})
+    db.session.commit()
+    run_pending_jobs(ctx.config)
+    assert purge_finished_jobs(ctx.config['JOBS_RETENTION']) == 0
+    Job.query.update({Job.finished_at: datetime.utcnow() - timedelta(days=30)})
+    db.session.commit()
+    assert purge_finished_jobs(ctx.config['JOBS_RETENTION']) == 1
@@ -0,0 +1,110 @@
+# tests/test_permissions.py
+
+from itertools import count
+
+import pytest
+from sqlalchemy import select
+
+from app import db, permissions
+from app.models import User, board_members
+from app.permissions import TTLCache, cached_board_membership
+
+_board_numbers = count()
+
+
+@pytest.fixture
+def board(app, make_board):
+    """Доска с одним участником; третий пользователь набора на доску не приглашен."""
+    prefix = f'access-{next(_board_numbers)}-'
+    board = make_board(prefix, users=3, cards=0, members=1)
+    with app.app_context():
+        outsider = db.session.execute(select(User.id, User.email).where(
+            User.email.like(f'{prefix}%'), User.id.notin_(board['member_ids'] + [board['owner_id']]))).one()
+        db.session.remove()
+    return board | {'member_id': board['member_ids'][0], 'member_email': board['member_emails'][0],
+                    'outsider_id': outsider.id, 'outsider_email': outsider.email}
+
+
+def _state_status(client, board):
+    return client.get(f"/api/boards/{board['board_id']}/state").status_code
+
+
+def _cached_keys():
+    return set(permissions._membership_cache._data) if permissions._membership_cache is not None else set()
+
+
+def test_membership_answer_is_cached_between_requests(app, login, board):
+    outsider = login(board['outsider_email'])
+    assert _state_status(outsider, board) == 403
+    # Запись в обход маршрутов не сбрасывает кэш: ответ берется из него до истечения TTL
+    with app.app_context():
+        db.session.execute(board_members.insert().values(board_id=board['board_id'], user_id=board['outsider_id']))
+        db.session.commit()
+        db.session.remove()
+    assert _state_status(outsider, board) == 403
+    assert (board['outsider_id'], board['board_id']) in _cached_keys()
+
+
+def test_invite_invalidates_cached_answer(login, board):
+    outsider = login(board['outsider_email'])
+    assert _state_status(outsider, board) == 403
+
+    response = login(board['owner_email']).post(f"/boards/{board['board_id']}/invite",
+                                                data={'email_or_username': board['outsider_email']})
+    assert response.status_code == 302
+    assert _state_status(outsider, board) == 200
+
+
+def test_remove_invalidates_cached_answer(login, board):
+    member = login(board['member_email'])
+    assert _state_status(member, board) == 200
+
+    login(board['owner_email']).post(f"/boards/{board['board_id']}/members/{board['member_id']}/remove")
+    assert _state_status(member, board) == 403
+
+
+def test_user_and_board_deletion_invalidate_entries(app, login, board):
+    assert _state_status(login(board['outsider_email']), board) == 403
+    assert _state_status(login(board['member_email']), board) == 200
+    with app.app_context():
+        User.query.filter_by(id=board['owner_id']).update({User.is_admin: True})
+        db.session.commit()
+        db.session.remove()
+    owner = login(board['owner_email'])
+
+    owner.post(f"/admin/user/{board['outsider_id']}/delete")
+    with app.app_context():
+        assert db.session.get(User, board['outsider_id']) is None
+        db.session.remove()
+    assert not [key for key in _cached_keys() if key[0] == board['outsider_id']]
+    assert (board['member_id'], board['board_id']) in _cached_keys()
+
+    owner.post(f"/boards/{board['board_id']}/delete")
+    assert _state_status(owner, board) == 404
+    assert not [key for key in _cached_keys() if key[1] == board['board_id']]
+
+
+def test_cache_evicts_least_recently_used_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(permissions.time, 'monotonic', lambda: now[0])
+    cache = TTLCache(max_size=3, ttl=30)
+    for key in 'abc':
+        cache.set(key, key.upper())
+    assert cache.get('a') == 'A'  # 'a' становится самой свежей записью
+    cache.set('d', 'D')
+    assert [cache.get(key) for key in 'abcd'] == ['A', None, 'C', 'D']
+
+    now[0] += 31
+    assert cache.get('a', 'устарело') == 'устарело' and 'a' not in cache._data
+
+
+def test_cache_size_comes_from_config(app, monkeypatch):
+    monkeypatch.setattr(permissions, '_membership_cache', None)
+    monkeypatch.setitem(app.config, 'BOARD_ACCESS_CACHE_SIZE', 2)
+    loads = []
+    for board_id in (1, 2, 3, 1):
+        # Новый контекст приложения - новый запрос без кэша в flask.g
+        with app.app_context():
+            cached_board_membership(-1, board_id, lambda: loads.append(board_id) or True)
+    assert loads == [1, 2, 3, 1]
+    assert list(permissions._membership_cache._data) == [(-1, 3), (-1, 1)]
@@ -0,0 +1,48 @@
+# tests/test_search.py
+
+import pytest
+
+from app import db
+from app.models import Card
+from app.search import _MARK_END, _MARK_START, _like_pattern, _like_rows, _snippet_html, _truncate
+
+
+@pytest.fixture(scope='module')
+def board(app, make_board):
+    board = make_board('search-', users=1, cards=0, members=0)
+    with app.app_context():
+        cards = [Card(title=title, column_id=board['column_ids'][0], rank=rank)
+                 for title, rank in (('отчет_2026', 'a'), ('отчетX2026', 'b'), ('скидка 50% за отчет', 'c'))]
+        db.session.add_all(cards)
+        db.session.commit()
+        board['cards'] = {card.title: card.id for card in cards}
+        db.session.remove()
+    return board
+
+
+def test_truncated_snippet_closes_highlight():
+    snippet = 'а' * 190 + _MARK_START + 'совпадение' * 5 + _MARK_END + ' хвост'
+    html = _snippet_html(_truncate(snippet))
+    assert html.endswith('</mark>…') and html.count('<mark>') == html.count('</mark>') == 1
+
+    closed = 'а' * 150 + _MARK_START + 'совпадение' + _MARK_END + ' ' + 'б' * 100
+    assert _snippet_html(_truncate(closed)).count('</mark>') == 1
+    assert _truncate('короткий ' + _MARK_START + 'текст' + _MARK_END) == 'короткий ' + _MARK_START + 'текст' + _MARK_END
+
+
+def test_like_pattern_escapes_wildcards():
+    assert _like_pattern('a_b%c\\d') == '%a\\_b\\%c\\\\d%'
+
+
+def test_like_search_treats_underscore_literally(app, board):
+    with app.app_context():
+        rows = _like_rows({'user_id': board['owner_id'], 'limit': 10, 'offset': 0}, 'отчет_2026')
+        assert [row['card_title'] for row in rows] == ['отчет_2026']
+        rows = _like_rows({'user_id': board['owner_id'], 'limit': 10, 'offset': 0}, 'отчет')
+        assert sorted(row['card_title'] for row in rows) == sorted(board['cards'])
+
+
+def test_search_api_matches_underscore_literally(login, board):
+    client = login(board['owner_email'])
+    body = client.get('/api/search', query_string={'q': 'отчет_2026'}).get_json()
+    assert [result['card_id'] for result in body['results']] == [board['cards']['отчет_2026']]